@@ -0,0 +1,233 @@
+"""
+Онлайн-бекапи SQLite без зупинки бота.
+
+Копія знімається через sqlite3 backup API (Connection.backup) з окремого
+read-only з'єднання, по pages_per_step сторінок за крок з паузою між кроками.
+Увесь прохід іде в одній read-транзакції на джерелі: у WAL це фіксований
+знімок — writer Repo не блокується зовсім, а backup не перезапускається від
+паралельних записів (копія консистентна на момент початку).
+
+Далі: PRAGMA integrity_check на копії -> gzip -> ротація (keep останніх на файл БД).
+Файли: BACKUP_DIR/<назва БД>-YYYYmmddTHHMMSS.sqlite3.gz.
+
+Відновлення — restore_backup() / `python maintenance.py restore <файл.gz>`.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable
+
+log = logging.getLogger(__name__)
+
+SUFFIX = ".sqlite3.gz"
+
+
+@dataclass(frozen=True)
+class BackupResult:
+    source: str
+    path: str | None  # None — бекап не вдався (див. error)
+    started_at: datetime
+    duration_s: float
+    pages: int
+    db_bytes: int  # розмір знімка до стиснення
+    gz_bytes: int
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _stem(db_path: str) -> str:
+    name = os.path.basename(db_path)
+    return name[: -len(".sqlite3")] if name.endswith(".sqlite3") else name
+
+
+def list_backups(backup_dir: str, db_path: str) -> list[str]:
+    """Бекапи db_path, від найстарішого до найновішого (мітка часу в імені сортується)."""
+    prefix = _stem(db_path) + "-"
+    try:
+        names = os.listdir(backup_dir)
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(backup_dir, n)
+        for n in sorted(names)
+        if n.startswith(prefix) and n.endswith(SUFFIX) and n[len(prefix):-len(SUFFIX)].replace("T", "").isdigit()
+    ]
+
+
+def integrity_check(path: str) -> str | None:
+    """None — ок, інакше перший рядок звіту PRAGMA integrity_check."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        conn.close()
+    return None if rows == [("ok",)] else str(rows[0][0])
+
+
+def _copy_pages(src_path: str, dst_path: str, pages_per_step: int, step_sleep_s: float) -> int:
+    src = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True, isolation_level=None)
+    dst = sqlite3.connect(dst_path)
+    total = 0
+
+    def progress(status: int, remaining: int, pages: int) -> None:
+        nonlocal total
+        total = pages
+        if remaining and step_sleep_s:
+            time.sleep(step_sleep_s)  # віддаємо диск бота між кроками
+
+    try:
+        # знімок на весь прохід: backup працює в цій транзакції і не бачить (не перезапускається від) нових записів
+        src.execute("BEGIN")
+        src.execute("SELECT 1 FROM sqlite_master LIMIT 1")
+        src.backup(dst, pages=pages_per_step if pages_per_step > 0 else -1, progress=progress)
+        src.execute("COMMIT")
+        # копія успадковує WAL з заголовка джерела; бекап — самодостатній файл без -wal/-shm
+        dst.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dst.close()
+        src.close()
+    return total
+
+
+def _gzip(src_path: str, dst_path: str) -> None:
+    tmp = dst_path + ".tmp"
+    with open(src_path, "rb") as f_in, gzip.open(tmp, "wb", compresslevel=6) as f_out:
+        shutil.copyfileobj(f_in, f_out, 1 << 20)
+    os.replace(tmp, dst_path)
+
+
+def _rotate(backup_dir: str, db_path: str, keep: int) -> None:
+    for old in list_backups(backup_dir, db_path)[:-keep] if keep > 0 else []:
+        os.remove(old)
+
+
+def backup_database(
+    db_path: str,
+    backup_dir: str,
+    keep: int = 14,
+    pages_per_step: int = 1024,
+    step_sleep_s: float = 0.01,
+) -> BackupResult:
+    """Синхронно (для CLI / asyncio.to_thread): знімок -> integrity_check -> gzip -> ротація."""
+    started_at, started = datetime.now(), time.perf_counter()
+    os.makedirs(backup_dir, exist_ok=True)
+    final = os.path.join(backup_dir, f"{_stem(db_path)}-{started_at:%Y%m%dT%H%M%S}{SUFFIX}")
+    raw = final[: -len(".gz")] + ".tmp"
+
+    pages = db_bytes = gz_bytes = 0
+    error = None
+    try:
+        pages = _copy_pages(db_path, raw, pages_per_step, step_sleep_s)
+        db_bytes = os.path.getsize(raw)
+        error = integrity_check(raw)
+        if error is None:
+            _gzip(raw, final)
+            gz_bytes = os.path.getsize(final)
+            # ротуємо тільки після вдалого бекапу — інакше можна лишитись без жодної робочої копії
+            _rotate(backup_dir, db_path, keep)
+    except (OSError, sqlite3.Error) as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        if os.path.exists(raw):
+            os.remove(raw)
+
+    return BackupResult(
+        source=db_path,
+        path=final if error is None else None,
+        started_at=started_at,
+        duration_s=time.perf_counter() - started,
+        pages=pages,
+        db_bytes=db_bytes,
+        gz_bytes=gz_bytes,
+        error=error,
+    )
+
+
+def restore_backup(backup_path: str, db_path: str) -> str | None:
+    """
+    Відновити db_path з .sqlite3.gz. Бота на цій БД треба зупинити.
+    Поточна БД спершу зберігається поруч (<db>.pre-restore-<час>); повертає шлях до неї.
+    Копіювання — теж через backup API, тож -wal/-shm цільової БД залишаються узгодженими.
+    """
+    raw = db_path + ".restore.tmp"
+    try:
+        with gzip.open(backup_path, "rb") as f_in, open(raw, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out, 1 << 20)
+        error = integrity_check(raw)
+        if error is not None:
+            raise ValueError(f"{backup_path}: integrity_check failed: {error}")
+
+        saved = None
+        if os.path.exists(db_path):
+            saved = f"{db_path}.pre-restore-{datetime.now():%Y%m%dT%H%M%S}"
+            _copy_pages(db_path, saved, pages_per_step=0, step_sleep_s=0)
+
+        src = sqlite3.connect(f"file:{raw}?mode=ro", uri=True)
+        dst = sqlite3.connect(db_path)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+        return saved
+    finally:
+        if os.path.exists(raw):
+            os.remove(raw)
+
+
+class BackupManager:
+    """
+    Планові бекапи всіх БД процесу (household'и + БД бота з FSM) і стан
+    останнього бекапу кожної — для /backup. Один прохід за раз.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[str],
+        backup_dir: str,
+        keep: int = 14,
+        pages_per_step: int = 1024,
+        step_sleep_ms: float = 10.0,
+    ):
+        self.paths = list(dict.fromkeys(paths))
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.step_sleep_s = max(0.0, step_sleep_ms) / 1000
+        self.last: dict[str, BackupResult] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def run(self) -> list[BackupResult]:
+        async with self._lock:
+            results = []
+            for path in self.paths:
+                if not os.path.exists(path):
+                    continue  # household ще жодного разу не відкривався
+                result = await asyncio.to_thread(
+                    backup_database, path, self.backup_dir, self.keep, self.pages_per_step, self.step_sleep_s
+                )
+                self.last[path] = result
+                results.append(result)
+                if result.ok:
+                    log.info(
+                        "Backup %s -> %s: %s pages, %.1f MB -> %.1f MB gz in %.2fs",
+                        path, result.path, result.pages, result.db_bytes / 1e6, result.gz_bytes / 1e6, result.duration_s,
+                    )
+                else:
+                    log.error("Backup %s failed: %s", path, result.error)
+            return results
@@ -0,0 +1,165 @@
+"""
+Синтетична БД для бенчмарків: детермінований (seed) набір витрат на DAYS днів до DATA_END.
+
+- категорії — дефолтні з Repo.ensure_default_categories;
+- fixed (оренда, садок, податки) — раз на місяць, у перші дні;
+- variable — випадковий день (вихідні частіше), сума ~ lognormal навколо медіани категорії;
+- бюджет і ліміти заведені на кожен місяць.
+
+Вставка швидка: без тригерів і індексів expenses, потім індекси + rollup перераховуються
+з нуля (ті самі SQL, що в міграціях).
+
+    python -m benchmarks.generate --rows 1m --out /tmp/bench-1m.sqlite3
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+from typing import Iterator
+
+from db import DAY_INDEXES_SQL, ROLLUP_REBUILD_SQL, ROLLUP_SQL, Database
+from repo import Repo
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+DATA_END = date(2026, 6, 15)  # "сьогодні" для бенчмарків: середина місяця
+DAYS = 3 * 365
+MONTHLY_BUDGET_CENTS = 25_000_00
+
+# назва категорії -> (вага серед variable-витрат, медіана суми в злотих)
+VARIABLE_PROFILE = {
+    "Продукти (дім)": (30, 60),
+    "Кафе / доставка": (20, 45),
+    "Транспорт": (12, 25),
+    "Шопінг": (8, 120),
+    "Розваги": (6, 80),
+    "Регулярні сервіси": (4, 50),
+    "Дім / техніка": (4, 150),
+    "Медицина": (4, 90),
+    "Резерв / хаос": (3, 100),
+    "Підписки / софт": (5, 30),
+    "Інвестиції": (4, 500),
+}
+WEEKDAY_WEIGHTS = (1.0, 0.9, 0.9, 1.0, 1.3, 1.8, 1.5)  # пн..нд
+
+CHUNK = 200_000
+
+
+def parse_size(value: str) -> int:
+    return SIZES.get(value.lower()) or int(value)
+
+
+async def _create_schema(path: str) -> dict[str, tuple[int, str, int | None]]:
+    """Міграції + дефолтні категорії через звичайний Repo. -> name -> (id, kind, limit)."""
+    db = Database(path, read_pool_size=0, durability="off")
+    await db.connect()
+    try:
+        repo = Repo(db)
+        await repo.ensure_default_categories()
+        return {c["name"]: (int(c["id"]), c["kind"], c["limit_cents"]) for c in await repo.list_categories()}
+    finally:
+        await db.close()
+
+
+def _months(start: date, end: date) -> list[tuple[int, int]]:
+    out, y, m = [], start.year, start.month
+    while (y, m) <= (end.year, end.month):
+        out.append((y, m))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+def _rows(n_rows: int, categories: dict, rng: random.Random, start: date) -> Iterator[tuple]:
+    days = [start + timedelta(days=i) for i in range(DAYS)]
+
+    # fixed: один платіж на місяць на кожну fixed-категорію з лімітом
+    fixed = [(cid, lim) for cid, kind, lim in categories.values() if kind == "fixed"]
+    fixed_rows = []
+    for y, m in _months(start, DATA_END):
+        for cid, lim in fixed:
+            d = date(y, m, rng.randint(1, 5))
+            if start <= d <= DATA_END:
+                fixed_rows.append((lim or 2000_00, cid, d.isoformat(), d.toordinal(), f"{d.isoformat()}T09:00:00", None))
+    yield from fixed_rows[:n_rows]
+
+    variable = [(categories[name][0], weight, median) for name, (weight, median) in VARIABLE_PROFILE.items()]
+    cat_weights = [w for _, w, _ in variable]
+    day_weights = [WEEKDAY_WEIGHTS[d.weekday()] for d in days]
+    day_iso = [d.isoformat() for d in days]
+    day_ord = [d.toordinal() for d in days]
+
+    left = n_rows - min(n_rows, len(fixed_rows))
+    while left > 0:
+        k = min(CHUNK, left)
+        left -= k
+        picked_days = rng.choices(range(len(days)), weights=day_weights, k=k)
+        picked_cats = rng.choices(variable, weights=cat_weights, k=k)
+        for di, (cid, _, median) in zip(picked_days, picked_cats):
+            amount = max(1, int(rng.lognormvariate(0, 0.6) * median * 100))
+            iso = day_iso[di]
+            yield (amount, cid, iso, day_ord[di], f"{iso}T12:00:00", None)
+
+
+def generate(path: str, n_rows: int, seed: int = 42) -> float:
+    """Створює БД з n_rows витрат. Повертає час генерації (с)."""
+    started = time.perf_counter()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    categories = asyncio.run(_create_schema(path))
+    rng = random.Random(seed)
+    start = DATA_END - timedelta(days=DAYS - 1)
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("BEGIN")
+        # без тригерів rollup і індексів expenses: вставка в кілька разів швидша
+        for name in ("trg_expense_rollup_ins", "trg_expense_rollup_del", "trg_expense_rollup_upd"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for name in ("idx_expenses_day_cat_amount", "idx_expenses_cat_day_amount"):
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+        conn.executemany(
+            "INSERT INTO expenses (amount_cents, category_id, spent_date, spent_day, created_at, comment)"
+            " VALUES (?,?,?,?,?,?)",
+            _rows(n_rows, categories, rng, start),
+        )
+        conn.executemany(
+            "INSERT INTO monthly_budgets (year, month, budget_cents) VALUES (?,?,?)",
+            [(y, m, MONTHLY_BUDGET_CENTS) for y, m in _months(start, DATA_END)],
+        )
+        conn.executemany(
+            "INSERT INTO category_limits (year, month, category_id, limit_cents) VALUES (?,?,?,?)",
+            [(y, m, cid, lim) for y, m in _months(start, DATA_END) for cid, _, lim in categories.values()],
+        )
+
+        # executescript спершу робить COMMIT вставки; ANALYZE не робимо — у бота його теж немає
+        conn.executescript(DAY_INDEXES_SQL + ROLLUP_REBUILD_SQL + ROLLUP_SQL)
+    finally:
+        conn.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic budget DB for benchmarks")
+    parser.add_argument("--rows", default="10k", help=f"{', '.join(SIZES)} або число")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    n_rows = parse_size(args.rows)
+    elapsed = generate(args.out, n_rows, args.seed)
+    print(f"{args.out}: {n_rows} expenses in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
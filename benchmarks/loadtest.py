@@ -0,0 +1,322 @@
+"""
+Load-test: N household'ів по 2 користувачі ганяють реальні сценарії через справжній
+Dispatcher (bot.build_dispatcher -> feed_update). Telegram підмінено FakeSession —
+вона лише записує виклики Bot API (і може імітувати їх латентність).
+
+Сценарії (ваги --mix): додати витрату (кнопка -> сьогодні -> сума -> категорія -> коментар),
+швидка витрата одним повідомленням ("45,50 кафе"), "Стан бюджету", зміна ліміту категорії,
+/report week.
+
+    python -m benchmarks.loadtest --households 1,10,50 --flows 20
+    python -m benchmarks.loadtest --households 20 --api-latency-ms 40 --json out.json
+
+На кожен рівень household'ів: пропускна здатність (апдейтів/с), p50/p95/p99 латентності
+feed_update (усього і по кроках), помилки / необроблені апдейти, виклики Bot API.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, Message, Update
+
+from bot import build_dispatcher
+from db import MIGRATIONS, Database, Migration
+from fsm_storage import FSM_MIGRATIONS, SQLiteStorage
+from households import Household, HouseholdManager
+from metrics import METRICS, ApiTimingMiddleware
+from outbox import Outbox
+
+BOT_ID = 1_000_000
+FIRST_USER_ID = 10_000
+VARIABLE_CATEGORY_IDS = range(4, 15)  # дефолтні variable-категорії (Repo.ensure_default_categories)
+
+
+class FakeSession(BaseSession):
+    """Сесія без мережі: записує кожен метод, повертає правдоподібний результат."""
+
+    def __init__(self, latency_s: float = 0.0):
+        super().__init__()
+        self.latency_s = latency_s
+        self.calls: Counter[str] = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[Any], timeout: int | None = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        if method.__returning__ is Message:
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=int(getattr(method, "chat_id", 0) or 0), type="private"),
+                text=getattr(method, "text", None),
+            )
+        return True  # bool / Message | bool (edit_*), answerCallbackQuery, ...
+
+    async def stream_content(self, url: str, headers: dict[str, Any] | None = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+class SimUser:
+    """Один користувач: будує Update'и так, як їх прислав би Telegram."""
+
+    _update_ids = itertools.count(1)
+    _message_ids = itertools.count(1)
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+
+    def _user(self) -> dict:
+        return {"id": self.user_id, "is_bot": False, "first_name": f"u{self.user_id}"}
+
+    def _message(self, text: str | None, from_bot: bool = False) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": self.user_id, "type": "private"},
+            "from": {"id": BOT_ID, "is_bot": True, "first_name": "bot"} if from_bot else self._user(),
+            "text": text,
+        }
+
+    def text(self, text: str) -> Update:
+        return Update.model_validate({"update_id": next(self._update_ids), "message": self._message(text)})
+
+    def button(self, data: str) -> Update:
+        return Update.model_validate({
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(),
+                "chat_instance": str(self.user_id),
+                "message": self._message("…", from_bot=True),
+                "data": data,
+            },
+        })
+
+
+def flow_add_expense(u: SimUser, rng: random.Random) -> list[tuple[str, Update]]:
+    steps = [
+        ("expense.start", u.text("➕ Додати витрату")),
+        ("expense.today", u.button("dt:today")),
+        ("expense.amount", u.text(f"{rng.randint(5, 300)},{rng.randint(0, 99):02d}")),
+        ("expense.category", u.button(f"cat:{rng.choice(VARIABLE_CATEGORY_IDS)}")),
+    ]
+    if rng.random() < 0.2:
+        steps += [("expense.comment_yes", u.button("cmt:yes")), ("expense.comment", u.text("load test"))]
+    else:
+        steps.append(("expense.comment_no", u.button("cmt:no")))
+    return steps
+
+
+QUICK_CATEGORY_WORDS = ("кафе", "продукти", "транспорт", "розваги", "медицина", "шопінг", "кава", "таксі")
+
+
+def flow_quick_expense(u: SimUser, rng: random.Random) -> list[tuple[str, Update]]:
+    text = f"{rng.randint(5, 300)},{rng.randint(0, 99):02d} {rng.choice(QUICK_CATEGORY_WORDS)}"
+    if rng.random() < 0.2:
+        text += " load test"
+    return [("expense.quick", u.text(text))]
+
+
+def flow_status(u: SimUser, rng: random.Random) -> list[tuple[str, Update]]:
+    return [("status", u.text("📊 Стан бюджету"))]
+
+
+def flow_limit(u: SimUser, rng: random.Random) -> list[tuple[str, Update]]:
+    return [
+        ("limit.menu", u.text("✏️ Ліміти")),
+        ("limit.pick", u.button(f"lim:pick:{rng.choice(VARIABLE_CATEGORY_IDS)}")),
+        ("limit.amount", u.text(str(rng.randint(5, 50) * 100))),
+    ]
+
+
+def flow_report(u: SimUser, rng: random.Random) -> list[tuple[str, Update]]:
+    return [("report.week", u.text("/report week"))]
+
+
+FLOWS = {"expense": flow_add_expense, "quick": flow_quick_expense, "status": flow_status, "limit": flow_limit, "report": flow_report}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+        self.unhandled: Counter[str] = Counter()
+
+    async def feed(self, dp, bot: Bot, step: str, update: Update) -> None:
+        started = time.perf_counter()
+        try:
+            result = await dp.feed_update(bot, update)
+        except Exception:
+            self.errors[step] += 1
+            logging.getLogger(__name__).debug("Step %s failed", step, exc_info=True)
+            return
+        finally:
+            self.latencies[step].append(time.perf_counter() - started)
+        if result is UNHANDLED:
+            self.unhandled[step] += 1
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 if ordered else 0.0
+
+
+async def _simulate_user(dp, bot: Bot, user: SimUser, flows: int, mix: dict[str, float], think_s: float,
+                         rec: Recorder, seed: int) -> None:
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    for _ in range(flows):
+        for step, update in FLOWS[rng.choices(names, weights=weights)[0]](user, rng):
+            await rec.feed(dp, bot, step, update)
+            if think_s:
+                await asyncio.sleep(rng.uniform(0, 2 * think_s))
+
+
+async def run_level(dp, bot: Bot, households: list[Household], ready: set[str], flows: int,
+                    mix: dict[str, float], think_s: float, seed: int) -> dict:
+    # перший вхід: /start + бюджет (як справжній household), не рахується
+    setup = Recorder()
+    for h in households:
+        if h.name in ready:
+            continue
+        ready.add(h.name)
+        first = SimUser(h.users[0])
+        await setup.feed(dp, bot, "setup.start", first.text("/start"))
+        await setup.feed(dp, bot, "setup.budget", first.text("20000"))
+
+    rec = Recorder()
+    users = [SimUser(uid) for h in households for uid in h.users]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _simulate_user(dp, bot, u, flows, mix, think_s, rec, seed + i) for i, u in enumerate(users)
+    ))
+    elapsed = time.perf_counter() - started
+
+    everything = [v for values in rec.latencies.values() for v in values]
+    return {
+        "households": len(households),
+        "users": len(users),
+        "updates": len(everything),
+        "seconds": round(elapsed, 3),
+        "updates_per_s": round(len(everything) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_pct(everything, .5), 2),
+        "p95_ms": round(_pct(everything, .95), 2),
+        "p99_ms": round(_pct(everything, .99), 2),
+        "max_ms": round(max(everything, default=0) * 1000, 2),
+        "errors": sum(rec.errors.values()) + sum(setup.errors.values()),
+        "unhandled": sum(rec.unhandled.values()) + sum(setup.unhandled.values()),
+        "error_rate": round((sum(rec.errors.values()) + sum(rec.unhandled.values())) / max(1, len(everything)), 4),
+        "steps": {
+            step: {
+                "n": len(values),
+                "mean_ms": round(statistics.fmean(values) * 1000, 2),
+                "p95_ms": round(_pct(values, .95), 2),
+                "errors": rec.errors[step] + rec.unhandled[step],
+            }
+            for step, values in sorted(rec.latencies.items())
+        },
+    }
+
+
+async def main_async(args) -> list[dict]:
+    levels = sorted({int(x) for x in args.households.split(",") if x.strip()})
+    mix = {name: float(w) for name, w in (part.split("=") for part in args.mix.split(","))}
+    work_dir = tempfile.mkdtemp(prefix="budget-bot-load-")
+
+    households = [
+        Household(
+            name=f"h{i}",
+            db_path=os.path.join(work_dir, f"h{i}.sqlite3"),
+            users=(FIRST_USER_ID + 2 * i, FIRST_USER_ID + 2 * i + 1),
+        )
+        for i in range(max(levels))
+    ]
+
+    async def open_db(path: str, migrations: list[tuple[int, Migration]] = MIGRATIONS) -> Database:
+        db = Database(path, durability=args.durability, migrations=migrations)
+        await db.connect()
+        return db
+
+    manager = HouseholdManager(households, open_db, max_open=args.max_open)
+    storage = SQLiteStorage(await open_db(os.path.join(work_dir, "fsm.sqlite3"), FSM_MIGRATIONS))
+    storage.start()
+    bot = Bot(token=f"{BOT_ID}:load-test", session=FakeSession(args.api_latency_ms / 1000))
+    bot.session.middleware(ApiTimingMiddleware(METRICS))
+    METRICS.install()
+    outbox = Outbox(bot, global_rate=1e6, chat_rate=1e6, chat_burst=1e6)  # ліміти Telegram тут не міряємо
+    outbox.start()
+    dp = build_dispatcher(manager, storage, outbox, args.tz)
+
+    results, ready = [], set()
+    try:
+        for level in levels:
+            result = await run_level(
+                dp, bot, households[:level], ready, args.flows, mix, args.think_ms / 1000, args.seed
+            )
+            results.append(result)
+            print(
+                f"households={result['households']:>4} users={result['users']:>4} "
+                f"updates={result['updates']:>6} {result['updates_per_s']:>8.1f} upd/s  "
+                f"p50={result['p50_ms']:.1f} p95={result['p95_ms']:.1f} p99={result['p99_ms']:.1f} ms  "
+                f"errors={result['errors']} unhandled={result['unhandled']}",
+                file=sys.stderr,
+            )
+    finally:
+        await outbox.close()
+        await manager.close()
+        await storage.close()
+        await storage.db.close()
+        await bot.session.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\nBot API calls: " + ", ".join(f"{m}={n}" for m, n in bot.session.calls.most_common()), file=sys.stderr)
+    print(METRICS.summary(), file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test through the real Dispatcher")
+    parser.add_argument("--households", default="1,10,50", help="рівні навантаження через кому")
+    parser.add_argument("--flows", type=int, default=20, help="сценаріїв на користувача")
+    parser.add_argument("--mix", default="expense=6,status=3,limit=1,report=1", help="ваги сценаріїв")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="середня пауза між кроками користувача")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="імітована латентність Bot API")
+    parser.add_argument("--durability", default="full", choices=["full", "normal", "off"])
+    parser.add_argument("--max-open", type=int, default=32, help="DB_MAX_OPEN для HouseholdManager")
+    parser.add_argument("--tz", default="Europe/Warsaw")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="записати результати в JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = asyncio.run(main_async(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "levels": results}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
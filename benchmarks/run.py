@@ -0,0 +1,219 @@
+"""
+Бенчмарки Repo-агрегатів, safe-spend, звітів і рендеру "Стан бюджету" на синтетичних даних.
+
+    python -m benchmarks.run                              # 10k + 1m
+    python -m benchmarks.run --sizes 10k,1m,10m --repeat 7
+    python -m benchmarks.run --save-baseline              # записати benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json   # порівняти (exit 1 на регресії)
+
+БД генеруються один раз (benchmarks.generate) і перевикористовуються з --data-dir.
+Кожен замір — "холодні" кеші Repo (ReadCache і derived скидаються), але прогріта
+сторінкова пам'ять SQLite (перший прогін не рахується). Результат — JSON з min/median мс.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+from zoneinfo import ZoneInfo
+
+from benchmarks.generate import DATA_END, generate, parse_size
+from db import Database
+from handlers.budget import render_budget_status
+from repo import Repo
+from services.analytics import stats_months, stats_quarters, stats_rolling, stats_weekdays, stats_year
+from services.budgeting import month_bounds, safe_spend_for_day, safe_spend_series
+from services.reports import build_daily_report, build_monthly_report, build_weekly_report, week_start
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+TZ = ZoneInfo("Europe/Warsaw")
+
+
+@dataclass
+class Ctx:
+    repo: Repo
+    now: datetime
+    today: str
+    month_start: str
+    month_end: str  # exclusive
+    month_last: str
+    week_start: str
+    year: int
+    month: int
+
+
+def _reset_caches(repo: Repo) -> None:
+    repo.cache.clear()
+    repo.data_version += 1  # derived-кеш (серії, звіти) вважає все застарілим
+
+
+async def _budget_status(c: Ctx) -> None:
+    # те саме, що handlers.budget.budget_status, без Telegram
+    snap = await c.repo.month_snapshot(c.year, c.month)
+    series = await safe_spend_series(c.repo, c.year, c.month, snap=snap)
+    render_budget_status(snap, series.for_day(c.now.day + 1))
+
+
+TARGETS: dict[str, Callable[[Ctx], Awaitable[object]]] = {
+    "repo.list_categories": lambda c: c.repo.list_categories(),
+    "repo.get_month_limits_map": lambda c: c.repo.get_month_limits_map(c.year, c.month),
+    "repo.month_snapshot": lambda c: c.repo.month_snapshot(c.year, c.month),
+    "repo.sum_by_date": lambda c: c.repo.sum_by_date(c.today),
+    "repo.sum_by_date_and_kind": lambda c: c.repo.sum_by_date_and_kind(c.today, "variable"),
+    "repo.sum_month_total": lambda c: c.repo.sum_month_total(c.month_start, c.month_end),
+    "repo.sum_in_range": lambda c: c.repo.sum_in_range(c.week_start, c.today),
+    "repo.sum_in_range_by_kind": lambda c: c.repo.sum_in_range_by_kind(c.week_start, c.today, "variable"),
+    "repo.sum_month_by_category": lambda c: c.repo.sum_month_by_category(c.month_start, c.month_end),
+    "repo.top_categories_in_range": lambda c: c.repo.top_categories_in_range(c.month_start, c.month_last, 3),
+    "repo.daily_totals_in_range": lambda c: c.repo.daily_totals_in_range(c.month_start, c.month_last),
+    "repo.daily_totals_by_kind_in_range": lambda c: c.repo.daily_totals_by_kind_in_range(
+        c.month_start, c.month_last, "variable"
+    ),
+    "safe_spend_for_day": lambda c: safe_spend_for_day(c.repo, TZ, c.today),
+    "build_daily_report": lambda c: build_daily_report(c.repo, TZ, c.today),
+    "build_weekly_report": lambda c: build_weekly_report(c.repo, TZ, c.now),
+    "build_monthly_report": lambda c: build_monthly_report(c.repo, TZ, c.year, c.month),
+    "budget_status": _budget_status,
+    # колонки вже в пам'яті (прогрів), замір = дочитка по id + звірка з rollup + агрегація
+    "analytics.stats_months": lambda c: stats_months(c.repo, c.now.date()),
+    "analytics.stats_quarters": lambda c: stats_quarters(c.repo, c.now.date()),
+    "analytics.stats_year": lambda c: stats_year(c.repo, c.year - 1, c.now.date()),
+    "analytics.stats_weekdays": lambda c: stats_weekdays(c.repo, c.now.date()),
+    "analytics.stats_rolling": lambda c: stats_rolling(c.repo, c.now.date()),
+}
+
+
+async def _bench_size(path: str, repeat: int) -> dict[str, dict[str, float]]:
+    db = Database(path, durability="off")
+    await db.connect()
+    try:
+        repo = Repo(db)
+        now = datetime(DATA_END.year, DATA_END.month, DATA_END.day, 21, 0, tzinfo=TZ)
+        mctx = month_bounds(now, TZ)
+        c = Ctx(
+            repo=repo,
+            now=now,
+            today=DATA_END.isoformat(),
+            month_start=mctx.start_date,
+            month_end=mctx.end_date,
+            month_last=(datetime.fromisoformat(mctx.end_date) - timedelta(days=1)).date().isoformat(),
+            week_start=week_start(now).isoformat(),
+            year=mctx.year,
+            month=mctx.month,
+        )
+
+        results: dict[str, dict[str, float]] = {}
+        for name, target in TARGETS.items():
+            await target(c)  # прогрів сторінок SQLite
+            samples = []
+            for _ in range(repeat):
+                _reset_caches(repo)
+                started = time.perf_counter()
+                await target(c)
+                samples.append((time.perf_counter() - started) * 1000)
+            results[name] = {"min_ms": round(min(samples), 4), "median_ms": round(statistics.median(samples), 4)}
+
+        # чистий рендер (без БД): snapshot уже є
+        snap = await repo.month_snapshot(c.year, c.month)
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(100):
+                render_budget_status(snap, 123_45)
+            samples.append((time.perf_counter() - started) * 1000 / 100)
+        results["render_budget_status"] = {"min_ms": round(min(samples), 4), "median_ms": round(statistics.median(samples), 4)}
+        return results
+    finally:
+        await db.close()
+
+
+def run(sizes: list[str], repeat: int, data_dir: str, seed: int, regenerate: bool) -> dict:
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": {},
+    }
+    for size in sizes:
+        n_rows = parse_size(size)
+        path = os.path.join(data_dir, f"bench-{size}-seed{seed}.sqlite3")
+        if regenerate or not os.path.exists(path):
+            print(f"[{size}] generating {n_rows} expenses -> {path}", file=sys.stderr)
+            print(f"[{size}] generated in {generate(path, n_rows, seed):.1f}s", file=sys.stderr)
+        print(f"[{size}] running {len(TARGETS) + 1} targets x {repeat}", file=sys.stderr)
+        report["results"][size] = asyncio.run(_bench_size(path, repeat))
+    return report
+
+
+def compare(report: dict, baseline: dict, threshold: float, min_delta_ms: float) -> int:
+    """Друкує median поточний vs baseline. Повертає кількість регресій."""
+    regressions = 0
+    print(f"\n{'size':<5} {'target':<36} {'base ms':>10} {'now ms':>10} {'ratio':>7}")
+    for size, targets in report["results"].items():
+        base_targets = baseline.get("results", {}).get(size, {})
+        for name, now in targets.items():
+            base = base_targets.get(name)
+            if base is None:
+                print(f"{size:<5} {name:<36} {'-':>10} {now['median_ms']:>10.3f} {'new':>7}")
+                continue
+            ratio = now["median_ms"] / max(base["median_ms"], 1e-9)
+            regressed = ratio > threshold and now["median_ms"] - base["median_ms"] > min_delta_ms
+            regressions += regressed
+            mark = "  REGRESSION" if regressed else ""
+            print(f"{size:<5} {name:<36} {base['median_ms']:>10.3f} {now['median_ms']:>10.3f} {ratio:>6.2f}x{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget bot benchmarks")
+    parser.add_argument("--sizes", default="10k,1m", help="через кому: 10k,1m,10m або числа")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "budget-bot-bench"))
+    parser.add_argument("--regenerate", action="store_true", help="перегенерувати БД, навіть якщо є")
+    parser.add_argument("--out", help="куди записати JSON (за замовчуванням — stdout)")
+    parser.add_argument("--baseline", help="JSON попереднього прогону для порівняння")
+    parser.add_argument("--save-baseline", action="store_true", help=f"записати результат у {DEFAULT_BASELINE}")
+    parser.add_argument("--threshold", type=float, default=1.25, help="регресія, якщо median > baseline * threshold")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="і повільніше хоча б на стільки мс")
+    args = parser.parse_args()
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    report = run(sizes, max(1, args.repeat), args.data_dir, args.seed, args.regenerate)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    elif not args.baseline:
+        print(text)
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{regressions} regression(s)", file=sys.stderr)
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,224 @@
 from __future__ import annotations
 
+import time
+
+_STARTED = time.perf_counter()  # до важких імпортів (aiogram): фаза "imports" у METRICS.startup
+
 import asyncio
 import logging
+import os
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+from zoneinfo import ZoneInfo
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.base import BaseStorage
 
+from backup import BackupManager
 from config import cfg
-from db import Database
+from db import MIGRATIONS, Database, Migration
+from fsm_storage import FSM_MIGRATIONS, SQLiteStorage
+from households import HouseholdManager, households_from_config
+from metrics import METRICS, ApiTimingMiddleware, TimedStorage, start_metrics_server
+from middlewares import AccessAndDIMiddleware, HandlerNameMiddleware, MetricsMiddleware
+from outbox import Outbox
+from query_profiler import PROFILER
 from repo import Repo
-from middlewares import AccessAndDIMiddleware
-from scheduler import setup_scheduler
 
-from handlers import start, expenses, categories, budget, day_close, limits
+from handlers import admin, start, reports, stats, expenses, categories, budget, day_close, limits, bulk
 
 logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
 
-async def main():
-    # cfg = load_config()
-
-    db = Database(cfg.db_path)
+async def open_db(path: str, migrations: list[tuple[int, Migration]] = MIGRATIONS) -> Database:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = Database(
+        path,
+        read_pool_size=cfg.db_read_pool,
+        commit_window_ms=cfg.db_commit_window_ms,
+        durability=cfg.db_durability,
+        migrations=migrations,
+    )
     await db.connect()
-    repo = Repo(db)
+    return db
+
 
-    bot = Bot(token=cfg.token)
-    dp = Dispatcher(storage=MemoryStorage())
+def build_dispatcher(households: HouseholdManager, storage: BaseStorage, outbox: Outbox, tz_name: str) -> Dispatcher:
+    """
+    Dispatcher з усіма middleware і роутерами — і для бота, і для load-test'у
+    (benchmarks/loadtest.py). Роутери — модульні синглтони, тож один раз на процес.
+    """
+    dp = Dispatcher(storage=TimedStorage(storage))
 
-    dp.update.outer_middleware(AccessAndDIMiddleware(repo, cfg.tz, cfg.users))
+    dp.update.outer_middleware(MetricsMiddleware(METRICS))  # першим: міряє все, що нижче
+    dp.update.outer_middleware(AccessAndDIMiddleware(households, tz_name, outbox))
+    dp.message.middleware(HandlerNameMiddleware())
+    dp.callback_query.middleware(HandlerNameMiddleware())
 
+    dp.include_router(admin.router)
     dp.include_router(start.router)
+    dp.include_router(reports.router)
+    dp.include_router(stats.router)
     dp.include_router(expenses.router)
     dp.include_router(categories.router)
     dp.include_router(limits.router)   # ✅ new
     dp.include_router(budget.router)
     dp.include_router(day_close.router)
+    dp.include_router(bulk.router)  # останнім: ловить багаторядковий текст поза flow
+    return dp
+
+
+async def prime_caches(repo: Repo) -> None:
+    # те, що читає майже кожен апдейт: категорії, ліміти й бюджет поточного місяця (ReadCache)
+    today = datetime.now(ZoneInfo(cfg.tz)).date()
+    await repo.list_categories()
+    await repo.get_month_limits_map(today.year, today.month)
+    await repo.get_monthly_budget(today.year, today.month)
 
-    scheduler = setup_scheduler(bot, repo, cfg.tz, cfg.users, dp.storage)
-    scheduler.start()
+
+@dataclass
+class Background:
+    """
+    Підсистеми, без яких бот уже може відповідати: /metrics-сервер, планувальник,
+    прогрів household'ів. Стартують у фоні на startup Dispatcher'а — перший апдейт
+    на них не чекає; close() прибирає те, що встигло стартувати.
+    """
+    households: HouseholdManager
+    outbox: Outbox
+    storage: BaseStorage
+    backups: BackupManager
+    scheduler: Any = None
+    metrics_runner: Any = None
+    task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self._run(), name="startup-background")
+
+    async def _run(self) -> None:
+        startup = METRICS.startup
+        try:
+            if cfg.metrics_port:
+                with startup.phase("metrics_server"):
+                    self.metrics_runner = await start_metrics_server(METRICS, cfg.metrics_host, cfg.metrics_port)
+            with startup.phase("scheduler"):
+                from scheduler import setup_scheduler  # APScheduler + services.reports — поза критичним шляхом
+
+                self.scheduler = setup_scheduler(
+                    self.outbox, self.households, cfg.tz, self.storage, backups=self.backups, backup_hour=cfg.backup_hour
+                )
+                self.scheduler.start()
+            with startup.phase("warm_up"):
+                await self.households.warm_up(prime_caches)
+            startup.mark("ready")
+        except Exception:
+            log.exception("Background startup failed")
+
+    async def close(self) -> None:
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+
+
+async def main():
+    # cfg = load_config()
+    startup = METRICS.startup
+    startup.begin(_STARTED)
+
+    households = HouseholdManager(
+        households_from_config(cfg.households, cfg.users, cfg.db_path, cfg.db_dir),
+        open_db,
+        max_open=cfg.db_max_open,
+        idle_close_s=cfg.db_idle_close_s,
+        external_check_s=cfg.db_external_check_ms / 1000,
+    )
+    households.start()
+
+    # FSM-стан — у власній БД (cfg.fsm_db_path), спільний для всіх household'ів
+    if any(os.path.abspath(h.db_path) == os.path.abspath(cfg.fsm_db_path) for h in households.households.values()):
+        raise ValueError(f"FSM_DB_PATH={cfg.fsm_db_path!r} must differ from household databases")
+    with startup.phase("fsm_db"):
+        storage = SQLiteStorage(
+            await open_db(cfg.fsm_db_path, FSM_MIGRATIONS),
+            cache_size=cfg.fsm_cache_size,
+            ttl_s=cfg.fsm_ttl_s,
+            flush_interval_s=cfg.fsm_flush_interval_s,
+        )
+        storage.start()
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(cfg.bot_api_url)) if cfg.bot_api_url else None
+    bot = Bot(token=cfg.token, session=session)
+
+    METRICS.install()
+    PROFILER.install(threshold_ms=cfg.slow_query_ms)
+    bot.session.middleware(ApiTimingMiddleware(METRICS))
+
+    outbox = Outbox(
+        bot,
+        global_rate=cfg.outbox_global_rate,
+        chat_rate=cfg.outbox_chat_rate,
+        workers=cfg.outbox_workers,
+    )
+    outbox.start()
+
+    with startup.phase("dispatcher"):
+        dp = build_dispatcher(households, storage, outbox, cfg.tz)
+
+    backups = BackupManager(
+        [*(h.db_path for h in households.households.values()), cfg.fsm_db_path],
+        cfg.backup_dir,
+        keep=cfg.backup_keep,
+        pages_per_step=cfg.backup_pages_per_step,
+        step_sleep_ms=cfg.backup_step_sleep_ms,
+    )
+    dp["backups"] = backups  # для /backup (handlers/admin.py)
+
+    background = Background(households, outbox, dp.storage, backups)
+
+    async def on_startup() -> None:
+        # Dispatcher готовий приймати апдейти — решта доїжджає у фоні
+        startup.mark("serving")
+        background.start()
+
+    dp.startup.register(on_startup)
+
+    # тільки message / callback_query (те, що реально слухають роутери)
+    allowed_updates = dp.resolve_used_update_types()
 
     try:
-        await dp.start_polling(bot)
+        if cfg.run_mode == "webhook":
+            from webhook import run_webhook  # aiohttp.web — тільки у webhook-режимі
+
+            await run_webhook(
+                dp,
+                bot,
+                url=cfg.webhook_url,
+                path=cfg.webhook_path,
+                host=cfg.webhook_host,
+                port=cfg.webhook_port,
+                secret_token=cfg.webhook_secret,
+                allowed_updates=allowed_updates,
+            )
+        else:
+            with startup.phase("delete_webhook"):
+                await bot.delete_webhook()  # після webhook-режиму getUpdates інакше не працює
+            await dp.start_polling(bot, allowed_updates=allowed_updates)
     finally:
-        scheduler.shutdown(wait=False)
-        await db.close()
+        await background.close()
+        await outbox.close()  # дослати чергу
+        await households.close()  # drain group-commit черг + закрити всі БД
+        await storage.close()  # Dispatcher уже закрив його на shutdown; тут — якщо polling не стартував
+        await storage.db.close()
+        logging.info(PROFILER.dump(10))
 
 if __name__ == "__main__":
     asyncio.run(main())
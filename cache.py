@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class ReadCache:
+    """
+    In-process read-through кеш для "майже статичних" даних Repo
+    (категорії, ліміти місяця, бюджет). Значення — незмінні знімки
+    (tuple / MappingProxyType / int), тож віддаємо їх без копіювання.
+
+    Ключі — кортежі, перший елемент = простір імен ("categories", "limits", ...).
+    Інвалідація — з мутуючих методів Repo.
+    """
+
+    def __init__(self):
+        self._data: dict[Hashable, Any] = {}
+        # росте на кожну інвалідацію: завантаження, що стартувало ДО інвалідації,
+        # не має права покласти в кеш застарілий результат
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        if key in self._data:
+            self.hits += 1
+            return self._data[key]
+
+        self.misses += 1
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self._data[key] = value
+        return value
+
+    def invalidate(self, *keys: Hashable) -> None:
+        self._generation += 1
+        for key in keys:
+            self._data.pop(key, None)
+
+    def invalidate_namespace(self, namespace: str) -> None:
+        self._generation += 1
+        for key in [k for k in self._data if isinstance(k, tuple) and k and k[0] == namespace]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+class VersionedCache:
+    """
+    LRU-кеш похідних обчислень (safe-spend серія, тексти звітів), прив'язаних до
+    Repo.data_version (клавіатури категорій — до Repo.categories_version):
+    запис живий, доки версія не змінилась.
+    Повернення None = промах (значення None не кешуємо).
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[int, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: int) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, version: int, value: Any) -> None:
+        self._data[key] = (version, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._data)}
@@ -10,13 +10,85 @@ class Config:
     tz: str
     db_path: str
     users: list[int]
+    db_read_pool: int  # кількість read-only з'єднань (WAL); 0 = все через одне з'єднання
+    db_commit_window_ms: float  # group commit: скільки чекати інші записи перед COMMIT
+    db_durability: str  # full | normal | off (PRAGMA synchronous)
+    households: dict[str, list[int]]  # порожньо = один household (USERS + DB_PATH)
+    db_dir: str  # де лежать файли household'ів: DB_DIR/<name>.sqlite3
+    db_max_open: int  # скільки household-БД тримати відкритими (LRU)
+    db_idle_close_s: float  # закривати БД household'у після стількох секунд простою
+    db_external_check_ms: float  # як часто перевіряти записи інших процесів (PRAGMA data_version)
+    fsm_db_path: str  # окремий файл для FSM: другий writer на БД household'а = "database is locked"
+    fsm_cache_size: int  # скільки FSM-ключів тримати в пам'яті
+    fsm_ttl_s: float  # незавершений діалог без змін довше цього — видаляється
+    fsm_flush_interval_s: float  # як часто скидати змінений FSM-стан у SQLite
+    run_mode: str  # polling | webhook
+    webhook_url: str  # публічна адреса (https://bot.example.com), до неї додається webhook_path
+    webhook_path: str
+    webhook_secret: str | None  # X-Telegram-Bot-Api-Secret-Token
+    webhook_host: str  # де слухає aiohttp
+    webhook_port: int
+    bot_api_url: str | None  # свій Bot API сервер (local telegram-bot-api / fake для тестів)
+    outbox_global_rate: float  # повідомлень/с на весь бот (Telegram: ~30)
+    outbox_chat_rate: float  # повідомлень/с в один чат (Telegram: ~1)
+    outbox_workers: int  # одночасних sendMessage
+    admins: list[int]  # кому доступні службові команди (/metrics); мають бути і серед USERS/HOUSEHOLDS
+    metrics_host: str
+    metrics_port: int  # Prometheus /metrics; 0 = вимкнено
+    slow_query_ms: float  # SQL довший за це — у лог разом з EXPLAIN QUERY PLAN
+    backup_dir: str
+    backup_hour: int  # щодня о цій годині (Warsaw); -1 = без планових бекапів
+    backup_keep: int  # скільки останніх бекапів тримати на кожну БД
+    backup_pages_per_step: int  # сторінок SQLite за крок backup API (0 = все за раз)
+    backup_step_sleep_ms: float  # пауза між кроками
 
 def _parse_users(val: str) -> list[int]:
     return [int(x.strip()) for x in val.split(",") if x.strip()]
 
+def _parse_households(val: str) -> dict[str, list[int]]:
+    # "home=111,222;parents=333" -> {"home": [111, 222], "parents": [333]}
+    out: dict[str, list[int]] = {}
+    for part in val.split(";"):
+        if not part.strip():
+            continue
+        name, _, users = part.partition("=")
+        out[name.strip()] = _parse_users(users)
+    return out
+
 cfg = Config(
     token=os.getenv("TOKEN"),
     tz=os.getenv("TZ", "Europe/Warsaw"),
     db_path=os.getenv("DB_PATH", "db.sqlite3"),
     users=_parse_users(os.getenv("USERS", "")),
+    db_read_pool=int(os.getenv("DB_READ_POOL", "2")),
+    db_commit_window_ms=float(os.getenv("DB_COMMIT_WINDOW_MS", "5")),
+    db_durability=os.getenv("DB_DURABILITY", "full"),
+    households=_parse_households(os.getenv("HOUSEHOLDS", "")),
+    db_dir=os.getenv("DB_DIR", "households"),
+    db_max_open=int(os.getenv("DB_MAX_OPEN", "32")),
+    db_idle_close_s=float(os.getenv("DB_IDLE_CLOSE_S", "600")),
+    db_external_check_ms=float(os.getenv("DB_EXTERNAL_CHECK_MS", "1000")),
+    fsm_db_path=os.getenv("FSM_DB_PATH") or os.path.join(os.path.dirname(os.getenv("DB_PATH", "db.sqlite3")), "fsm.sqlite3"),
+    fsm_cache_size=int(os.getenv("FSM_CACHE_SIZE", "10000")),
+    fsm_ttl_s=float(os.getenv("FSM_TTL_S", str(7 * 24 * 3600))),
+    fsm_flush_interval_s=float(os.getenv("FSM_FLUSH_INTERVAL_S", "1")),
+    run_mode=os.getenv("RUN_MODE", "polling"),
+    webhook_url=os.getenv("WEBHOOK_URL", ""),
+    webhook_path=os.getenv("WEBHOOK_PATH", "/webhook"),
+    webhook_secret=os.getenv("WEBHOOK_SECRET") or None,
+    webhook_host=os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+    webhook_port=int(os.getenv("WEBHOOK_PORT", "8080")),
+    bot_api_url=os.getenv("BOT_API_URL") or None,
+    outbox_global_rate=float(os.getenv("OUTBOX_GLOBAL_RATE", "30")),
+    outbox_chat_rate=float(os.getenv("OUTBOX_CHAT_RATE", "1")),
+    outbox_workers=int(os.getenv("OUTBOX_WORKERS", "8")),
+    admins=_parse_users(os.getenv("ADMINS", "")),
+    metrics_host=os.getenv("METRICS_HOST", "127.0.0.1"),
+    metrics_port=int(os.getenv("METRICS_PORT", "0")),
+    slow_query_ms=float(os.getenv("SLOW_QUERY_MS", "50")),
+    backup_dir=os.getenv("BACKUP_DIR", "backups"),
+    backup_hour=int(os.getenv("BACKUP_HOUR", "4")),
+    backup_keep=int(os.getenv("BACKUP_KEEP", "14")),
+    backup_pages_per_step=int(os.getenv("BACKUP_PAGES_PER_STEP", "1024")),
+    backup_step_sleep_ms=float(os.getenv("BACKUP_STEP_SLEEP_MS", "10")),
 )
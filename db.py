@@ -1,6 +1,43 @@
 from __future__ import annotations
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from contextvars import Context, ContextVar, copy_context
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, TypeVar
+
 import aiosqlite
 
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# політика durability для writer'а -> PRAGMA synchronous
+# full   — fsync на кожен commit (як було до WAL)
+# normal — у WAL fsync тільки на checkpoint: швидше, але після падіння ОС можна втратити останні commit'и
+# off    — без fsync взагалі (тільки для тестів/бенчмарків)
+DURABILITY_SYNCHRONOUS = {"full": "FULL", "normal": "NORMAL", "off": "OFF"}
+
+WriteOp = Callable[[aiosqlite.Connection], Awaitable[Any]]
+
+# Спостерігачі SQL: hook(conn, sql, params, seconds) після кожного execute/executemany/
+# executescript на будь-якій Database (метрики, профайлер). conn — сире aiosqlite-з'єднання
+# (запити через нього hook'ам не видно), params — None для executemany/executescript.
+# Порожньо = без таймінгу взагалі.
+StatementHook = Callable[[aiosqlite.Connection, str, Any, float], None]
+statement_hooks: list[StatementHook] = []
+
+# контекст викликача write(): writer виконує op у своїй задачі, а hook'и мають
+# бачити contextvars того апдейту/job'а, що цей запис замовив
+_op_context: ContextVar[Context | None] = ContextVar("db_op_context", default=None)
+
+# Базова схема (міграція №1). Все через IF NOT EXISTS, щоб стара БД з user_version=0
+# спокійно "доганялась" до версій.
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS categories (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -49,18 +86,670 @@ CREATE TABLE IF NOT EXISTS monthly_budgets (
 );
 """
 
+# Індекси під range-фільтри по spent_date у Repo (раніше — full scan expenses).
+INDEXES_SQL = """
+-- covering: SUM(amount_cents) по діапазону дат (+ групування по категорії) без звернення до таблиці
+CREATE INDEX IF NOT EXISTS idx_expenses_date_cat_amount
+  ON expenses(spent_date, category_id, amount_cents);
+
+-- LEFT JOIN categories -> expenses по category_id + діапазон дат (sum_month_by_category)
+CREATE INDEX IF NOT EXISTS idx_expenses_cat_date_amount
+  ON expenses(category_id, spent_date, amount_cents);
+
+-- активні категорії (майже всі запити фільтрують is_active=1)
+CREATE INDEX IF NOT EXISTS idx_categories_active
+  ON categories(id, kind) WHERE is_active=1;
+"""
+
+# Денні агрегати (дата × категорія). Підтримуються тригерами в тій самій транзакції,
+# що й зміна expenses — тож будь-який шлях запису (Repo, import_expenses.py, ручний UPDATE/DELETE)
+# не може їх розсинхронізувати. Читання місяця = O(днів × категорій), а не O(витрат).
+# Перша версія (міграція №3) — з ключем spent_date TEXT; актуальна — ROLLUP_SQL нижче.
+ROLLUP_V3_SQL = """
+CREATE TABLE IF NOT EXISTS expense_rollup (
+  spent_date TEXT NOT NULL, -- YYYY-MM-DD
+  category_id INTEGER NOT NULL,
+  sum_cents INTEGER NOT NULL,
+  cnt INTEGER NOT NULL,
+  PRIMARY KEY (spent_date, category_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_expense_rollup_ins AFTER INSERT ON expenses
+BEGIN
+  INSERT INTO expense_rollup (spent_date, category_id, sum_cents, cnt)
+  VALUES (NEW.spent_date, NEW.category_id, NEW.amount_cents, 1)
+  ON CONFLICT(spent_date, category_id) DO UPDATE
+    SET sum_cents = sum_cents + excluded.sum_cents, cnt = cnt + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expense_rollup_del AFTER DELETE ON expenses
+BEGIN
+  UPDATE expense_rollup SET sum_cents = sum_cents - OLD.amount_cents, cnt = cnt - 1
+   WHERE spent_date = OLD.spent_date AND category_id = OLD.category_id;
+  DELETE FROM expense_rollup
+   WHERE spent_date = OLD.spent_date AND category_id = OLD.category_id AND cnt <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expense_rollup_upd
+AFTER UPDATE OF amount_cents, category_id, spent_date ON expenses
+BEGIN
+  UPDATE expense_rollup SET sum_cents = sum_cents - OLD.amount_cents, cnt = cnt - 1
+   WHERE spent_date = OLD.spent_date AND category_id = OLD.category_id;
+  DELETE FROM expense_rollup
+   WHERE spent_date = OLD.spent_date AND category_id = OLD.category_id AND cnt <= 0;
+  INSERT INTO expense_rollup (spent_date, category_id, sum_cents, cnt)
+  VALUES (NEW.spent_date, NEW.category_id, NEW.amount_cents, 1)
+  ON CONFLICT(spent_date, category_id) DO UPDATE
+    SET sum_cents = sum_cents + excluded.sum_cents, cnt = cnt + 1;
+END;
+"""
+
+ROLLUP_REBUILD_V3_SQL = """
+DELETE FROM expense_rollup;
+INSERT INTO expense_rollup (spent_date, category_id, sum_cents, cnt)
+SELECT spent_date, category_id, SUM(amount_cents), COUNT(*)
+FROM expenses
+GROUP BY spent_date, category_id;
+"""
+
+# Ключ ідемпотентного імпорту (import_expenses.py): хеш вмісту рядка CSV.
+# Повторний імпорт того ж файлу — INSERT OR IGNORE нічого не додає. Для записів з бота — NULL
+# (крім тих, що вже були до міграції №9, див. IMPORT_KEY_BACKFILL).
+IMPORT_KEY_SQL = """
+ALTER TABLE expenses ADD COLUMN import_key TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_import_key
+  ON expenses(import_key) WHERE import_key IS NOT NULL;
+"""
+
+# Стан FSM (незавершені діалоги) — переживає рестарт. Див. fsm_storage.SQLiteStorage.
+# Живе у власній БД бота (fsm_storage.FSM_MIGRATIONS); у БД household'ів таблиця лишилась
+# тільки в історії міграцій (№5, прибрана №10).
+FSM_STATE_SQL = """
+CREATE TABLE IF NOT EXISTS fsm_state (
+  key TEXT PRIMARY KEY, -- bot:chat:user:thread:business:destiny
+  state TEXT,
+  data TEXT NOT NULL DEFAULT '{}', -- JSON
+  updated_at REAL NOT NULL -- unix time, для TTL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_fsm_state_updated_at ON fsm_state(updated_at);
+"""
+
+# День як ціле: date.toordinal() == julianday(...) - 1721424.5 (0001-01-01 -> 1).
+# Порівняння й індекси по INTEGER дешевші й менші за TEXT 'YYYY-MM-DD',
+# а місяць/тиждень — просто діапазон чисел.
+SPENT_DAY_EXPR = "CAST(julianday({}) - 1721424.5 AS INTEGER)"
+
+
+def day_ordinal(iso: str) -> int:
+    """'YYYY-MM-DD' -> expenses.spent_day."""
+    return date.fromisoformat(iso).toordinal()
+
+
+def day_iso(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+# expenses.spent_day. Repo / import_expenses.py пишуть його самі; для інших шляхів
+# запису (ручний SQL) тригери дораховують його з spent_date.
+SPENT_DAY_SQL = f"""
+ALTER TABLE expenses ADD COLUMN spent_day INTEGER;
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_spent_day_ins AFTER INSERT ON expenses
+WHEN NEW.spent_day IS NULL
+BEGIN
+  UPDATE expenses SET spent_day = {SPENT_DAY_EXPR.format("NEW.spent_date")} WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_spent_day_upd AFTER UPDATE OF spent_date ON expenses
+BEGIN
+  UPDATE expenses SET spent_day = {SPENT_DAY_EXPR.format("NEW.spent_date")} WHERE id = NEW.id;
+END;
+"""
+
+
+def import_key(spent_date: str, amount_cents: int, category: str, comment: str | None, occurrence: int) -> str:
+    """expenses.import_key рядка CSV (import_expenses.py і backfill міграції №9)."""
+    # occurrence: дві однакові кави в один день — це дві витрати, а не дублікат
+    raw = f"{spent_date}\x1f{amount_cents}\x1f{category}\x1f{comment or ''}\x1f{occurrence}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass(frozen=True)
+class ChunkedUpdate:
+    """
+    Міграція-backfill великої таблиці: sql з :lo/:hi виконується пачками по rowid,
+    кожна пачка — своя коротка транзакція (writer не тримає lock на весь прохід, WAL
+    не роздувається). Ідемпотентна: перерваний backfill продовжується з початку.
+    functions — (назва, к-сть аргументів, fn) для sql, реєструються на з'єднанні перед проходом.
+    """
+    table: str
+    sql: str
+    chunk: int = 50_000
+    functions: tuple[tuple[str, int, Callable[..., Any]], ...] = ()
+
+    def ranges(self, max_rowid: int) -> Iterator[dict[str, int]]:
+        for lo in range(0, max_rowid + 1, self.chunk):
+            yield {"lo": lo, "hi": lo + self.chunk}
+
+
+SPENT_DAY_BACKFILL = ChunkedUpdate(
+    table="expenses",
+    sql=f"""
+    UPDATE expenses SET spent_day = {SPENT_DAY_EXPR.format("spent_date")}
+    WHERE id >= :lo AND id < :hi AND spent_day IS NULL
+    """,
+)
+
+# Індекси expenses і rollup — по spent_day замість TEXT spent_date.
+DAY_INDEXES_SQL = """
+DROP INDEX IF EXISTS idx_expenses_date_cat_amount;
+DROP INDEX IF EXISTS idx_expenses_cat_date_amount;
+
+-- covering: SUM(amount_cents) по діапазону днів (+ групування по категорії) без звернення до таблиці
+CREATE INDEX IF NOT EXISTS idx_expenses_day_cat_amount
+  ON expenses(spent_day, category_id, amount_cents);
+
+-- по категорії + діапазон днів
+CREATE INDEX IF NOT EXISTS idx_expenses_cat_day_amount
+  ON expenses(category_id, spent_day, amount_cents);
+"""
+
+# Актуальний rollup: ключ (spent_day, category_id). День у тригерах рахується з
+# spent_date, а не з NEW.spent_day — порядок спрацювання тригерів не гарантований.
+ROLLUP_SQL = f"""
+CREATE TABLE IF NOT EXISTS expense_rollup (
+  spent_day INTEGER NOT NULL, -- date.toordinal()
+  category_id INTEGER NOT NULL,
+  sum_cents INTEGER NOT NULL,
+  cnt INTEGER NOT NULL,
+  PRIMARY KEY (spent_day, category_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_expense_rollup_ins AFTER INSERT ON expenses
+BEGIN
+  INSERT INTO expense_rollup (spent_day, category_id, sum_cents, cnt)
+  VALUES ({SPENT_DAY_EXPR.format("NEW.spent_date")}, NEW.category_id, NEW.amount_cents, 1)
+  ON CONFLICT(spent_day, category_id) DO UPDATE
+    SET sum_cents = sum_cents + excluded.sum_cents, cnt = cnt + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expense_rollup_del AFTER DELETE ON expenses
+BEGIN
+  UPDATE expense_rollup SET sum_cents = sum_cents - OLD.amount_cents, cnt = cnt - 1
+   WHERE spent_day = {SPENT_DAY_EXPR.format("OLD.spent_date")} AND category_id = OLD.category_id;
+  DELETE FROM expense_rollup
+   WHERE spent_day = {SPENT_DAY_EXPR.format("OLD.spent_date")} AND category_id = OLD.category_id AND cnt <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expense_rollup_upd
+AFTER UPDATE OF amount_cents, category_id, spent_date ON expenses
+BEGIN
+  UPDATE expense_rollup SET sum_cents = sum_cents - OLD.amount_cents, cnt = cnt - 1
+   WHERE spent_day = {SPENT_DAY_EXPR.format("OLD.spent_date")} AND category_id = OLD.category_id;
+  DELETE FROM expense_rollup
+   WHERE spent_day = {SPENT_DAY_EXPR.format("OLD.spent_date")} AND category_id = OLD.category_id AND cnt <= 0;
+  INSERT INTO expense_rollup (spent_day, category_id, sum_cents, cnt)
+  VALUES ({SPENT_DAY_EXPR.format("NEW.spent_date")}, NEW.category_id, NEW.amount_cents, 1)
+  ON CONFLICT(spent_day, category_id) DO UPDATE
+    SET sum_cents = sum_cents + excluded.sum_cents, cnt = cnt + 1;
+END;
+"""
+
+# Перерахунок rollup з сирих рядків (міграція + команда rollup-rebuild).
+ROLLUP_REBUILD_SQL = """
+DELETE FROM expense_rollup;
+INSERT INTO expense_rollup (spent_day, category_id, sum_cents, cnt)
+SELECT spent_day, category_id, SUM(amount_cents), COUNT(*)
+FROM expenses
+GROUP BY spent_day, category_id;
+"""
+
+ROLLUP_REKEY_SQL = """
+DROP TRIGGER IF EXISTS trg_expense_rollup_ins;
+DROP TRIGGER IF EXISTS trg_expense_rollup_del;
+DROP TRIGGER IF EXISTS trg_expense_rollup_upd;
+DROP TABLE IF EXISTS expense_rollup;
+""" + ROLLUP_SQL + ROLLUP_REBUILD_SQL
+
+# import_key для рядків, що були до міграції №9 (старий import_expenses.py писав NULL —
+# і новий імпорт того ж CSV задублював би всю історію). occurrence — скільки таких самих
+# рядків (день, сума, категорія, коментар) з меншим id: у порядку вставки, як рахує імпорт.
+# OR IGNORE: якщо такий ключ уже є (історію вже задублювали), рядок лишається з NULL.
+IMPORT_KEY_BACKFILL = ChunkedUpdate(
+    table="expenses",
+    sql="""
+    UPDATE OR IGNORE expenses SET import_key = expense_import_key(
+      spent_date,
+      amount_cents,
+      COALESCE((SELECT name FROM categories WHERE categories.id = expenses.category_id), ''),
+      comment,
+      (SELECT COUNT(*) FROM expenses AS prev
+        WHERE prev.spent_day = expenses.spent_day
+          AND prev.category_id = expenses.category_id
+          AND prev.amount_cents = expenses.amount_cents
+          AND COALESCE(prev.comment, '') = COALESCE(expenses.comment, '')
+          AND prev.id < expenses.id)
+    )
+    WHERE id >= :lo AND id < :hi AND import_key IS NULL
+    """,
+    functions=(("expense_import_key", 5, import_key),),
+)
+
+FSM_STATE_DROP_SQL = """
+DROP INDEX IF EXISTS idx_fsm_state_updated_at;
+DROP TABLE IF EXISTS fsm_state;
+"""
+
+Migration = str | ChunkedUpdate
+
+# (версія, міграція). Версія = PRAGMA user_version після застосування.
+# Нові міграції — тільки додаємо в кінець, старі не редагуємо.
+MIGRATIONS: list[tuple[int, Migration]] = [
+    (1, SCHEMA_SQL),
+    (2, INDEXES_SQL),
+    (3, ROLLUP_V3_SQL + ROLLUP_REBUILD_V3_SQL),
+    (4, IMPORT_KEY_SQL),
+    (5, FSM_STATE_SQL),
+    (6, SPENT_DAY_SQL),
+    (7, SPENT_DAY_BACKFILL),
+    (8, DAY_INDEXES_SQL + ROLLUP_REKEY_SQL),
+    (9, IMPORT_KEY_BACKFILL),
+    (10, FSM_STATE_DROP_SQL),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def pending_migrations(
+    current_version: int, migrations: list[tuple[int, Migration]] = MIGRATIONS
+) -> list[tuple[int, Migration]]:
+    return [(v, m) for (v, m) in migrations if v > current_version]
+
+
+def migration_script(version: int, sql: str) -> str:
+    # кожна SQL-міграція атомарна: DDL + user_version в одній транзакції
+    return f"BEGIN;\n{sql}\nPRAGMA user_version = {version};\nCOMMIT;"
+
+
+def apply_migrations_sync(conn: sqlite3.Connection) -> None:
+    """Те саме, що Database.migrate, для синхронного sqlite3 (import_expenses.py)."""
+    current = int(conn.execute("PRAGMA user_version").fetchone()[0])
+    for version, migration in pending_migrations(current):
+        if isinstance(migration, ChunkedUpdate):
+            for name, nargs, fn in migration.functions:
+                conn.create_function(name, nargs, fn, deterministic=True)
+            max_rowid = conn.execute(f"SELECT COALESCE(MAX(rowid),0) FROM {migration.table}").fetchone()[0]
+            for params in migration.ranges(int(max_rowid)):
+                with conn:
+                    conn.execute(migration.sql, params)
+            conn.execute(f"PRAGMA user_version = {version}")
+        else:
+            conn.executescript(migration_script(version, migration))
+
+
+# (Database, reader) поточної snapshot-транзакції (див. Database.snapshot)
+_snapshot_reader: ContextVar[tuple["Database", aiosqlite.Connection] | None] = ContextVar(
+    "snapshot_reader", default=None
+)
+
+
+def _notify_statement(conn: aiosqlite.Connection, sql: str, params: Any, seconds: float) -> None:
+    ctx = _op_context.get()
+    for hook in statement_hooks:
+        try:
+            if ctx is not None:
+                ctx.run(hook, conn, sql, params, seconds)
+            else:
+                hook(conn, sql, params, seconds)
+        except Exception:
+            log.exception("Statement hook %r failed", hook)
+
+
+class TracedConnection:
+    """aiosqlite.Connection, що повідомляє statement_hooks про кожен запит (час execute)."""
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn: aiosqlite.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    async def execute(self, sql: str, parameters: Iterable[Any] | dict = ()) -> aiosqlite.Cursor:
+        if not statement_hooks:
+            return await self._conn.execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return await self._conn.execute(sql, parameters)
+        finally:
+            _notify_statement(self._conn, sql, parameters, time.perf_counter() - started)
+
+    async def executemany(self, sql: str, parameters: Iterable[Iterable[Any] | dict]) -> aiosqlite.Cursor:
+        if not statement_hooks:
+            return await self._conn.executemany(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return await self._conn.executemany(sql, parameters)
+        finally:
+            _notify_statement(self._conn, sql, None, time.perf_counter() - started)
+
+    async def executescript(self, sql_script: str) -> aiosqlite.Cursor:
+        if not statement_hooks:
+            return await self._conn.executescript(sql_script)
+        started = time.perf_counter()
+        try:
+            return await self._conn.executescript(sql_script)
+        finally:
+            _notify_statement(self._conn, sql_script, None, time.perf_counter() - started)
+
+
 class Database:
-    def __init__(self, path: str):
+    """
+    Один writer-з'єднання (self.conn: усі INSERT/UPDATE/DDL) +
+    пул read-only з'єднань у WAL-режимі (self.read() / fetchone / fetchall).
+    Читання не стоять у черзі за записами одного aiosqlite-потоку і навпаки.
+    read_pool_size=0 (або ":memory:") — все через writer, як раніше.
+    migrations — схема цієї БД (за замовчуванням — household'а, MIGRATIONS).
+
+    Записи — тільки через write() / execute_write() / executemany_write():
+    фоновий writer збирає все, що прийшло за commit_window_ms, в ОДНУ транзакцію
+    (group commit: один fsync на пачку), кожна операція — у своєму SAVEPOINT,
+    тож помилка однієї не відкочує інші.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        read_pool_size: int = 2,
+        commit_window_ms: float = 5.0,
+        max_batch: int = 256,
+        durability: str = "full",
+        migrations: list[tuple[int, Migration]] = MIGRATIONS,
+    ):
+        if durability not in DURABILITY_SYNCHRONOUS:
+            raise ValueError(f"Unknown durability {durability!r}, expected one of {sorted(DURABILITY_SYNCHRONOUS)}")
         self.path = path
+        self.read_pool_size = 0 if path == ":memory:" else max(0, read_pool_size)
+        self.commit_window = max(0.0, commit_window_ms) / 1000
+        self.max_batch = max(1, max_batch)
+        self.durability = durability
+        self.migrations = migrations
         self._conn: aiosqlite.Connection | None = None
+        self._readers: list[aiosqlite.Connection] = []
+        self._idle_readers: asyncio.Queue[aiosqlite.Connection] | None = None
+        self._write_queue: asyncio.Queue[tuple[WriteOp, asyncio.Future, Context] | None] | None = None
+        self._writer_task: asyncio.Task | None = None
+        # write() в польоті: поставлені в чергу, але ще не повернулись викликачу.
+        # Інкрементальні агрегати (services.forecast) не кешують прочитане, поки тут > 0.
+        self.pending_writes = 0
 
     async def connect(self) -> None:
-        self._conn = await aiosqlite.connect(self.path)
-        self._conn.row_factory = aiosqlite.Row
-        await self._conn.executescript(SCHEMA_SQL)
-        await self._conn.commit()
+        # isolation_level=None: транзакціями керує writer (BEGIN/SAVEPOINT/COMMIT), без неявних BEGIN
+        conn = await aiosqlite.connect(self.path, isolation_level=None)
+        conn.row_factory = aiosqlite.Row
+        self._conn = TracedConnection(conn)
+        if self.read_pool_size:
+            # WAL: читачі бачать останній commit і не блокують writer (і навпаки)
+            await self._conn.execute("PRAGMA journal_mode=WAL")
+        await self._conn.execute(f"PRAGMA synchronous={DURABILITY_SYNCHRONOUS[self.durability]}")
+        await self.migrate()
+
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer_loop(), name=f"db-writer:{self.path}")
+
+        if self.read_pool_size:
+            self._idle_readers = asyncio.Queue()
+            uri = Path(self.path).resolve().as_uri() + "?mode=ro"
+            # кожен reader — свій потік aiosqlite: відкриваємо паралельно (холодний старт)
+            for reader in await asyncio.gather(*(self._open_reader(uri) for _ in range(self.read_pool_size))):
+                self._readers.append(reader)
+                self._idle_readers.put_nowait(reader)
+
+    @staticmethod
+    async def _open_reader(uri: str) -> TracedConnection:
+        # isolation_level=None: транзакції тільки явні (snapshot)
+        raw_reader = await aiosqlite.connect(uri, uri=True, isolation_level=None)
+        raw_reader.row_factory = aiosqlite.Row
+        reader = TracedConnection(raw_reader)
+        await reader.execute("PRAGMA query_only=ON")
+        return reader
+
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        З'єднання для читання: reader поточного snapshot(), інакше вільний з пулу.
+        """
+        current = _snapshot_reader.get()
+        if current is not None and current[0] is self:
+            yield current[1]
+            return
+
+        if self._idle_readers is None:
+            yield self.conn
+            return
+
+        reader = await self._idle_readers.get()
+        try:
+            yield reader
+        finally:
+            self._idle_readers.put_nowait(reader)
+
+    @asynccontextmanager
+    async def snapshot(self) -> AsyncIterator[None]:
+        """
+        Усі читання (через read / fetchone / fetchall) всередині блоку — в одній
+        read-транзакції одного reader'а, тобто бачать один і той самий стан БД.
+        Вкладені snapshot() перевикористовують зовнішній.
+        """
+        current = _snapshot_reader.get()
+        if (current is not None and current[0] is self) or self._idle_readers is None:
+            yield
+            return
+
+        async with self.read() as reader:
+            await reader.execute("BEGIN")
+            token = _snapshot_reader.set((self, reader))
+            try:
+                yield
+            finally:
+                _snapshot_reader.reset(token)
+                await reader.execute("COMMIT")
+
+    async def fetchone(self, sql: str, params: Iterable[Any] | dict = ()) -> aiosqlite.Row | None:
+        async with self.read() as conn:
+            cur = await conn.execute(sql, params)
+            return await cur.fetchone()
+
+    async def fetchall(self, sql: str, params: Iterable[Any] | dict = ()) -> list[aiosqlite.Row]:
+        async with self.read() as conn:
+            cur = await conn.execute(sql, params)
+            return list(await cur.fetchall())
+
+    # ---------- writes (group commit) ----------
+    async def write(self, op: Callable[[aiosqlite.Connection], Awaitable[T]]) -> T:
+        """
+        Виконати op(writer_conn) у найближчій пачці. Повертає результат op
+        ПІСЛЯ commit'у пачки (або піднімає помилку op / commit'у).
+        """
+        if self._write_queue is None:
+            raise RuntimeError("DB writer is not running")
+        fut = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((op, fut, copy_context()))
+        self.pending_writes += 1
+        try:
+            return await fut
+        finally:
+            self.pending_writes -= 1
+
+    async def execute_write(self, sql: str, params: Iterable[Any] | dict = ()) -> int:
+        """Один INSERT/UPDATE/DELETE. Повертає lastrowid."""
+        async def op(conn: aiosqlite.Connection) -> int:
+            cur = await conn.execute(sql, params)
+            return int(cur.lastrowid or 0)
+        return await self.write(op)
+
+    async def executemany_write(self, sql: str, seq_of_params: Iterable[Iterable[Any] | dict]) -> None:
+        rows = list(seq_of_params)
+
+        async def op(conn: aiosqlite.Connection) -> None:
+            await conn.executemany(sql, rows)
+        await self.write(op)
+
+    async def _writer_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self._write_queue
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                break
+            batch = [item]
+
+            # добираємо все, що прийде за вікно (або вже лежить у черзі)
+            deadline = loop.time() + self.commit_window
+            while len(batch) < self.max_batch:
+                if not queue.empty():
+                    nxt = queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        nxt = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+
+            try:
+                await self._commit_batch(batch)
+            except Exception as e:
+                # writer не має вмирати: інакше всі наступні write() чекали б вічно
+                log.exception("DB writer: unexpected error in batch of %s", len(batch))
+                self._fail_batch(batch, e)
+
+    async def _commit_batch(self, batch: list[tuple[WriteOp, asyncio.Future, Context]]) -> None:
+        conn = self.conn
+        outcomes: list[tuple[asyncio.Future, Any, BaseException | None]] = []
+        try:
+            if conn.in_transaction:  # попередній ROLLBACK не вдався — добиваємо тут
+                await conn.execute("ROLLBACK")
+            await conn.execute("BEGIN IMMEDIATE")
+            for op, fut, ctx in batch:
+                await conn.execute("SAVEPOINT write_op")
+                token = _op_context.set(ctx)
+                try:
+                    result = await op(conn)
+                except Exception as e:
+                    _op_context.reset(token)
+                    await conn.execute("ROLLBACK TO write_op")
+                    await conn.execute("RELEASE write_op")
+                    outcomes.append((fut, None, e))
+                else:
+                    _op_context.reset(token)
+                    await conn.execute("RELEASE write_op")
+                    outcomes.append((fut, result, None))
+            await conn.execute("COMMIT")
+        except Exception as e:
+            log.exception("DB write batch of %s failed", len(batch))
+            try:
+                if conn.in_transaction:
+                    await conn.execute("ROLLBACK")
+            except Exception:
+                # викликачам — первинна помилка, не помилка відкату
+                log.exception("DB write batch rollback failed")
+            self._fail_batch(batch, e)
+            return
+
+        for fut, result, error in outcomes:
+            if fut.done():  # викликач міг бути скасований
+                continue
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
+
+    @staticmethod
+    def _fail_batch(batch: list[tuple[WriteOp, asyncio.Future, Context]], error: BaseException) -> None:
+        for _, fut, _ in batch:
+            if not fut.done():
+                fut.set_exception(error)
+
+    async def drain(self) -> None:
+        """
+        Дописати все, що вже в черзі, і зупинити writer (нові write() -> RuntimeError).
+        """
+        if self._write_queue is None:
+            return
+        queue, task = self._write_queue, self._writer_task
+        self._write_queue = None
+        queue.put_nowait(None)
+        if task:
+            await task
+        self._writer_task = None
+
+    async def data_version(self) -> int:
+        """
+        PRAGMA data_version writer-з'єднання. Змінюється лише від commit'ів ІНШИХ з'єднань;
+        readers цього процесу нічого не пишуть — тож це записи інших процесів
+        (import_expenses.py, maintenance.py, ручний sqlite3).
+        """
+        cur = await self.conn.execute("PRAGMA data_version")
+        row = await cur.fetchone()
+        return int(row[0])
+
+    async def schema_version(self) -> int:
+        cur = await self.conn.execute("PRAGMA user_version")
+        row = await cur.fetchone()
+        return int(row[0])
+
+    async def migrate(self) -> None:
+        """
+        Застосовує міграції, яких ще немає (PRAGMA user_version).
+        Якщо схема актуальна — жодного DDL, тільки один PRAGMA.
+        """
+        current = await self.schema_version()
+        if current >= self.migrations[-1][0]:
+            return
+
+        for version, migration in pending_migrations(current, self.migrations):
+            if isinstance(migration, ChunkedUpdate):
+                await self._run_chunked(migration)
+                await self.conn.execute(f"PRAGMA user_version = {version}")
+            else:
+                await self.conn.executescript(migration_script(version, migration))
+            log.info("DB %s migrated to schema v%s", self.path, version)
+
+    async def _run_chunked(self, migration: ChunkedUpdate) -> None:
+        cur = await self.conn.execute(f"SELECT COALESCE(MAX(rowid),0) FROM {migration.table}")
+        max_rowid = int((await cur.fetchone())[0])
+        for name, nargs, fn in migration.functions:
+            await self.conn.create_function(name, nargs, fn, deterministic=True)
+        started, done = time.monotonic(), 0
+        for params in migration.ranges(max_rowid):
+            await self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                await self.conn.execute(migration.sql, params)
+                await self.conn.execute("COMMIT")
+            except BaseException:
+                await self.conn.execute("ROLLBACK")
+                raise
+            done = min(params["hi"], max_rowid)
+            if time.monotonic() - started > 5:
+                log.info("DB %s backfill %s: %s/%s", self.path, migration.table, done, max_rowid)
+                started = time.monotonic()
 
     async def close(self) -> None:
+        await self.drain()
+        for reader in self._readers:
+            await reader.close()
+        self._readers.clear()
+        self._idle_readers = None
         if self._conn:
             await self._conn.close()
             self._conn = None
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from db import FSM_STATE_SQL, Database, Migration
+
+log = logging.getLogger(__name__)
+
+# схема БД FSM: тільки fsm_state, без таблиць витрат (Database(..., migrations=FSM_MIGRATIONS))
+FSM_MIGRATIONS: list[tuple[int, Migration]] = [(1, FSM_STATE_SQL)]
+
+
+@dataclass
+class _Record:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    touched: float = field(default_factory=time.time)
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM storage у таблиці fsm_state власної SQLite-БД бота: незавершені AddExpense /
+    AddCategory / MonthLimitsWizard переживають рестарт.
+
+    - Читання: з обмеженого in-memory LRU (cache_size). До БД — тільки перший раз
+      для ключа (у т.ч. "стану немає" теж кешується), тож звичайне повідомлення
+      не коштує жодного запиту.
+    - Запис: одразу в кеш, у БД — пачкою раз на flush_interval_s (write-behind).
+      Порожній стан (state=None, data={}) — DELETE замість UPSERT.
+    - TTL: ключі без змін довше ttl_s (кинуті на півдорозі діалоги) прибираються
+      і з кешу, і з БД.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        cache_size: int = 10_000,
+        ttl_s: float = 7 * 24 * 3600,
+        flush_interval_s: float = 1.0,
+    ):
+        self.db = db
+        self.cache_size = cache_size
+        self.ttl_s = ttl_s
+        self.flush_interval_s = flush_interval_s
+        self._cache: OrderedDict[str, _Record] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._flusher: asyncio.Task | None = None
+        self._last_expire = 0.0
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return ":".join(
+            str(part) if part is not None else ""
+            for part in (key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny)
+        )
+
+    # ---------- BaseStorage ----------
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get(self._key(key))
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(self._key(key), record)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._get(self._key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        record = await self._get(self._key(key))
+        record.data = dict(data)
+        self._mark_dirty(self._key(key), record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return dict((await self._get(self._key(key))).data)
+
+    async def close(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    # ---------- cache ----------
+    async def _get(self, skey: str) -> _Record:
+        record = self._cache.get(skey)
+        if record is not None:
+            self._cache.move_to_end(skey)
+            return record
+
+        row = await self.db.fetchone("SELECT state, data, updated_at FROM fsm_state WHERE key=?", (skey,))
+        # поки чекали БД, ключ міг з'явитися в кеші (свіжіший запис) — він головний
+        record = self._cache.get(skey)
+        if record is None:
+            if row is None:
+                record = _Record()
+            else:
+                record = _Record(state=row["state"], data=json.loads(row["data"]), touched=float(row["updated_at"]))
+            self._cache[skey] = record
+            self._evict_overflow()
+        return record
+
+    def _mark_dirty(self, skey: str, record: _Record) -> None:
+        record.touched = time.time()
+        self._dirty.add(skey)
+        self._cache.move_to_end(skey)
+
+    def _evict_overflow(self) -> None:
+        # брудні записи не витісняємо, поки не збережені (flush їх очистить)
+        if len(self._cache) <= self.cache_size:
+            return
+        for skey in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if skey not in self._dirty:
+                del self._cache[skey]
+
+    # ---------- persistence ----------
+    async def flush(self) -> None:
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+
+        upserts, deletes = [], []
+        for skey in dirty:
+            record = self._cache.get(skey)
+            if record is None:
+                continue
+            if record.state is None and not record.data:
+                deletes.append((skey,))
+            else:
+                upserts.append((skey, record.state, json.dumps(record.data, ensure_ascii=False), record.touched))
+
+        async def op(conn) -> None:
+            if upserts:
+                await conn.executemany(
+                    """
+                    INSERT INTO fsm_state (key, state, data, updated_at) VALUES (?,?,?,?)
+                    ON CONFLICT(key) DO UPDATE
+                      SET state=excluded.state, data=excluded.data, updated_at=excluded.updated_at
+                    """,
+                    upserts,
+                )
+            if deletes:
+                await conn.executemany("DELETE FROM fsm_state WHERE key=?", deletes)
+
+        try:
+            await self.db.write(op)
+        except Exception:
+            # не губимо: повторимо на наступному flush
+            self._dirty |= dirty
+            raise
+        self._evict_overflow()
+
+    async def expire(self) -> None:
+        """TTL: прибрати кинуті діалоги з кешу і з БД."""
+        cutoff = time.time() - self.ttl_s
+        for skey in [k for k, r in self._cache.items() if r.touched < cutoff and k not in self._dirty]:
+            del self._cache[skey]
+        await self.db.execute_write("DELETE FROM fsm_state WHERE updated_at < ?", (cutoff,))
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_s)
+            try:
+                await self.flush()
+                now = time.monotonic()
+                if now - self._last_expire >= min(self.ttl_s, 3600):
+                    self._last_expire = now
+                    await self.expire()
+            except Exception:
+                log.exception("FSM storage flush failed")
+
+    def start(self) -> None:
+        if self._flusher is None:
+            self._last_expire = time.monotonic()
+            self._flusher = asyncio.create_task(self._flush_loop(), name="fsm-storage-flush")
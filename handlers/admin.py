@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+
+from aiogram import Router, F
+from aiogram.types import Message
+
+from backup import BackupManager, BackupResult, list_backups
+from config import cfg
+from metrics import METRICS
+from outbox import Outbox
+from query_profiler import PROFILER
+
+router = Router()
+
+
+# /metrics — коротке зведення латентностей і вартості апдейтів (тільки ADMINS).
+# Повні гістограми — на METRICS_PORT у форматі Prometheus.
+@router.message(F.text == "/metrics", F.from_user.id.in_(cfg.admins))
+async def metrics_cmd(message: Message, outbox: Outbox):
+    st = outbox.stats
+    text = METRICS.summary() + (
+        f"\n\n📬 Outbox: надіслано {st.sent}, не доставлено {st.failed} (кинуто після повторів: {st.dropped}), "
+        f"повторів {st.retries} "
+        f"(429: {st.retry_after}), p95 доставки {st.percentile(.95) * 1000:.0f} мс"
+    )
+    await message.answer(text)
+
+
+# /queries [N] — топ-N форм SQL за сумарним часом (+ план, позначка повного SCAN expenses).
+@router.message(F.text.regexp(r"^/queries(?:\s+(\d+))?$"), F.from_user.id.in_(cfg.admins))
+async def queries_cmd(message: Message):
+    parts = (message.text or "").split()
+    n = min(30, int(parts[1])) if len(parts) > 1 else 10
+    text = PROFILER.dump(n)
+    # ліміт Telegram — 4096 символів
+    await message.answer(text if len(text) <= 4000 else text[:4000] + "\n…")
+
+
+def _backup_line(path: str, r: BackupResult | None, backup_dir: str) -> str:
+    if r is None:
+        # після рестарту процесу — хоча б останній файл на диску
+        files = list_backups(backup_dir, path)
+        if not files:
+            return f"• {path}: бекапів ще немає"
+        return f"• {path}: {os.path.basename(files[-1])}, {os.path.getsize(files[-1]) / 1e6:.1f} MB (до рестарту)"
+    if not r.ok:
+        return f"• {path}: ❌ {r.started_at:%d.%m %H:%M} — {r.error}"
+    return (
+        f"• {path}: ✅ {r.started_at:%d.%m %H:%M}, {r.db_bytes / 1e6:.1f} MB -> {r.gz_bytes / 1e6:.1f} MB gz, "
+        f"{r.duration_s:.1f} с"
+    )
+
+
+# /backup — стан останнього бекапу кожної БД; /backup now — зробити зараз.
+@router.message(F.text.regexp(r"^/backup(?:\s+now)?$"), F.from_user.id.in_(cfg.admins))
+async def backup_cmd(message: Message, backups: BackupManager | None = None):
+    if backups is None:
+        await message.answer("Бекапи не налаштовані")
+        return
+    if (message.text or "").split()[-1] == "now":
+        if backups.running:
+            await message.answer("⏳ Бекап уже йде")
+            return
+        await message.answer("⏳ Бекап…")
+        await backups.run()
+    lines = [f"💾 Бекапи ({backups.backup_dir}, зберігаємо {backups.keep}):"]
+    lines += [_backup_line(p, backups.last.get(p), backups.backup_dir) for p in backups.paths]
+    await message.answer("\n".join(lines))
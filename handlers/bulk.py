@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from aiogram import Router, F
+from aiogram.filters import StateFilter
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.fsm.context import FSMContext
+
+from repo import Repo
+from handlers.common import main_kb
+from services.formatting import money
+from services.bulk_entry import MAX_BULK_LINES, BulkLine, parse_bulk
+
+router = Router()
+
+PREVIEW_LINES = 40
+PREVIEW_ERRORS = 20
+
+HELP_TEXT = (
+    "Встав витрати, по одній на рядок:\n"
+    "DD.MM.YYYY сума категорія [коментар]\n"
+    "або через «;»: DD.MM.YYYY; сума; категорія; коментар\n\n"
+    "Дата необов'язкова — береться з попереднього рядка (перший — сьогодні).\n"
+    "Приклад:\n"
+    "12.05.2026 45,50 кафе kawiarnia\n"
+    "30 таксі\n"
+    "13.05.2026; 120; продукти; biedronka"
+)
+
+
+class BulkExpense(StatesGroup):
+    lines = State()
+    confirm = State()
+
+
+def bulk_confirm_kb(n: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text=f"✅ Зберегти {n}", callback_data="bulk:ok"),
+                InlineKeyboardButton(text="✖️ Скасувати", callback_data="bulk:cancel"),
+            ]
+        ]
+    )
+
+
+def render_bulk_preview(lines: list[BulkLine], categories: dict[int, object]) -> str:
+    ok = [l for l in lines if l.error is None]
+    errors = [l for l in lines if l.error is not None]
+
+    out = [f"📋 Перевір витрати ({len(ok)}):"]
+    for i, l in enumerate(ok[:PREVIEW_LINES], start=1):
+        c = categories[l.category_id]
+        dd, mm = l.spent_date[8:10], l.spent_date[5:7]
+        comment = f" — {l.comment}" if l.comment else ""
+        out.append(f"{i}. {dd}.{mm} · {money(l.amount_cents)} · {c['emoji']} {c['name']}{comment}")
+    if len(ok) > PREVIEW_LINES:
+        out.append(f"… і ще {len(ok) - PREVIEW_LINES}")
+    out.append(f"Разом: {money(sum(l.amount_cents for l in ok))}")
+
+    if errors:
+        out.append("")
+        out.append(f"⚠️ Помилки ({len(errors)}):")
+        for l in errors[:PREVIEW_ERRORS]:
+            out.append(f"рядок {l.line_no}: {l.error} — {l.text[:60]}")
+        if len(errors) > PREVIEW_ERRORS:
+            out.append(f"… і ще {len(errors) - PREVIEW_ERRORS}")
+        out.append("")
+        out.append("Виправ рядки і надішли все ще раз.")
+    return "\n".join(out)
+
+
+async def _preview(message: Message, state: FSMContext, repo: Repo, tz_name: str):
+    text = message.text or ""
+    if len(text.splitlines()) > MAX_BULK_LINES:
+        await message.answer(f"Забагато рядків: максимум {MAX_BULK_LINES} за раз.")
+        await state.set_state(BulkExpense.lines)
+        return
+
+    lines = await parse_bulk(text, repo, datetime.now(ZoneInfo(tz_name)).date())
+    if not lines:
+        await message.answer(HELP_TEXT)
+        await state.set_state(BulkExpense.lines)
+        return
+
+    categories = {int(c["id"]): c for c in await repo.list_categories()}
+    preview = render_bulk_preview(lines, categories)
+    ok = [l for l in lines if l.error is None]
+
+    if len(ok) < len(lines) or not ok:
+        await state.set_state(BulkExpense.lines)
+        await message.answer(preview)
+        return
+
+    # JSON-сумісно для FSM storage
+    await state.set_data({"rows": [[l.amount_cents, l.category_id, l.spent_date, l.comment] for l in ok]})
+    await state.set_state(BulkExpense.confirm)
+    await message.answer(preview, reply_markup=bulk_confirm_kb(len(ok)))
+
+
+@router.message(F.text == "/bulk")
+async def bulk_start(message: Message, state: FSMContext):
+    await state.clear()
+    await state.set_state(BulkExpense.lines)
+    await message.answer(HELP_TEXT)
+
+
+# кілька рядків поза flow — одразу превʼю (одне повідомлення = один рядок у handlers/expenses)
+@router.message(StateFilter(None), F.text.contains("\n"))
+@router.message(BulkExpense.lines, F.text)
+@router.message(BulkExpense.confirm, F.text)
+async def bulk_lines(message: Message, state: FSMContext, repo: Repo, tz_name: str):
+    await _preview(message, state, repo, tz_name)
+
+
+@router.callback_query(BulkExpense.confirm, F.data == "bulk:ok")
+async def bulk_confirm(cb: CallbackQuery, state: FSMContext, repo: Repo, tz_name: str):
+    rows = [tuple(r) for r in (await state.get_data()).get("rows", [])]
+    await state.clear()
+    await cb.message.edit_reply_markup(reply_markup=None)
+
+    n = await repo.add_expenses(rows, created_at_iso=datetime.now(ZoneInfo(tz_name)).isoformat())
+    await cb.message.answer(f"✅ Додано витрат: {n}, разом {money(sum(r[0] for r in rows))}", reply_markup=main_kb())
+    await cb.answer()
+
+
+@router.callback_query(BulkExpense.confirm, F.data == "bulk:cancel")
+async def bulk_cancel(cb: CallbackQuery, state: FSMContext):
+    await state.clear()
+    await cb.message.edit_reply_markup(reply_markup=None)
+    await cb.message.answer("Скасовано", reply_markup=main_kb())
+    await cb.answer()
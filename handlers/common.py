@@ -1,4 +1,11 @@
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
+
+from repo import Repo
 
 
 def main_kb() -> ReplyKeyboardMarkup:
@@ -11,3 +18,70 @@ def main_kb() -> ReplyKeyboardMarkup:
         ],
         resize_keyboard=True,
     )
+
+
+# ---------- category pickers ----------
+CATEGORY_COLUMNS = 2
+CATEGORY_PAGE_SIZE = 16  # кнопок категорій на сторінці (8 рядів по 2)
+
+
+@dataclass(frozen=True)
+class CategoryKeyboard:
+    """
+    Готові сторінки inline-клавіатури вибору категорії для одного набору категорій.
+    Курсор сторінки = id першої категорії на ній (callback "<page_prefix>:<id>"),
+    тож після додавання категорії старе повідомлення гортається без зсувів.
+    """
+    pages: tuple[InlineKeyboardMarkup, ...]
+    first_ids: tuple[int, ...]
+
+    def page(self, cursor: int | None = None) -> InlineKeyboardMarkup:
+        if cursor is None or not self.first_ids:
+            return self.pages[0]
+        return self.pages[max(0, bisect_right(self.first_ids, cursor) - 1)]
+
+
+def build_category_keyboard(
+    categories,
+    item_prefix: str,
+    page_prefix: str,
+    extra_rows: tuple[tuple[InlineKeyboardButton, ...], ...] = (),
+) -> CategoryKeyboard:
+    chunks = [categories[i:i + CATEGORY_PAGE_SIZE] for i in range(0, len(categories), CATEGORY_PAGE_SIZE)] or [()]
+    first_ids = tuple(int(chunk[0]["id"]) for chunk in chunks if chunk)
+
+    pages = []
+    for n, chunk in enumerate(chunks):
+        buttons = [
+            InlineKeyboardButton(text=f"{c['emoji']} {c['name']}", callback_data=f"{item_prefix}:{c['id']}")
+            for c in chunk
+        ]
+        rows = [buttons[i:i + CATEGORY_COLUMNS] for i in range(0, len(buttons), CATEGORY_COLUMNS)]
+        if len(chunks) > 1:
+            nav = []
+            if n > 0:
+                nav.append(InlineKeyboardButton(text="◀️", callback_data=f"{page_prefix}:{first_ids[n - 1]}"))
+            nav.append(InlineKeyboardButton(text=f"{n + 1}/{len(chunks)}", callback_data=f"{page_prefix}:{first_ids[n]}"))
+            if n + 1 < len(chunks):
+                nav.append(InlineKeyboardButton(text="▶️", callback_data=f"{page_prefix}:{first_ids[n + 1]}"))
+            rows.append(nav)
+        rows.extend(list(r) for r in extra_rows)
+        pages.append(InlineKeyboardMarkup(inline_keyboard=rows))
+    return CategoryKeyboard(pages=tuple(pages), first_ids=first_ids)
+
+
+async def category_keyboard(
+    repo: Repo,
+    item_prefix: str,
+    page_prefix: str,
+    extra_rows: tuple[tuple[InlineKeyboardButton, ...], ...] = (),
+) -> CategoryKeyboard:
+    """Клавіатура з repo.derived; перебудовується тільки коли змінився набір категорій."""
+    key = ("category_keyboard", item_prefix)
+    version = repo.categories_version
+    kb = repo.derived.get(key, version)
+    if kb is None:
+        kb = build_category_keyboard(await repo.list_categories(), item_prefix, page_prefix, extra_rows)
+        if version == repo.categories_version:
+            repo.derived.put(key, version, kb)
+    return kb
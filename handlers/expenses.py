@@ -4,13 +4,15 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 
 from aiogram import Router, F
+from aiogram.filters import StateFilter
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 
 from repo import Repo
 from services.formatting import parse_amount_to_cents, money
-from handlers.common import main_kb
+from services.quick_entry import QuickExpense, parse_quick_expense
+from handlers.common import CategoryKeyboard, category_keyboard, main_kb
 
 router = Router()
 
@@ -35,15 +37,14 @@ def date_choice_kb() -> InlineKeyboardMarkup:
     )
 
 
-def categories_kb(categories) -> InlineKeyboardMarkup:
-    rows = []
-    for c in categories:
-        rows.append([InlineKeyboardButton(text=f"{c['emoji']} {c['name']}", callback_data=f"cat:{c['id']}")])
-
-    # ✅ Додаємо кнопку "Додати категорію" внизу списку
-    rows.append([InlineKeyboardButton(text="➕ Додати категорію", callback_data="cat:add")])
-
-    return InlineKeyboardMarkup(inline_keyboard=rows)
+async def categories_kb(repo: Repo) -> CategoryKeyboard:
+    # ✅ Кнопка "Додати категорію" — внизу кожної сторінки
+    return await category_keyboard(
+        repo,
+        item_prefix="cat",
+        page_prefix="cat:pg",
+        extra_rows=((InlineKeyboardButton(text="➕ Додати категорію", callback_data="cat:add"),),),
+    )
 
 
 def comment_kb() -> InlineKeyboardMarkup:
@@ -91,6 +92,46 @@ async def add_expense_start(message: Message, state: FSMContext):
     await start_add_expense_flow(message, state, from_close_day=False)
 
 
+# ---------- QUICK ENTRY ----------
+# "45,50 кафе kawiarnia" / "вчора 120 транспорт": одне повідомлення -> один INSERT,
+# без FSM і без кнопок. Тільки поза іншими flow (StateFilter(None)).
+
+async def quick_expense_filter(message: Message, repo: Repo, tz_name: str) -> dict | bool:
+    if "\n" in message.text:
+        return False  # кілька рядків — це bulk (handlers/bulk.py)
+    quick = await parse_quick_expense(message.text, repo, datetime.now(ZoneInfo(tz_name)).date())
+    return {"quick": quick} if quick else False
+
+
+@router.message(StateFilter(None), F.text, quick_expense_filter)
+async def quick_expense(message: Message, state: FSMContext, repo: Repo, tz_name: str, quick: QuickExpense):
+    if quick.category_id is None:
+        # сума є, категорії немає — далі звичайний flow з вибору категорії
+        await state.set_data({"from_close_day": False, "spent_date": quick.spent_date, "amount_cents": quick.amount_cents})
+        await state.set_state(AddExpense.category)
+        kb = await categories_kb(repo)
+        hint = f"Не впізнав категорію «{quick.unmatched}». " if quick.unmatched else ""
+        await message.answer(f"{hint}Куди віднести {money(quick.amount_cents)}?", reply_markup=kb.page())
+        return
+
+    now = datetime.now(ZoneInfo(tz_name))
+    cat = await repo.get_category(quick.category_id)
+    await repo.add_expense(
+        amount_cents=quick.amount_cents,
+        category_id=quick.category_id,
+        spent_date=quick.spent_date,
+        created_at_iso=now.isoformat(),
+        comment=quick.comment,
+    )
+
+    lines = [f"✅ Додано: {money(quick.amount_cents)} → {cat['emoji']} {cat['name']}"]
+    if quick.spent_date != now.date().isoformat():
+        lines.append(f"📅 {quick.spent_date}")
+    if quick.comment:
+        lines.append(f"💬 {quick.comment}")
+    await message.answer("\n".join(lines))
+
+
 # ---------- DATE ----------
 
 @router.callback_query(AddExpense.date_choice, F.data == "dt:today")
@@ -136,8 +177,15 @@ async def add_expense_amount(message: Message, state: FSMContext, repo: Repo):
     await state.update_data(amount_cents=cents)
     await state.set_state(AddExpense.category)
 
-    cats = await repo.list_categories()
-    await message.answer("Куди віднести витрату?", reply_markup=categories_kb(cats))
+    kb = await categories_kb(repo)
+    await message.answer("Куди віднести витрату?", reply_markup=kb.page())
+
+
+@router.callback_query(AddExpense.category, F.data.startswith("cat:pg:"))
+async def expense_categories_page(cb: CallbackQuery, repo: Repo):
+    kb = await categories_kb(repo)
+    await cb.message.edit_reply_markup(reply_markup=kb.page(int(cb.data.rsplit(":", 1)[1])))
+    await cb.answer()
 
 
 @router.callback_query(AddExpense.category, F.data == "cat:add")
@@ -9,18 +9,15 @@ from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 
 from repo import Repo
-from handlers.common import main_kb
+from handlers.common import CategoryKeyboard, category_keyboard, main_kb
 from services.formatting import parse_amount_to_cents, money
 from services.budgeting import month_bounds
 
 router = Router()
 
 # --- inline keyboards ---
-def categories_pick_kb(categories) -> InlineKeyboardMarkup:
-    rows = []
-    for c in categories:
-        rows.append([InlineKeyboardButton(text=f"{c['emoji']} {c['name']}", callback_data=f"lim:pick:{c['id']}")])
-    return InlineKeyboardMarkup(inline_keyboard=rows)
+async def categories_pick_kb(repo: Repo) -> CategoryKeyboard:
+    return await category_keyboard(repo, item_prefix="lim:pick", page_prefix="lim:pg")
 
 def reuse_limits_kb() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
@@ -56,10 +53,16 @@ async def _current_year_month(repo: Repo, tz_name: str) -> tuple[int, int]:
 async def limits_menu(message: Message, state: FSMContext, repo: Repo, tz_name: str):
     await state.clear()
     year, month = await _current_year_month(repo, tz_name)
-    cats = await repo.list_categories()
-    await message.answer("Обери категорію:", reply_markup=categories_pick_kb(cats))
+    kb = await categories_pick_kb(repo)
+    await message.answer("Обери категорію:", reply_markup=kb.page())
     await state.update_data(year=year, month=month)
 
+@router.callback_query(F.data.startswith("lim:pg:"))
+async def limits_categories_page(cb: CallbackQuery, repo: Repo):
+    kb = await categories_pick_kb(repo)
+    await cb.message.edit_reply_markup(reply_markup=kb.page(int(cb.data.rsplit(":", 1)[1])))
+    await cb.answer()
+
 @router.callback_query(F.data.startswith("lim:pick:"))
 async def pick_category(cb: CallbackQuery, state: FSMContext, repo: Repo):
     data = await state.get_data()
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from aiogram import Router, F
+from aiogram.types import Message
+
+from repo import Repo
+from services.reports import build_daily_report, build_weekly_report, build_monthly_report
+
+router = Router()
+
+
+# /report [day|week|month] — ті самі звіти, що шле scheduler, але на вимогу.
+# Якщо з останньої побудови не було записів — текст віддається з кешу, без SQLite.
+@router.message(F.text.regexp(r"^/report(?:\s+(day|week|month))?$"))
+async def report_cmd(message: Message, repo: Repo, tz_name: str):
+    tz = ZoneInfo(tz_name)
+    now = datetime.now(tz)
+    parts = (message.text or "").split()
+    kind = parts[1] if len(parts) > 1 else "day"
+
+    if kind == "week":
+        text = await build_weekly_report(repo, tz, now)
+    elif kind == "month":
+        # поточний місяць на сьогодні (scheduler шле попередній місяць 1-го числа)
+        text = await build_monthly_report(repo, tz, now.year, now.month)
+    else:
+        text = await build_daily_report(repo, tz, now.date().isoformat())
+
+    await message.answer(text)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -9,10 +10,10 @@ from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.base import StorageKey
 
+from outbox import Outbox
 from repo import Repo
 from services.formatting import parse_amount_to_cents, money
 from handlers.common import main_kb
-from config import cfg
 from services.budgeting import month_bounds
 
 router = Router()
@@ -87,7 +88,9 @@ async def change_budget_start(message: Message, state: FSMContext, repo: Repo, t
 
 
 @router.message(SetMonthlyBudget.amount)
-async def set_budget_amount(message: Message, state: FSMContext, repo: Repo, tz_name: str):
+async def set_budget_amount(
+    message: Message, state: FSMContext, repo: Repo, tz_name: str, users: list[int], outbox: Outbox
+):
     cents = parse_amount_to_cents(message.text or "")
     if cents is None or cents <= 0:
         await message.answer("Введи коректну суму:")
@@ -98,10 +101,10 @@ async def set_budget_amount(message: Message, state: FSMContext, repo: Repo, tz_
     # 1) зберігаємо бюджет (перезаписуємо)
     await repo.set_monthly_budget(year, month, cents)
 
-    # 2) очищаємо state ВСІМ користувачам (aiogram v3 style)
+    # 2) очищаємо state ВСІМ користувачам household'у (aiogram v3 style)
     from aiogram.fsm.storage.base import StorageKey
 
-    for uid in cfg.users:
+    for uid in users:
         key = StorageKey(bot_id=message.bot.id, chat_id=uid, user_id=uid)
         await state.storage.set_state(key, None)
         await state.storage.set_data(key, {})
@@ -109,17 +112,12 @@ async def set_budget_amount(message: Message, state: FSMContext, repo: Repo, tz_
     # 3) очищаємо локальний state
     await state.clear()
 
-    # 4) повідомляємо обох
-    for uid in cfg.users:
+    # 4) повідомляємо обох (через Outbox: ліміти Telegram + повтори)
+    sends = []
+    for uid in users:
         if uid == message.from_user.id:
-            await message.bot.send_message(
-                uid,
-                f"✅ Бюджет на місяць встановлено: {money(cents)}",
-                reply_markup=main_kb(),
-            )
+            text = f"✅ Бюджет на місяць встановлено: {money(cents)}"
         else:
-            await message.bot.send_message(
-                uid,
-                f"ℹ️ Інший користувач встановив бюджет на місяць: {money(cents)}",
-                reply_markup=main_kb(),
-            )
\ No newline at end of file
+            text = f"ℹ️ Інший користувач встановив бюджет на місяць: {money(cents)}"
+        sends.append(outbox.send(uid, text, reply_markup=main_kb()))
+    await asyncio.gather(*sends)
\ No newline at end of file
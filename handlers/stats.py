@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from aiogram import Router, F
+from aiogram.types import Message
+
+from repo import Repo
+
+router = Router()
+
+STATS_HELP = (
+    "/stats — витрати по місяцях (12)\n"
+    "/stats quarters — по кварталах (8) з трендом\n"
+    "/stats year [YYYY] — рік по категоріях\n"
+    "/stats weekdays — середнє за день тижня\n"
+    "/stats rolling [N] — ковзна сума за N днів (30)"
+)
+
+
+# /stats ... — аналітика по всій історії з колонок у пам'яті (services/analytics), без нового SQL
+@router.message(F.text.regexp(r"^/stats(?:\s+(\w+))?(?:\s+(\d+))?$"))
+async def stats_cmd(message: Message, repo: Repo, tz_name: str):
+    # services.analytics тягне NumPy (~0.1 с імпорту) — тільки на першому /stats, не на старті бота
+    from services.analytics import stats_months, stats_quarters, stats_rolling, stats_weekdays, stats_year
+
+    today = datetime.now(ZoneInfo(tz_name)).date()
+    parts = (message.text or "").split()
+    kind = parts[1] if len(parts) > 1 else "months"
+    arg = int(parts[2]) if len(parts) > 2 else None
+
+    if kind == "months":
+        text = await stats_months(repo, today)
+    elif kind == "quarters":
+        text = await stats_quarters(repo, today)
+    elif kind == "year" and (arg is None or 1 <= arg <= 9999):  # date() приймає лише 1..9999
+        text = await stats_year(repo, arg or today.year, today)
+    elif kind == "weekdays":
+        text = await stats_weekdays(repo, today)
+    elif kind == "rolling":
+        text = await stats_rolling(repo, today, max(1, min(arg or 30, 365)))
+    else:
+        text = STATS_HELP
+
+    await message.answer(text)
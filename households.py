@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable
+
+from db import Database
+from repo import Repo
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Household:
+    """Окремий бюджет (сім'я): свої користувачі і свій SQLite-файл."""
+    name: str
+    db_path: str
+    users: tuple[int, ...]
+
+
+@dataclass
+class _OpenHousehold:
+    repo: Repo
+    leases: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    external_checked_at: float = float("-inf")  # остання Repo.sync_external_writes
+
+
+class HouseholdManager:
+    """
+    Telegram user -> household -> Repo над власним SQLite-файлом.
+
+    Відкриті Database тримаються в LRU (не більше max_open); household без активних
+    lease'ів закривається, якщо його витісняють або він простоює довше idle_close_s.
+    Кожен household має свій writer/пул читачів/кеші, тож домогосподарства
+    не конкурують за один файл і одну чергу записів.
+
+    Записи інших процесів (Repo.sync_external_writes) перевіряються на lease, але не
+    частіше, ніж раз на external_check_s на household: перевірка йде через writer-з'єднання
+    і стоїть за його пачками commit'ів, тож read-only апдейти її здебільшого не чекають.
+    """
+
+    def __init__(
+        self,
+        households: list[Household],
+        open_db: Callable[[str], Awaitable[Database]],
+        max_open: int = 32,
+        idle_close_s: float = 600.0,
+        external_check_s: float = 1.0,
+    ):
+        self.households = {h.name: h for h in households}
+        self._by_user = {uid: h for h in households for uid in h.users}
+        self._open_db = open_db
+        self.max_open = max(1, max_open)
+        self.idle_close_s = idle_close_s
+        self.external_check_s = max(0.0, external_check_s)
+        self._open: OrderedDict[str, _OpenHousehold] = OrderedDict()
+        self._opening: dict[str, asyncio.Lock] = {}
+        self._sweeper: asyncio.Task | None = None
+
+    def household_for_user(self, user_id: int) -> Household | None:
+        return self._by_user.get(user_id)
+
+    @asynccontextmanager
+    async def lease(self, household: Household) -> AsyncIterator[Repo]:
+        """
+        Repo household'у на час обробки (апдейту / job'а).
+        Поки lease активний, Database не буде закрито ні LRU, ні idle-sweeper'ом.
+        """
+        entry = await self._acquire(household)
+        try:
+            now = time.monotonic()
+            if now - entry.external_checked_at >= self.external_check_s:
+                entry.external_checked_at = now  # паралельні апдейти не стають у ту саму чергу
+                await entry.repo.sync_external_writes()
+            yield entry.repo
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+
+    async def _acquire(self, household: Household) -> _OpenHousehold:
+        entry = self._open.get(household.name)
+        if entry is None:
+            lock = self._opening.setdefault(household.name, asyncio.Lock())
+            async with lock:
+                entry = self._open.get(household.name)
+                if entry is None:
+                    await self._evict_lru()
+                    db = await self._open_db(household.db_path)
+                    entry = _OpenHousehold(repo=Repo(db))
+                    self._open[household.name] = entry
+                    log.info("Household %s opened (%s)", household.name, household.db_path)
+
+        self._open.move_to_end(household.name)
+        entry.leases += 1
+        entry.last_used = time.monotonic()
+        return entry
+
+    async def _evict_lru(self) -> None:
+        # звільняємо місце під новий household; зайняті (leases > 0) не чіпаємо
+        while len(self._open) >= self.max_open:
+            victim = next((name for name, e in self._open.items() if e.leases == 0), None)
+            if victim is None:
+                return
+            await self._close(victim)
+
+    async def _close(self, name: str) -> None:
+        entry = self._open.pop(name)
+        await entry.repo.db.drain()
+        await entry.repo.db.close()
+        log.info("Household %s closed", name)
+
+    async def close_idle(self) -> None:
+        now = time.monotonic()
+        for name, entry in list(self._open.items()):
+            if entry.leases == 0 and now - entry.last_used >= self.idle_close_s:
+                await self._close(name)
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_close_s / 2))
+            try:
+                await self.close_idle()
+            except Exception:
+                log.exception("Household idle sweep failed")
+
+    async def warm_up(self, prime: Callable[[Repo], Awaitable[None]] | None = None) -> None:
+        """
+        Відкрити БД household'ів (міграції, пул читачів) і прогріти кеші Repo заздалегідь,
+        щоб перший апдейт не платив за це. Не більше max_open — інакше LRU витіснить прогріте.
+        """
+        for household in list(self.households.values())[: self.max_open]:
+            try:
+                async with self.lease(household) as repo:
+                    if prime is not None:
+                        await prime(repo)
+            except Exception:
+                log.exception("Household %s warm-up failed", household.name)
+
+    def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop(), name="households-idle-sweeper")
+
+    async def close(self) -> None:
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+        for name in list(self._open):
+            await self._close(name)
+
+
+def households_from_config(households: dict[str, list[int]], users: list[int], db_path: str, db_dir: str) -> list[Household]:
+    """
+    HOUSEHOLDS не задано -> один household "default" (USERS + DB_PATH), як було.
+    Інакше — кожен household у власному файлі DB_DIR/<name>.sqlite3.
+    """
+    if not households:
+        return [Household(name="default", db_path=db_path, users=tuple(users))]
+    return [
+        Household(name=name, db_path=os.path.join(db_dir, f"{name}.sqlite3"), users=tuple(uids))
+        for name, uids in households.items()
+    ]
@@ -1,7 +1,28 @@
+"""
+Імпорт витрат з CSV (spent_date,amount_zl,category,comment).
+
+Потоковий: файл читається построково, вставка — executemany пачками по --chunk-size
+рядків, одна транзакція на пачку. Пам'ять не залежить від розміру файлу.
+
+Ідемпотентний: кожен рядок отримує import_key (хеш вмісту), повторний запуск
+на тому ж файлі нічого не дублює.
+
+Можна запускати поруч з живим ботом: WAL + busy timeout, короткі транзакції.
+Бот помічає імпорт сам (PRAGMA data_version, Repo.sync_external_writes) і скидає кеші.
+
+    python import_expenses.py [--csv expenses_import.csv] [--db db.sqlite3] [--chunk-size 5000]
+"""
+import argparse
 import csv
 import sqlite3
+import sys
+import time
+from datetime import date, datetime
+from collections import OrderedDict
 from decimal import Decimal, InvalidOperation
-from datetime import datetime
+from typing import Iterator
+
+from db import SCHEMA_VERSION, apply_migrations_sync, import_key
 
 DB_PATH = "db.sqlite3"
 CSV_PATH = "expenses_import.csv"
@@ -14,6 +35,12 @@ CATEGORY_SEED = {
 
 SKIP_CATEGORIES = {"Накопичення"}  # ти просив прибрати цю логіку на MVP
 
+REQUIRED_COLUMNS = {"spent_date", "amount_zl", "category", "comment"}
+
+RECENT_DAYS = 64  # дат з лічильниками однакових рядків у пам'яті (решта — у spill, див. DayCounters)
+
+MAX_SKIPPED_DETAILS = 50  # деталі пропущених рядків — тільки перші N (решта лише рахуємо)
+
 
 def money_to_cents(s: str) -> int:
     s = (s or "").strip().replace(" ", "")
@@ -27,93 +54,261 @@ def money_to_cents(s: str) -> int:
     return cents
 
 
-def ensure_category(conn: sqlite3.Connection, name: str) -> int:
-    cur = conn.execute("SELECT id FROM categories WHERE name=? AND is_active=1", (name,))
-    row = cur.fetchone()
-    if row:
-        return int(row[0])
+class CategoryResolver:
+    """
+    name -> id з кешем: один SELECT на старті замість SELECT на кожен рядок.
+    Відсутні категорії створюються тільки з CATEGORY_SEED.
+    """
 
-    meta = CATEGORY_SEED.get(name)
-    if not meta:
-        # невідома категорія -> не створюємо автоматично, хай користувач вирішить
-        raise KeyError(f"Unknown category {name!r} (not in DB and not in CATEGORY_SEED)")
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.ids: dict[str, int] = {}
+        for cid, name in conn.execute("SELECT id, name FROM categories WHERE is_active=1 ORDER BY id"):
+            self.ids.setdefault(name, int(cid))  # дубль назви -> перша (найстаріша) категорія
 
-    cur = conn.execute(
-        "INSERT INTO categories (name, emoji, kind, limit_cents, is_active) VALUES (?,?,?,?,1)",
-        (name, meta["emoji"], meta["kind"], meta["limit_cents"]),
-    )
-    return int(cur.lastrowid)
+    def resolve(self, name: str) -> int:
+        cid = self.ids.get(name)
+        if cid is not None:
+            return cid
 
+        meta = CATEGORY_SEED.get(name)
+        if not meta:
+            # невідома категорія -> не створюємо автоматично, хай користувач вирішить
+            raise KeyError(f"Unknown category {name!r} (not in DB and not in CATEGORY_SEED)")
 
-def main():
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO categories (name, emoji, kind, limit_cents, is_active) VALUES (?,?,?,?,1)",
+                (name, meta["emoji"], meta["kind"], meta["limit_cents"]),
+            )
+        self.ids[name] = int(cur.lastrowid)
+        return self.ids[name]
 
-    imported = 0
-    skipped = 0
-    skipped_rows = []
 
-    with open(CSV_PATH, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        required = {"spent_date", "amount_zl", "category", "comment"}
-        if set(reader.fieldnames or []) != required:
-            raise SystemExit(
-                f"CSV header mismatch.\nExpected: {required}\nGot: {reader.fieldnames}"
-            )
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.skipped_rows: list[tuple[int, str, str]] = []
+        self.started = time.monotonic()
+
+    def skip(self, line_no: int, category: str, reason: str) -> None:
+        self.skipped += 1
+        if len(self.skipped_rows) < MAX_SKIPPED_DETAILS:
+            self.skipped_rows.append((line_no, category, reason))
 
-        for i, row in enumerate(reader, start=2):  # 2 = line after header
-            spent_date = (row["spent_date"] or "").strip()
-            category = (row["category"] or "").strip()
-            comment = (row["comment"] or "").strip() or None
-
-            if category in SKIP_CATEGORIES:
-                skipped += 1
-                skipped_rows.append((i, category, "SKIP_CATEGORIES"))
-                continue
-
-            # validate date YYYY-MM-DD
-            try:
-                datetime.strptime(spent_date, "%Y-%m-%d")
-            except Exception:
-                skipped += 1
-                skipped_rows.append((i, category, f"Bad date {spent_date!r}"))
-                continue
-
-            try:
-                amount_cents = money_to_cents(row["amount_zl"])
-            except Exception as e:
-                skipped += 1
-                skipped_rows.append((i, category, f"Bad amount {row['amount_zl']!r}: {e}"))
-                continue
-
-            try:
-                category_id = ensure_category(conn, category)
-            except KeyError as e:
-                skipped += 1
-                skipped_rows.append((i, category, str(e)))
-                continue
-
-            created_at = datetime.now().isoformat(timespec="seconds")
-
-            conn.execute(
-                """
-                INSERT INTO expenses (amount_cents, category_id, spent_date, created_at, comment)
-                VALUES (?,?,?,?,?)
-                """,
-                (amount_cents, category_id, spent_date, created_at, comment),
+    def progress_line(self) -> str:
+        elapsed = max(1e-9, time.monotonic() - self.started)
+        return (
+            f"read={self.read} imported={self.imported} duplicates={self.duplicates} "
+            f"skipped={self.skipped} ({self.read / elapsed:,.0f} rows/s)"
+        )
+
+
+class DayCounters:
+    """
+    Скільки разів у кожну дату вже траплявся однаковий рядок (amount, category, comment).
+
+    У пам'яті — лічильники RECENT_DAYS останніх дат (LRU); витіснені дати скидаються
+    у тимчасову SQLite-БД (sqlite3.connect("") — файл, що зникає при close) і
+    повертаються звідти, якщо дата трапиться знову. Тож підрахунок точний і для
+    невідсортованого CSV, а пам'ять обмежена.
+    """
+
+    def __init__(self, recent_days: int = RECENT_DAYS):
+        self.recent_days = recent_days
+        self._recent: OrderedDict[str, dict[tuple, int]] = OrderedDict()
+        self._spilled: set[str] = set()
+        self._spill = sqlite3.connect("")
+        self._spill.execute(
+            "CREATE TABLE seen (day TEXT, amount INTEGER, category TEXT, comment TEXT, n INTEGER)"
+        )
+        self._spill.execute("CREATE INDEX idx_seen_day ON seen(day)")
+
+    def next_occurrence(self, spent_date: str, content: tuple) -> int:
+        seen = self._recent.get(spent_date)
+        if seen is None:
+            seen = self._recent[spent_date] = self._load(spent_date)
+            if len(self._recent) > self.recent_days:
+                self._store(*self._recent.popitem(last=False))
+        else:
+            self._recent.move_to_end(spent_date)
+        occurrence = seen.get(content, 0)
+        seen[content] = occurrence + 1
+        return occurrence
+
+    def _load(self, spent_date: str) -> dict[tuple, int]:
+        if spent_date not in self._spilled:
+            return {}
+        self._spilled.discard(spent_date)
+        with self._spill:
+            rows = self._spill.execute(
+                "SELECT amount, category, comment, n FROM seen WHERE day=?", (spent_date,)
+            ).fetchall()
+            self._spill.execute("DELETE FROM seen WHERE day=?", (spent_date,))
+        return {(amount, category, comment): n for amount, category, comment, n in rows}
+
+    def _store(self, spent_date: str, seen: dict[tuple, int]) -> None:
+        with self._spill:
+            self._spill.executemany(
+                "INSERT INTO seen (day, amount, category, comment, n) VALUES (?,?,?,?,?)",
+                [(spent_date, *content, n) for content, n in seen.items()],
             )
-            imported += 1
+        self._spilled.add(spent_date)
+
+    def close(self) -> None:
+        self._spill.close()
+
+
+def parse_rows(
+    reader: csv.DictReader, categories: CategoryResolver, stats: ImportStats, created_at: str
+) -> Iterator[tuple]:
+    """
+    Рядки CSV -> кортежі для INSERT. Невалідні рядки пропускаються (stats.skip).
+
+    occurrence (номер однакового рядка в межах дати) рахує DayCounters — точно,
+    незалежно від порядку рядків у файлі.
+    """
+    counters = DayCounters()
+    try:
+        yield from _parse_rows(reader, categories, stats, created_at, counters)
+    finally:
+        counters.close()
+
+
+def _parse_rows(
+    reader: csv.DictReader, categories: CategoryResolver, stats: ImportStats, created_at: str, counters: DayCounters
+) -> Iterator[tuple]:
+
+    for i, row in enumerate(reader, start=2):  # 2 = line after header
+        stats.read += 1
+        spent_date = (row["spent_date"] or "").strip()
+        category = (row["category"] or "").strip()
+        comment = (row["comment"] or "").strip() or None
+
+        if category in SKIP_CATEGORIES:
+            stats.skip(i, category, "SKIP_CATEGORIES")
+            continue
+
+        # validate date YYYY-MM-DD
+        try:
+            if len(spent_date) != 10:
+                raise ValueError
+            day = date.fromisoformat(spent_date)
+        except ValueError:
+            stats.skip(i, category, f"Bad date {spent_date!r}")
+            continue
+
+        try:
+            amount_cents = money_to_cents(row["amount_zl"])
+        except Exception as e:
+            stats.skip(i, category, f"Bad amount {row['amount_zl']!r}: {e}")
+            continue
+
+        try:
+            category_id = categories.resolve(category)
+        except KeyError as e:
+            stats.skip(i, category, str(e))
+            continue
+
+        occurrence = counters.next_occurrence(spent_date, (amount_cents, category, comment))
+
+        yield (
+            amount_cents,
+            category_id,
+            spent_date,
+            day.toordinal(),
+            created_at,
+            comment,
+            import_key(spent_date, amount_cents, category, comment, occurrence),
+        )
+
+
+def chunked(rows: Iterator[tuple], size: int) -> Iterator[list[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def connect(db_path: str, busy_timeout_ms: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=busy_timeout_ms / 1000)
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    # схема могла ще не доїхати (бот не запускався після оновлення)
+    current = int(conn.execute("PRAGMA user_version").fetchone()[0])
+    if current < SCHEMA_VERSION:
+        apply_migrations_sync(conn)
+    return conn
+
+
+def run_import(csv_path: str, db_path: str, chunk_size: int, busy_timeout_ms: int) -> ImportStats:
+    conn = connect(db_path, busy_timeout_ms)
+    stats = ImportStats()
+    # одна мітка на весь запуск: created_at = "коли імпортовано"
+    created_at = datetime.now().isoformat(timespec="seconds")
+
+    try:
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            missing = REQUIRED_COLUMNS - set(reader.fieldnames or [])
+            if missing:
+                raise SystemExit(
+                    f"CSV header mismatch.\nExpected: {REQUIRED_COLUMNS}\nGot: {reader.fieldnames}"
+                )
+
+            categories = CategoryResolver(conn)
+            rows = parse_rows(reader, categories, stats, created_at)
+
+            for chunk in chunked(rows, chunk_size):
+                with conn:  # одна транзакція на пачку
+                    cur = conn.executemany(
+                        """
+                        INSERT OR IGNORE INTO expenses
+                          (amount_cents, category_id, spent_date, spent_day, created_at, comment, import_key)
+                        VALUES (?,?,?,?,?,?,?)
+                        """,
+                        chunk,
+                    )
+                # rowcount = реально вставлені рядки (без тригерних змін rollup, без IGNORE-дублікатів)
+                inserted = cur.rowcount
+                stats.imported += inserted
+                stats.duplicates += len(chunk) - inserted
+                print(stats.progress_line(), file=sys.stderr)
+    finally:
+        conn.close()
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import expenses from CSV")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--chunk-size", type=int, default=5000, help="рядків на транзакцію")
+    parser.add_argument("--busy-timeout-ms", type=int, default=10_000)
+    args = parser.parse_args()
 
-    conn.commit()
-    conn.close()
+    stats = run_import(args.csv, args.db, max(1, args.chunk_size), args.busy_timeout_ms)
 
-    print(f"Imported: {imported}")
-    print(f"Skipped:  {skipped}")
+    print(f"Imported:   {stats.imported}")
+    print(f"Duplicates: {stats.duplicates}")
+    print(f"Skipped:    {stats.skipped}")
 
-    if skipped_rows:
+    if stats.skipped_rows:
         print("\nSkipped rows (line, category, reason):")
-        for line_no, cat, reason in skipped_rows:
+        for line_no, cat, reason in stats.skipped_rows:
             print(f"  - {line_no}: {cat} -> {reason}")
+        if stats.skipped > len(stats.skipped_rows):
+            print(f"  ... and {stats.skipped - len(stats.skipped_rows)} more")
 
 
 if __name__ == "__main__":
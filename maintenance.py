@@ -0,0 +1,102 @@
+"""
+Сервісні команди для БД (запускати поруч з ботом):
+
+    python maintenance.py rollup-verify    # звірити expense_rollup з сирими expenses
+    python maintenance.py rollup-rebuild   # перерахувати expense_rollup з нуля
+    python maintenance.py backup           # бекап БД у BACKUP_DIR (можна при працюючому боті)
+    python maintenance.py restore backups/db-20260101T040000.sqlite3.gz   # бота спершу зупинити
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+
+from backup import backup_database, list_backups, restore_backup
+from config import cfg
+from db import Database
+from repo import Repo
+
+
+async def rollup_verify(repo: Repo) -> int:
+    diffs = await repo.verify_rollup()
+    if not diffs:
+        print("Rollup OK")
+        return 0
+
+    print(f"Rollup mismatches: {len(diffs)}")
+    print("  (spent_date, category_id): raw sum/cnt vs rollup sum/cnt")
+    for spent_date, cid, raw_sum, raw_cnt, r_sum, r_cnt in diffs:
+        print(f"  - ({spent_date}, {cid}): {raw_sum}/{raw_cnt} vs {r_sum}/{r_cnt}")
+    return 1
+
+
+async def rollup_rebuild(repo: Repo) -> int:
+    await repo.rebuild_rollup()
+    print("Rollup rebuilt")
+    return await rollup_verify(repo)
+
+
+COMMANDS = {
+    "rollup-verify": rollup_verify,
+    "rollup-rebuild": rollup_rebuild,
+}
+
+
+def backup(db_path: str) -> int:
+    result = backup_database(
+        db_path, cfg.backup_dir, cfg.backup_keep, cfg.backup_pages_per_step, cfg.backup_step_sleep_ms / 1000
+    )
+    if not result.ok:
+        print(f"Backup failed: {result.error}")
+        return 1
+    print(
+        f"Backup OK: {result.path}\n"
+        f"  {result.pages} pages, {result.db_bytes / 1e6:.1f} MB -> {result.gz_bytes / 1e6:.1f} MB gz, "
+        f"{result.duration_s:.2f}s"
+    )
+    return 0
+
+
+def restore(db_path: str, backup_path: str | None) -> int:
+    if backup_path is None:
+        backups = list_backups(cfg.backup_dir, db_path)
+        if not backups:
+            print(f"No backups for {db_path} in {cfg.backup_dir}")
+            return 1
+        backup_path = backups[-1]
+    if not os.path.exists(backup_path):
+        print(f"No such file: {backup_path}")
+        return 1
+    saved = restore_backup(backup_path, db_path)
+    print(f"Restored {db_path} from {backup_path}")
+    if saved:
+        print(f"  previous DB saved to {saved}")
+    return 0
+
+
+async def run(command: str, db_path: str) -> int:
+    db = Database(db_path)
+    await db.connect()
+    try:
+        return await COMMANDS[command](Repo(db))
+    finally:
+        await db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget bot DB maintenance")
+    parser.add_argument("command", choices=sorted([*COMMANDS, "backup", "restore"]))
+    parser.add_argument("file", nargs="?", help="restore: .sqlite3.gz (за замовчуванням — найновіший у BACKUP_DIR)")
+    parser.add_argument("--db", default=cfg.db_path, help="шлях до SQLite (за замовчуванням DB_PATH)")
+    args = parser.parse_args()
+    # бекап/відновлення — на рівні файлу, без Database (міграції, writer)
+    if args.command == "backup":
+        raise SystemExit(backup(args.db))
+    if args.command == "restore":
+        raise SystemExit(restore(args.db, args.file))
+    raise SystemExit(asyncio.run(run(args.command, args.db)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterator, Mapping
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from db import statement_hooks
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+
+class Histogram:
+    """Prometheus-гістограма (фіксовані bucket'и); quantile — як histogram_quantile()."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # останній — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # у +Inf — більше нічого не знаємо
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def prometheus(self, name: str, labels: str = "") -> list[str]:
+        sep = "," if labels else ""
+        lines, cumulative = [], 0
+        for le, n in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+@dataclass
+class UpdateCost:
+    """Скільки коштував один апдейт (заповнюється hook'ами по ходу обробки)."""
+    handler: str = "unhandled"
+    sql_count: int = 0
+    sql_seconds: float = 0.0
+    fsm_seconds: float = 0.0
+    api_count: int = 0
+    api_seconds: float = 0.0
+
+
+_current_cost: ContextVar[UpdateCost | None] = ContextVar("update_cost", default=None)
+
+
+class StartupTimer:
+    """
+    Холодний старт по фазах: phase() — тривалість кроку, mark() — момент від старту
+    процесу. Головне число — first_update: рестарт -> перша оброблена відповідь.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.marks: dict[str, float] = {}
+
+    def begin(self, started: float) -> None:
+        """Старт процесу (perf_counter на початку bot.py, до важких імпортів); до зараз — фаза imports."""
+        self.started = started
+        self.phases["imports"] = time.perf_counter() - started
+        log.info("Startup phase imports: %.3fs", self.phases["imports"])
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - t0
+            log.info("Startup phase %s: %.3fs", name, self.phases[name])
+
+    def mark(self, name: str) -> None:
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.started
+            log.info("Startup: %s at %.3fs", name, self.marks[name])
+
+    def summary(self) -> str:
+        parts = [f"{name} {seconds * 1000:.0f}" for name, seconds in self.phases.items()]
+        marks = ", ".join(f"{name} @{seconds:.2f}s" for name, seconds in self.marks.items())
+        return f"🚀 Старт (мс): {', '.join(parts) or '—'}" + (f"; {marks}" if marks else "")
+
+
+def current_cost() -> UpdateCost | None:
+    return _current_cost.get()
+
+
+class Metrics:
+    def __init__(self):
+        self.handler_seconds: dict[str, Histogram] = {}
+        self.errors: dict[str, int] = {}
+        self.sql_statements = Histogram(COUNT_BUCKETS)  # на апдейт
+        self.sql_seconds = Histogram()  # на апдейт
+        self.fsm_seconds = Histogram()  # на апдейт
+        self.api_seconds: dict[str, Histogram] = {}  # на виклик Bot API, за методом
+        self.startup = StartupTimer()
+
+    def begin_update(self) -> tuple[UpdateCost, Any]:
+        cost = UpdateCost()
+        return cost, _current_cost.set(cost)
+
+    def end_update(self, cost: UpdateCost, token: Any, seconds: float, failed: bool) -> None:
+        _current_cost.reset(token)
+        self.startup.mark("first_update")
+        self.handler_seconds.setdefault(cost.handler, Histogram()).observe(seconds)
+        if failed:
+            self.errors[cost.handler] = self.errors.get(cost.handler, 0) + 1
+        self.sql_statements.observe(cost.sql_count)
+        self.sql_seconds.observe(cost.sql_seconds)
+        self.fsm_seconds.observe(cost.fsm_seconds)
+
+    def on_statement(self, conn: Any, sql: str, params: Any, seconds: float) -> None:
+        cost = _current_cost.get()
+        if cost is not None:
+            cost.sql_count += 1
+            cost.sql_seconds += seconds
+
+    def on_api_call(self, method: str, seconds: float) -> None:
+        self.api_seconds.setdefault(method, Histogram()).observe(seconds)
+        cost = _current_cost.get()
+        if cost is not None:
+            cost.api_count += 1
+            cost.api_seconds += seconds
+
+    def install(self) -> None:
+        """Підписатися на SQL усіх Database (db.statement_hooks)."""
+        if self.on_statement not in statement_hooks:
+            statement_hooks.append(self.on_statement)
+
+    # ---------- export ----------
+    def prometheus(self) -> str:
+        lines = ["# TYPE bot_update_seconds histogram"]
+        for handler, hist in sorted(self.handler_seconds.items()):
+            lines += hist.prometheus("bot_update_seconds", f'handler="{handler}"')
+        lines.append("# TYPE bot_update_errors_total counter")
+        for handler, n in sorted(self.errors.items()):
+            lines.append(f'bot_update_errors_total{{handler="{handler}"}} {n}')
+        lines.append("# TYPE bot_update_sql_statements histogram")
+        lines += self.sql_statements.prometheus("bot_update_sql_statements")
+        lines.append("# TYPE bot_update_sql_seconds histogram")
+        lines += self.sql_seconds.prometheus("bot_update_sql_seconds")
+        lines.append("# TYPE bot_update_fsm_seconds histogram")
+        lines += self.fsm_seconds.prometheus("bot_update_fsm_seconds")
+        lines.append("# TYPE bot_api_seconds histogram")
+        for method, hist in sorted(self.api_seconds.items()):
+            lines += hist.prometheus("bot_api_seconds", f'method="{method}"')
+        lines.append("# TYPE bot_startup_phase_seconds gauge")
+        for name, seconds in self.startup.phases.items():
+            lines.append(f'bot_startup_phase_seconds{{phase="{name}"}} {seconds:.6f}')
+        lines.append("# TYPE bot_startup_mark_seconds gauge")
+        for name, seconds in self.startup.marks.items():
+            lines.append(f'bot_startup_mark_seconds{{mark="{name}"}} {seconds:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        def ms(hist: Histogram, q: float) -> str:
+            return f"{hist.quantile(q) * 1000:.0f}"
+
+        lines = ["📈 Хендлери (к-сть, p50/p95/p99 мс):"]
+        for handler, hist in sorted(self.handler_seconds.items(), key=lambda kv: -kv[1].count):
+            errors = self.errors.get(handler, 0)
+            err = f", помилок {errors}" if errors else ""
+            lines.append(f"• {handler}: {hist.count}, {ms(hist, .5)}/{ms(hist, .95)}/{ms(hist, .99)}{err}")
+        if len(lines) == 1:
+            lines.append("• (ще не було апдейтів)")
+
+        st = self.sql_statements
+        lines += [
+            "",
+            f"🗄 SQL на апдейт: сер. {st.sum / max(1, st.count):.1f}, p95 {st.quantile(.95):.0f}; "
+            f"час p95 {ms(self.sql_seconds, .95)} мс",
+            f"💾 FSM на апдейт: p95 {ms(self.fsm_seconds, .95)} мс",
+        ]
+        for method, hist in sorted(self.api_seconds.items(), key=lambda kv: -kv[1].count):
+            lines.append(f"📤 {method}: {hist.count}, p50 {ms(hist, .5)} мс, p95 {ms(hist, .95)} мс")
+        if self.startup.phases:  # тільки в боті (bot.main), не в load-test'і
+            lines += ["", self.startup.summary()]
+        return "\n".join(lines)
+
+
+METRICS = Metrics()
+
+
+class ApiTimingMiddleware(BaseRequestMiddleware):
+    """Request middleware сесії бота: час кожного виклику Bot API."""
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            self.metrics.on_api_call(type(method).__name__, time.perf_counter() - started)
+
+
+class TimedStorage(BaseStorage):
+    """Обгортка FSM storage: час storage-операцій додається до UpdateCost апдейту."""
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+
+    @staticmethod
+    def _add(started: float) -> None:
+        cost = _current_cost.get()
+        if cost is not None:
+            cost.fsm_seconds += time.perf_counter() - started
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        started = time.perf_counter()
+        try:
+            await self.storage.set_state(key, state)
+        finally:
+            self._add(started)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        started = time.perf_counter()
+        try:
+            return await self.storage.get_state(key)
+        finally:
+            self._add(started)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            await self.storage.set_data(key, data)
+        finally:
+            self._add(started)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            return await self.storage.get_data(key)
+        finally:
+            self._add(started)
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+
+async def start_metrics_server(metrics: Metrics, host: str, port: int) -> web.AppRunner:
+    """GET /metrics у форматі Prometheus (слухаємо тільки локально за замовчуванням)."""
+    from aiohttp import web  # aiohttp.web — тільки коли METRICS_PORT задано
+
+    async def handle(_: web.Request) -> web.Response:
+        return web.Response(text=metrics.prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    log.info("Metrics on http://%s:%s/metrics", host, port)
+    return runner
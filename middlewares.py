@@ -1,17 +1,20 @@
 from __future__ import annotations
+import time
 from typing import Any, Awaitable, Callable, Dict
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 
-from repo import Repo
+from households import HouseholdManager
+from metrics import Metrics, current_cost
+from outbox import Outbox
 
 class AccessAndDIMiddleware(BaseMiddleware):
-    def __init__(self, repo: Repo, tz_name: str, users: list[int]):
+    def __init__(self, households: HouseholdManager, tz_name: str, outbox: Outbox):
         super().__init__()
-        self.repo = repo
+        self.households = households
         self.tz_name = tz_name
-        self.users = users
+        self.outbox = outbox
 
     async def __call__(
         self,
@@ -19,13 +22,70 @@ class AccessAndDIMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        # доступ тільки 2 users
-        from_user = getattr(event, "from_user", None)
-        if from_user and from_user.id not in self.users:
+        # доступ тільки користувачам з household'ів (outer middleware на Update ->
+        # користувача бере UserContextMiddleware aiogram'а)
+        from_user = data.get("event_from_user")
+        if from_user is None:
+            # апдейти без користувача (channel_post, my_chat_member без from і т.п.) — далі,
+            # як і раніше, але без household'а: repo їм не належить жоден
+            data["tz_name"] = self.tz_name
+            data["outbox"] = self.outbox
+            return await handler(event, data)
+
+        household = self.households.household_for_user(from_user.id)
+        if household is None:
             # нічого не відповідаємо (максимально просто)
             return
 
-        data["repo"] = self.repo
-        data["tz_name"] = self.tz_name
-        data["users"] = self.users
+        async with self.households.lease(household) as repo:
+            data["repo"] = repo
+            data["tz_name"] = self.tz_name
+            data["users"] = list(household.users)
+            data["household"] = household
+            data["outbox"] = self.outbox
+            return await handler(event, data)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Outer middleware на Update (реєструвати першим): час обробки апдейту + його
+    UpdateCost (SQL, FSM, Bot API) у Metrics. Назву хендлера ставить HandlerNameMiddleware.
+    """
+
+    def __init__(self, metrics: Metrics):
+        super().__init__()
+        self.metrics = metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        cost, token = self.metrics.begin_update()
+        started = time.perf_counter()
+        failed = False
+        try:
+            return await handler(event, data)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.metrics.end_update(cost, token, time.perf_counter() - started, failed)
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """Inner middleware (message / callback_query): який хендлер обробив апдейт."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        cost = current_cost()
+        handler_object = data.get("handler")
+        if cost is not None and handler_object is not None:
+            callback = handler_object.callback
+            cost.handler = f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__name__}"
         return await handler(event, data)
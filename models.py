@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class CategorySpend:
+    id: int
+    name: str
+    emoji: str
+    kind: str                # 'fixed' | 'variable'
+    limit_cents: int | None  # ефективний ліміт місяця (category_limits, інакше categories.limit_cents)
+    spent_cents: int
+
+
+@dataclass(frozen=True)
+class MonthSnapshot:
+    """
+    Стан місяця одним знімком (див. Repo.month_snapshot).
+    Витрати — за [start_date, end_date), end_date exclusive.
+    """
+    year: int
+    month: int
+    start_date: str
+    end_date: str
+    budget_cents: int  # 0 = бюджет не задано
+    total_cents: int   # усі витрати діапазону (як sum_month_total, включно з неактивними категоріями)
+    categories: tuple[CategorySpend, ...]  # тільки активні, ORDER BY id
+
+    @property
+    def spent_by_category(self) -> dict[int, int]:
+        return {c.id: c.spent_cents for c in self.categories}
+
+    @property
+    def fixed_spent_cents(self) -> int:
+        return sum(c.spent_cents for c in self.categories if c.kind == "fixed")
+
+    @property
+    def variable_spent_cents(self) -> int:
+        return sum(c.spent_cents for c in self.categories if c.kind != "fixed")
+
+    @property
+    def planned_fixed_cents(self) -> int:
+        # fixed ліміти завжди "резервуємо" (тільки там, де ліміт є)
+        return sum(
+            max(0, c.limit_cents)
+            for c in self.categories
+            if c.kind == "fixed" and c.limit_cents is not None
+        )
+
+
+@dataclass(frozen=True)
+class SafeSpendSeries:
+    """
+    Safe-spend план на кожен день місяця (див. services.budgeting.safe_spend_series).
+    plan[d - 1] — план на день d; останній елемент (d = days_in_month + 1) —
+    "день після місяця": залишок на 1 день, потрібен екрану стану в останній день місяця.
+    """
+    year: int
+    month: int
+    plan: tuple[int, ...]
+
+    def for_day(self, day: int) -> int:
+        return self.plan[day - 1]
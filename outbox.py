@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """rate токенів/с, не більше burst у запасі. reserve() бере токен і каже, скільки чекати."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def delay(self) -> float:
+        """Скільки чекати до вільного токена (нічого не бере)."""
+        self._refill(time.monotonic())
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+@dataclass
+class _Message:
+    chat_id: int
+    text: str
+    kwargs: dict[str, Any]
+    future: asyncio.Future
+    queued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0  # повторів уже зроблено
+
+
+@dataclass
+class _Chat:
+    bucket: TokenBucket
+    # FIFO чату: повідомлення з голови бере не більше одного воркера -> порядок у чаті
+    queue: deque[_Message] = field(default_factory=deque)
+    scheduled: bool = False  # у _ready, у воркера або чекає таймера
+
+
+@dataclass
+class DeliveryStats:
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    retry_after: int = 0  # скільки разів Telegram відповів 429
+    dropped: int = 0  # кинуті після max_retries повторів (входять і у failed)
+    latencies: deque = field(default_factory=lambda: deque(maxlen=1000))  # постановка в чергу -> доставлено, с
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Outbox:
+    """
+    Єдина черга вихідних повідомлень бота.
+
+    - Глобальний ліміт (global_rate/с) і token bucket на кожен чат (chat_rate/с,
+      chat_burst підряд) — у межах лімітів Telegram, без 429 на розсилках.
+    - Не більше workers одночасних запитів; повідомлення в один чат йдуть по черзі
+      (у чату своя FIFO, її голову обробляє щонайбільше один воркер).
+    - Чат, якому треба чекати (свій token bucket, backoff), не тримає воркера:
+      він повертається в чергу готових через таймер, воркер береться за інші чати.
+    - TelegramRetryAfter: пауза на retry_after для всіх відправок, потім повтор.
+    - Мережеві / 5xx помилки: повтор з експоненційним backoff.
+    - Повторів (429 теж) — не більше max_retries, далі повідомлення кидається (stats.dropped).
+    - Інші помилки API (бота заблокували, chat not found) — без повторів, у лог.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        workers: int = 8,
+        max_retries: int = 5,
+        queue_size: int = 10_000,
+    ):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.stats = DeliveryStats()
+        self._global = TokenBucket(global_rate, global_rate)
+        self._global_lock = asyncio.Lock()
+        self._paused_until = 0.0
+        self._chats: dict[int, _Chat] = {}
+        self._ready: asyncio.Queue[int] = asyncio.Queue()  # chat_id, чия голова готова до відправки
+        self._slots = asyncio.Semaphore(max(1, queue_size))  # backpressure на submit
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._workers_n = max(1, workers)
+        self._workers: list[asyncio.Task] = []
+
+    # ---------- API ----------
+    async def submit(self, chat_id: int, text: str, **kwargs: Any) -> asyncio.Future:
+        """У чергу; future -> True (доставлено) / False (не вдалося)."""
+        future = asyncio.get_running_loop().create_future()
+        await self._slots.acquire()
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _Chat(TokenBucket(self.chat_rate, self.chat_burst))
+        chat.queue.append(_Message(chat_id, text, kwargs, future))
+        self._pending += 1
+        self._idle.clear()
+        if not chat.scheduled:
+            chat.scheduled = True
+            self._ready.put_nowait(chat_id)
+        return future
+
+    async def send(self, chat_id: int, text: str, **kwargs: Any) -> bool:
+        return await (await self.submit(chat_id, text, **kwargs))
+
+    async def broadcast(self, chat_ids: list[int], text: str, **kwargs: Any) -> int:
+        """Один текст кільком чатам; повертає кількість доставлених."""
+        futures = [await self.submit(uid, text, **kwargs) for uid in chat_ids]
+        return sum(await asyncio.gather(*futures))
+
+    # ---------- workers ----------
+    async def _worker(self) -> None:
+        while True:
+            chat_id = await self._ready.get()
+            chat = self._chats[chat_id]
+            msg = chat.queue[0]
+            try:
+                wait = chat.bucket.delay()
+                if wait > 0:
+                    self._reschedule(chat_id, wait)
+                    continue
+                chat.bucket.reserve()
+                await self._wait_for_global()
+                retry_in = await self._deliver(msg)
+            except asyncio.CancelledError:
+                self._finish(chat_id, chat, False)
+                raise
+            except Exception:
+                # не Telegram-помилка (невалідні kwargs, middleware сесії) — воркер живе далі,
+                # повідомлення — не доставлене, інакше send()/broadcast() чекали б вічно
+                self.stats.failed += 1
+                log.exception("Message to %s not delivered", msg.chat_id)
+                self._finish(chat_id, chat, False)
+            else:
+                if retry_in is None:
+                    self._finish(chat_id, chat, True)
+                elif retry_in is False:
+                    self._finish(chat_id, chat, False)
+                else:
+                    self._reschedule(chat_id, retry_in)
+
+    def _reschedule(self, chat_id: int, delay: float) -> None:
+        # голова чату лишається на місці; воркер вільний для інших чатів
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._ready.put_nowait, chat_id)
+        else:
+            self._ready.put_nowait(chat_id)
+
+    def _finish(self, chat_id: int, chat: _Chat, ok: bool) -> None:
+        msg = chat.queue.popleft()
+        if not msg.future.done():
+            msg.future.set_result(ok)
+        self._pending -= 1
+        self._slots.release()
+        if chat.queue:
+            self._ready.put_nowait(chat_id)  # у кінець: чати обслуговуються по колу
+        else:
+            chat.scheduled = False
+            if chat.bucket.is_full():
+                self._chats.pop(chat_id, None)
+        if self._pending == 0:
+            self._idle.set()
+
+    async def _wait_for_global(self) -> None:
+        # ліміт і пауза 429 — на весь бот, тож тут чекають усі воркери однаково
+        async with self._global_lock:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await asyncio.sleep(self._global.reserve())
+
+    async def _deliver(self, msg: _Message) -> float | bool | None:
+        """Одна спроба. None — доставлено, False — не доставлено, число — повторити через стільки с."""
+        try:
+            await self.bot.send_message(msg.chat_id, msg.text, **msg.kwargs)
+        except TelegramRetryAfter as e:
+            self.stats.retry_after += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            log.warning("Flood control: retry after %ss (chat %s)", e.retry_after, msg.chat_id)
+            return self._retry(msg, e, 0.0)  # чекатиме в _wait_for_global
+        except (TelegramNetworkError, TelegramServerError) as e:
+            return self._retry(msg, e, min(30.0, 0.5 * 2 ** msg.attempts))
+        except TelegramAPIError as e:
+            return self._failed(msg, e)
+        self.stats.sent += 1
+        self.stats.latencies.append(time.monotonic() - msg.queued_at)
+        return None
+
+    def _retry(self, msg: _Message, error: Exception, delay: float) -> float | bool:
+        if msg.attempts >= self.max_retries:
+            self.stats.dropped += 1
+            return self._failed(msg, error)
+        msg.attempts += 1
+        self.stats.retries += 1
+        return delay
+
+    def _failed(self, msg: _Message, error: Exception) -> bool:
+        self.stats.failed += 1
+        log.warning("Message to %s not delivered: %s", msg.chat_id, error)
+        return False
+
+    # ---------- lifecycle ----------
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"outbox-worker-{i}") for i in range(self._workers_n)
+            ]
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Дочекатися черги (не довше timeout), потім зупинити воркерів."""
+        if self._workers:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                log.warning("Outbox closed with %s undelivered messages", self._pending)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # те, що не встигли: send()/broadcast() отримують False, а не висять
+        for chat in self._chats.values():
+            for msg in chat.queue:
+                if not msg.future.done():
+                    msg.future.set_result(False)
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from contextvars import Context
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+import aiosqlite
+
+from db import statement_hooks
+
+log = logging.getLogger(__name__)
+
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+_FULL_SCAN_EXPENSES = re.compile(r"\bSCAN (?:TABLE )?expenses\b")
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(sql: str) -> str:
+    """SQL без літералів і зайвих пробілів: однакові запити з різними значеннями -> одна форма."""
+    shape = re.sub(r"--[^\n]*", " ", sql)
+    shape = re.sub(r"'(?:[^']|'')*'", "?", shape)
+    shape = re.sub(r"\b\d+(?:\.\d+)?\b", "?", shape)
+    shape = re.sub(r"\(\s*\?(?:\s*,\s*\?)+\s*\)", "(?, ...)", shape)
+    return re.sub(r"\s+", " ", shape).strip()
+
+
+@dataclass
+class ShapeStats:
+    shape: str
+    count: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    slow: int = 0
+    plan: tuple[str, ...] | None = None
+    full_scan: bool = False
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_s / max(1, self.count) * 1000
+
+
+class QueryProfiler:
+    """
+    Статистика SQL по формах запиту (statement_shape) для всіх Database.
+
+    - count / сумарний / max час на форму;
+    - EXPLAIN QUERY PLAN — один раз на форму (у фоні, на тому ж з'єднанні);
+      план з повним SCAN expenses -> warning і позначка full_scan;
+    - запит довший за threshold_s -> warning з текстом і планом.
+    """
+
+    def __init__(self, threshold_s: float = 0.05, max_shapes: int = 2000):
+        self.threshold_s = threshold_s
+        self.max_shapes = max_shapes
+        self.shapes: dict[str, ShapeStats] = {}
+        self._explaining: set[asyncio.Task] = set()
+
+    def install(self, threshold_ms: float | None = None) -> None:
+        if threshold_ms is not None:
+            self.threshold_s = threshold_ms / 1000
+        if self.on_statement not in statement_hooks:
+            statement_hooks.append(self.on_statement)
+
+    def on_statement(self, conn: aiosqlite.Connection, sql: str, params: Any, seconds: float) -> None:
+        shape = statement_shape(sql)
+        stats = self.shapes.get(shape)
+        if stats is None:
+            if len(self.shapes) >= self.max_shapes:
+                return  # динамічний SQL розплодив форми — нові вже не рахуємо
+            stats = self.shapes[shape] = ShapeStats(shape)
+            if params is not None and shape.upper().startswith(_EXPLAINABLE):
+                self._explain_later(conn, sql, params, stats)
+
+        stats.count += 1
+        stats.total_s += seconds
+        stats.max_s = max(stats.max_s, seconds)
+        if seconds >= self.threshold_s:
+            stats.slow += 1
+            log.warning(
+                "Slow SQL %.1f ms: %s\n  plan: %s",
+                seconds * 1000,
+                shape,
+                "; ".join(stats.plan) if stats.plan else "(ще не готовий)",
+            )
+
+    def _explain_later(self, conn: aiosqlite.Connection, sql: str, params: Any, stats: ShapeStats) -> None:
+        # порожній контекст: EXPLAIN не належить апдейту, що викликав запит
+        task = asyncio.get_running_loop().create_task(self._explain(conn, sql, params, stats), context=Context())
+        self._explaining.add(task)
+        task.add_done_callback(self._explaining.discard)
+
+    async def _explain(self, conn: aiosqlite.Connection, sql: str, params: Any, stats: ShapeStats) -> None:
+        try:
+            cur = await conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            rows = await cur.fetchall()
+        except Exception as e:  # з'єднання закрили / запит не для EXPLAIN
+            log.debug("EXPLAIN failed for %s: %s", stats.shape, e)
+            return
+        stats.plan = tuple(str(row[-1]) for row in rows)
+        stats.full_scan = any(_FULL_SCAN_EXPENSES.search(step) for step in stats.plan)
+        if stats.full_scan:
+            log.warning("Full scan of expenses: %s\n  plan: %s", stats.shape, "; ".join(stats.plan))
+        elif stats.slow:
+            # перший повільний виклик залогувався ще без плану
+            log.warning("Plan of slow SQL %s\n  plan: %s", stats.shape, "; ".join(stats.plan))
+
+    def top(self, n: int = 10) -> list[ShapeStats]:
+        return sorted(self.shapes.values(), key=lambda s: s.total_s, reverse=True)[:n]
+
+    def dump(self, n: int = 10) -> str:
+        lines = [f"Top {n} SQL by total time (count, total ms, avg ms, max ms):"]
+        for i, s in enumerate(self.top(n), start=1):
+            flags = " [SCAN expenses]" if s.full_scan else ""
+            flags += f" [slow x{s.slow}]" if s.slow else ""
+            lines.append(
+                f"{i}. {s.count}, {s.total_s * 1000:.1f}, {s.avg_ms:.2f}, {s.max_s * 1000:.1f}{flags}\n   {s.shape[:300]}"
+            )
+            if s.plan:
+                lines.append("   plan: " + "; ".join(s.plan))
+        if len(lines) == 1:
+            lines.append("(ще не було запитів)")
+        return "\n".join(lines)
+
+
+PROFILER = QueryProfiler()
@@ -1,21 +1,77 @@
 from __future__ import annotations
-from db import Database
+import calendar
+from datetime import date, timedelta
+from types import MappingProxyType
+from typing import Callable, Mapping
+
+from cache import ReadCache, VersionedCache
+from db import Database, ROLLUP_REBUILD_SQL, day_iso, day_ordinal
+from models import CategorySpend, MonthSnapshot
 
 class Repo:
     def __init__(self, db: Database):
         self.db = db
+        # категорії / ліміти місяця / бюджет: читаються майже на кожну дію,
+        # змінюються кілька разів на місяць -> кешуємо, інвалідуємо в мутуючих методах
+        self.cache = ReadCache()
+        # монотонна версія даних: +1 на кожен запис через Repo і на кожен помічений
+        # commit іншого процесу (sync_external_writes).
+        # Похідні обчислення (safe-spend серія, тексти звітів) кешуються в derived до наступного запису.
+        self.data_version = 0
+        self._external_version: int | None = None  # останній PRAGMA data_version
+        # скільки разів помічено commit'и інших процесів: там бувають UPDATE/DELETE expenses,
+        # а через Repo витрати тільки додаються (services.analytics звіряється лише тоді)
+        self.external_writes = 0
+        self.derived = VersionedCache(maxsize=128)
+        # версія набору категорій: те, що залежить тільки від категорій (клавіатури),
+        # не перебудовується після кожної витрати
+        self.categories_version = 0
+        # підписники на нові витрати: listener([(amount_cents, category_id, spent_date), ...])
+        # викликається після commit'у — інкрементальні агрегати (services.forecast) без перечитування
+        self.expense_listeners: list[Callable[[list[tuple[int, int, str]]], None]] = []
+
+    def _changed(self, *cache_keys) -> None:
+        self.data_version += 1
+        if cache_keys:
+            self.cache.invalidate(*cache_keys)
+            if ("categories",) in cache_keys:
+                self.categories_version += 1
+
+    async def sync_external_writes(self) -> bool:
+        """
+        Чи писав у БД інший процес (import_expenses.py, maintenance.py) з минулої перевірки.
+        Якщо так — скидаємо ReadCache і піднімаємо версії, тож derived-кеші
+        (звіти, safe-spend, клавіатури) перераховуються.
+
+        Ціна: один PRAGMA, але на writer-з'єднанні (лише воно відрізняє чужі commit'и від
+        своїх), тобто в черзі його aiosqlite-потоку за поточною пачкою записів.
+        Тому HouseholdManager.lease кличе її не частіше, ніж раз на external_check_s.
+        """
+        version = await self.db.data_version()
+        changed = self._external_version is not None and version != self._external_version
+        self._external_version = version
+        if changed:
+            self.cache.clear()
+            self.external_writes += 1
+            self.data_version += 1
+            self.categories_version += 1
+        return changed
 
     # ---------- monthly budget ----------
     async def get_monthly_budget(self, year: int, month: int) -> int:
-        cur = await self.db.conn.execute(
+        return await self.cache.get_or_load(
+            ("budget", year, month), lambda: self._load_monthly_budget(year, month)
+        )
+
+    async def _load_monthly_budget(self, year: int, month: int) -> int:
+        row = await self.db.fetchone(
             "SELECT budget_cents FROM monthly_budgets WHERE year=? AND month=?",
             (year, month),
         )
-        row = await cur.fetchone()
         return int(row["budget_cents"]) if row else 0
 
     async def set_monthly_budget(self, year: int, month: int, budget_cents: int) -> None:
-        await self.db.conn.execute(
+        await self.db.execute_write(
             """
             INSERT INTO monthly_budgets (year, month, budget_cents)
             VALUES (?,?,?)
@@ -23,36 +79,38 @@ class Repo:
             """,
             (year, month, budget_cents),
         )
-        await self.db.conn.commit()
+        self._changed(("budget", year, month))
 
     # ---------- categories ----------
-    async def list_categories(self):
-        cur = await self.db.conn.execute(
+    async def list_categories(self) -> tuple:
+        return await self.cache.get_or_load(("categories",), self._load_categories)
+
+    async def _load_categories(self) -> tuple:
+        rows = await self.db.fetchall(
             "SELECT * FROM categories WHERE is_active=1 ORDER BY id"
         )
-        return await cur.fetchall()
+        return tuple(rows)
 
     async def get_category(self, category_id: int):
-        cur = await self.db.conn.execute(
-            "SELECT * FROM categories WHERE id=? AND is_active=1",
-            (category_id,),
-        )
-        return await cur.fetchone()
+        # тільки активні — як і раніше (WHERE id=? AND is_active=1), але з кешу
+        for c in await self.list_categories():
+            if int(c["id"]) == category_id:
+                return c
+        return None
 
     async def add_category(self, name: str, emoji: str, kind: str, limit_cents: int | None) -> int:
-        cur = await self.db.conn.execute(
+        new_id = await self.db.execute_write(
             "INSERT INTO categories (name, emoji, kind, limit_cents, is_active) VALUES (?,?,?,?,1)",
             (name, emoji, kind, limit_cents),
         )
-        await self.db.conn.commit()
-        return int(cur.lastrowid)
+        self._changed(("categories",))
+        return new_id
 
     async def ensure_default_categories(self) -> None:
         """
         Створює дефолтні категорії (і їх дефолтні ліміти-шаблони) ТІЛЬКИ якщо categories порожня.
         """
-        cur = await self.db.conn.execute("SELECT COUNT(*) AS c FROM categories")
-        row = await cur.fetchone()
+        row = await self.db.fetchone("SELECT COUNT(*) AS c FROM categories")
         if int(row["c"]) > 0:
             return
 
@@ -76,30 +134,41 @@ class Repo:
             ("Підписки / софт",     "💻", "variable",  200_00),
         ]
 
-        await self.db.conn.executemany(
-            "INSERT INTO categories (name, emoji, kind, limit_cents, is_active) VALUES (?,?,?,?,1)",
-            [(n, e, k, lim) for (n, e, k, lim) in defaults],
-        )
-        await self.db.conn.commit()
+        async def op(conn) -> bool:
+            # повторна перевірка вже на writer'і: два паралельні /start не створять дублікати
+            cur = await conn.execute("SELECT COUNT(*) AS c FROM categories")
+            if int((await cur.fetchone())["c"]) > 0:
+                return False
+            await conn.executemany(
+                "INSERT INTO categories (name, emoji, kind, limit_cents, is_active) VALUES (?,?,?,?,1)",
+                [(n, e, k, lim) for (n, e, k, lim) in defaults],
+            )
+            return True
+
+        if await self.db.write(op):
+            self._changed(("categories",))
 
     # ---------- month category limits ----------
-    async def get_month_limits_map(self, year: int, month: int) -> dict[int, int | None]:
-        cur = await self.db.conn.execute(
+    async def get_month_limits_map(self, year: int, month: int) -> Mapping[int, int | None]:
+        return await self.cache.get_or_load(
+            ("limits", year, month), lambda: self._load_month_limits_map(year, month)
+        )
+
+    async def _load_month_limits_map(self, year: int, month: int) -> Mapping[int, int | None]:
+        rows = await self.db.fetchall(
             "SELECT category_id, limit_cents FROM category_limits WHERE year=? AND month=?",
             (year, month),
         )
-        rows = await cur.fetchall()
-        return {int(r["category_id"]): (None if r["limit_cents"] is None else int(r["limit_cents"])) for r in rows}
+        return MappingProxyType(
+            {int(r["category_id"]): (None if r["limit_cents"] is None else int(r["limit_cents"])) for r in rows}
+        )
 
     async def has_month_limits(self, year: int, month: int) -> bool:
-        cur = await self.db.conn.execute(
-            "SELECT 1 FROM category_limits WHERE year=? AND month=? LIMIT 1",
-            (year, month),
-        )
-        return (await cur.fetchone()) is not None
+        # мапа містить усі рядки category_limits за місяць -> окремий запит не потрібен
+        return len(await self.get_month_limits_map(year, month)) > 0
 
     async def set_month_limit(self, year: int, month: int, category_id: int, limit_cents: int | None) -> None:
-        await self.db.conn.execute(
+        await self.db.execute_write(
             """
             INSERT INTO category_limits (year, month, category_id, limit_cents)
             VALUES (?,?,?,?)
@@ -107,7 +176,7 @@ class Repo:
             """,
             (year, month, category_id, limit_cents),
         )
-        await self.db.conn.commit()
+        self._changed(("limits", year, month))
 
     async def ensure_month_limits_from_category_defaults(self, year: int, month: int) -> None:
         """
@@ -116,14 +185,14 @@ class Repo:
         if await self.has_month_limits(year, month):
             return
         cats = await self.list_categories()
-        await self.db.conn.executemany(
+        await self.db.executemany_write(
             """
             INSERT OR IGNORE INTO category_limits (year, month, category_id, limit_cents)
             VALUES (?,?,?,?)
             """,
             [(year, month, int(c["id"]), c["limit_cents"]) for c in cats],
         )
-        await self.db.conn.commit()
+        self._changed(("limits", year, month))
 
     async def copy_limits_from_prev_month(self, year: int, month: int, prev_year: int, prev_month: int) -> None:
         if await self.has_month_limits(year, month):
@@ -135,139 +204,302 @@ class Repo:
             return
 
         cats = await self.list_categories()
-        await self.db.conn.executemany(
+        await self.db.executemany_write(
             """
             INSERT OR IGNORE INTO category_limits (year, month, category_id, limit_cents)
             VALUES (?,?,?,?)
             """,
             [(year, month, int(c["id"]), prev.get(int(c["id"]), c["limit_cents"])) for c in cats],
         )
-        await self.db.conn.commit()
+        self._changed(("limits", year, month))
+
+    # ---------- month snapshot ----------
+    async def month_snapshot(self, year: int, month: int) -> MonthSnapshot:
+        """
+        Бюджет, ефективні ліміти (category_limits -> fallback categories.limit_cents)
+        і витрати за весь місяць по активних категоріях — ОДНИМ запитом.
+        """
+        start = date(year, month, 1)
+        end_date = (start + timedelta(days=calendar.monthrange(year, month)[1])).isoformat()
+        params = {"y": year, "m": month, "start": start.toordinal(), "end": day_ordinal(end_date)}
+
+        rows = await self.db.fetchall(
+            """
+            WITH m AS (
+              SELECT
+                (SELECT budget_cents FROM monthly_budgets WHERE year=:y AND month=:m) AS budget_cents,
+                (SELECT COALESCE(SUM(sum_cents),0) FROM expense_rollup
+                  WHERE spent_day>=:start AND spent_day<:end) AS total_cents
+            ),
+            s AS (
+              SELECT category_id, SUM(sum_cents) AS spent_cents
+              FROM expense_rollup
+              WHERE spent_day>=:start AND spent_day<:end
+              GROUP BY category_id
+            )
+            SELECT m.budget_cents, m.total_cents,
+                   c.id, c.name, c.emoji, c.kind,
+                   CASE WHEN cl.category_id IS NOT NULL THEN cl.limit_cents ELSE c.limit_cents END AS limit_cents,
+                   COALESCE(s.spent_cents,0) AS spent_cents
+            FROM m
+            LEFT JOIN categories c ON c.is_active=1
+            LEFT JOIN category_limits cl ON cl.year=:y AND cl.month=:m AND cl.category_id=c.id
+            LEFT JOIN s ON s.category_id=c.id
+            ORDER BY c.id
+            """,
+            params,
+        )
+
+        # рядок з m є завжди (навіть без активних категорій)
+        head = rows[0]
+        cats = tuple(
+            CategorySpend(
+                id=int(r["id"]),
+                name=r["name"],
+                emoji=r["emoji"],
+                kind=r["kind"],
+                limit_cents=None if r["limit_cents"] is None else int(r["limit_cents"]),
+                spent_cents=int(r["spent_cents"]),
+            )
+            for r in rows
+            if r["id"] is not None
+        )
+        return MonthSnapshot(
+            year=year,
+            month=month,
+            start_date=start.isoformat(),
+            end_date=end_date,
+            budget_cents=int(head["budget_cents"] or 0),
+            total_cents=int(head["total_cents"]),
+            categories=cats,
+        )
 
     # ---------- expenses ----------
     async def add_expense(self, amount_cents: int, category_id: int, spent_date: str, created_at_iso: str, comment: str | None) -> int:
-        cur = await self.db.conn.execute(
+        expense_id = await self.db.execute_write(
             """
-            INSERT INTO expenses (amount_cents, category_id, spent_date, created_at, comment)
-            VALUES (?,?,?,?,?)
+            INSERT INTO expenses (amount_cents, category_id, spent_date, spent_day, created_at, comment)
+            VALUES (?,?,?,?,?,?)
             """,
-            (amount_cents, category_id, spent_date, created_at_iso, comment),
+            (amount_cents, category_id, spent_date, day_ordinal(spent_date), created_at_iso, comment),
         )
-        await self.db.conn.commit()
-        return int(cur.lastrowid)
+        self._changed()
+        self._expenses_added([(amount_cents, category_id, spent_date)])
+        return expense_id
+
+    async def add_expenses(self, rows: list[tuple[int, int, str, str | None]], created_at_iso: str) -> int:
+        """
+        Пачка витрат (amount_cents, category_id, spent_date, comment) — одним executemany
+        в одній транзакції: або всі, або жодної.
+        """
+        await self.db.executemany_write(
+            """
+            INSERT INTO expenses (amount_cents, category_id, spent_date, spent_day, created_at, comment)
+            VALUES (?,?,?,?,?,?)
+            """,
+            [
+                (amount, cid, spent_date, day_ordinal(spent_date), created_at_iso, comment)
+                for amount, cid, spent_date, comment in rows
+            ],
+        )
+        self._changed()
+        self._expenses_added([(amount, cid, spent_date) for amount, cid, spent_date, _ in rows])
+        return len(rows)
+
+    def _expenses_added(self, rows: list[tuple[int, int, str]]) -> None:
+        for listener in self.expense_listeners:
+            listener(rows)
 
     async def set_expense_comment(self, expense_id: int, comment: str) -> None:
-        await self.db.conn.execute(
+        await self.db.execute_write(
             "UPDATE expenses SET comment=? WHERE id=?",
             (comment, expense_id),
         )
-        await self.db.conn.commit()
+        self._changed()
 
+    # Усі агрегати нижче читають expense_rollup (день × категорія), а не сирі expenses.
+    # Дати в API — 'YYYY-MM-DD'; у запит ідуть як spent_day (ordinal).
     async def sum_by_date(self, spent_date: str) -> int:
-        cur = await self.db.conn.execute(
-            "SELECT COALESCE(SUM(amount_cents),0) AS s FROM expenses WHERE spent_date=?",
-            (spent_date,),
+        row = await self.db.fetchone(
+            "SELECT COALESCE(SUM(sum_cents),0) AS s FROM expense_rollup WHERE spent_day=?",
+            (day_ordinal(spent_date),),
         )
-        row = await cur.fetchone()
         return int(row["s"])
 
     async def sum_by_date_and_kind(self, spent_date: str, kind: str) -> int:
-        cur = await self.db.conn.execute(
+        row = await self.db.fetchone(
             """
-            SELECT COALESCE(SUM(e.amount_cents),0) AS s
-            FROM expenses e
-            JOIN categories c ON c.id=e.category_id
-            WHERE e.spent_date=? AND c.kind=? AND c.is_active=1
+            SELECT COALESCE(SUM(r.sum_cents),0) AS s
+            FROM expense_rollup r
+            JOIN categories c ON c.id=r.category_id
+            WHERE r.spent_day=? AND c.kind=? AND c.is_active=1
             """,
-            (spent_date, kind),
+            (day_ordinal(spent_date), kind),
         )
-        row = await cur.fetchone()
         return int(row["s"])
 
     async def sum_month_total(self, month_start: str, month_end: str) -> int:
-        cur = await self.db.conn.execute(
+        row = await self.db.fetchone(
             """
-            SELECT COALESCE(SUM(amount_cents),0) AS s
-            FROM expenses
-            WHERE spent_date>=? AND spent_date<?
+            SELECT COALESCE(SUM(sum_cents),0) AS s
+            FROM expense_rollup
+            WHERE spent_day>=? AND spent_day<?
             """,
-            (month_start, month_end),
+            (day_ordinal(month_start), day_ordinal(month_end)),
+        )
+        return int(row["s"])
+
+    async def sum_in_range(self, start_date: str, end_date: str) -> int:
+        # end_date включно
+        row = await self.db.fetchone(
+            """
+            SELECT COALESCE(SUM(sum_cents),0) AS s
+            FROM expense_rollup
+            WHERE spent_day>=? AND spent_day<=?
+            """,
+            (day_ordinal(start_date), day_ordinal(end_date)),
+        )
+        return int(row["s"])
+
+    async def sum_in_range_by_kind(self, start_date: str, end_date: str, kind: str) -> int:
+        # end_date включно
+        row = await self.db.fetchone(
+            """
+            SELECT COALESCE(SUM(r.sum_cents),0) AS s
+            FROM expense_rollup r
+            JOIN categories c ON c.id=r.category_id
+            WHERE r.spent_day>=? AND r.spent_day<=? AND c.kind=? AND c.is_active=1
+            """,
+            (day_ordinal(start_date), day_ordinal(end_date), kind),
         )
-        row = await cur.fetchone()
         return int(row["s"])
 
     async def sum_month_by_category(self, month_start: str, month_end: str):
-        cur = await self.db.conn.execute(
+        rows = await self.db.fetchall(
             """
-            SELECT c.id AS category_id, COALESCE(SUM(e.amount_cents),0) AS s
+            SELECT c.id AS category_id, COALESCE(SUM(r.sum_cents),0) AS s
             FROM categories c
-            LEFT JOIN expenses e
-              ON e.category_id=c.id AND e.spent_date>=? AND e.spent_date<?
+            LEFT JOIN expense_rollup r
+              ON r.category_id=c.id AND r.spent_day>=? AND r.spent_day<?
             WHERE c.is_active=1
             GROUP BY c.id
             ORDER BY c.id
             """,
-            (month_start, month_end),
+            (day_ordinal(month_start), day_ordinal(month_end)),
         )
-        rows = await cur.fetchall()
         return [(int(r["category_id"]), int(r["s"])) for r in rows]
 
     async def top_categories_in_range(self, start_date: str, end_date: str, limit: int = 2):
-        cur = await self.db.conn.execute(
+        rows = await self.db.fetchall(
             """
-            SELECT c.emoji AS emoji, c.name AS name, COALESCE(SUM(e.amount_cents),0) AS s
-            FROM expenses e
-            JOIN categories c ON c.id=e.category_id
-            WHERE e.spent_date>=? AND e.spent_date<=? AND c.is_active=1
+            SELECT c.emoji AS emoji, c.name AS name, COALESCE(SUM(r.sum_cents),0) AS s
+            FROM expense_rollup r
+            JOIN categories c ON c.id=r.category_id
+            WHERE r.spent_day>=? AND r.spent_day<=? AND c.is_active=1
             GROUP BY c.id
             ORDER BY s DESC
             LIMIT ?
             """,
-            (start_date, end_date, limit),
+            (day_ordinal(start_date), day_ordinal(end_date), limit),
         )
-        rows = await cur.fetchall()
         return [(r["emoji"], r["name"], int(r["s"])) for r in rows]
 
     async def daily_totals_in_range(self, start_date: str, end_date: str):
-        cur = await self.db.conn.execute(
+        rows = await self.db.fetchall(
             """
-            SELECT spent_date, COALESCE(SUM(amount_cents),0) AS s
-            FROM expenses
-            WHERE spent_date>=? AND spent_date<=?
-            GROUP BY spent_date
+            SELECT spent_day, COALESCE(SUM(sum_cents),0) AS s
+            FROM expense_rollup
+            WHERE spent_day>=? AND spent_day<=?
+            GROUP BY spent_day
             """,
-            (start_date, end_date),
+            (day_ordinal(start_date), day_ordinal(end_date)),
+        )
+        return [(day_iso(r["spent_day"]), int(r["s"])) for r in rows]
+
+    async def daily_totals_by_kind_in_range(self, start_date: str, end_date: str, kind: str):
+        # end_date включно; тільки активні категорії
+        rows = await self.db.fetchall(
+            """
+            SELECT r.spent_day AS spent_day, COALESCE(SUM(r.sum_cents),0) AS s
+            FROM expense_rollup r
+            JOIN categories c ON c.id=r.category_id
+            WHERE r.spent_day>=? AND r.spent_day<=? AND c.kind=? AND c.is_active=1
+            GROUP BY r.spent_day
+            """,
+            (day_ordinal(start_date), day_ordinal(end_date), kind),
+        )
+        return [(day_iso(r["spent_day"]), int(r["s"])) for r in rows]
+
+    # ---------- rollup maintenance ----------
+    async def rebuild_rollup(self) -> None:
+        async def op(conn) -> None:
+            for stmt in ROLLUP_REBUILD_SQL.split(";"):
+                if stmt.strip():
+                    await conn.execute(stmt)
+        await self.db.write(op)
+        self._changed()
+
+    async def verify_rollup(self) -> list[tuple[str, int, int, int, int, int]]:
+        """
+        Порівнює expense_rollup з перерахунком по сирих expenses.
+        Повертає розбіжності: (spent_date, category_id, raw_sum, raw_cnt, rollup_sum, rollup_cnt).
+        Порожній список = rollup консистентний.
+        """
+        rows = await self.db.fetchall(
+            """
+            WITH raw AS (
+              SELECT spent_day, category_id, SUM(amount_cents) AS s, COUNT(*) AS c
+              FROM expenses
+              GROUP BY spent_day, category_id
+            )
+            SELECT raw.spent_day AS spent_day, raw.category_id AS category_id,
+                   raw.s AS raw_sum, raw.c AS raw_cnt,
+                   COALESCE(r.sum_cents,0) AS rollup_sum, COALESCE(r.cnt,0) AS rollup_cnt
+            FROM raw
+            LEFT JOIN expense_rollup r
+              ON r.spent_day=raw.spent_day AND r.category_id=raw.category_id
+            WHERE r.sum_cents IS NOT raw.s OR r.cnt IS NOT raw.c
+            UNION ALL
+            SELECT r.spent_day, r.category_id, 0, 0, r.sum_cents, r.cnt
+            FROM expense_rollup r
+            WHERE NOT EXISTS (
+              SELECT 1 FROM expenses e
+              WHERE e.spent_day=r.spent_day AND e.category_id=r.category_id
+            )
+            ORDER BY 1, 2
+            """
         )
-        rows = await cur.fetchall()
-        return [(str(r["spent_date"]), int(r["s"])) for r in rows]
+        return [
+            (day_iso(r["spent_day"]), int(r["category_id"]), int(r["raw_sum"]), int(r["raw_cnt"]),
+             int(r["rollup_sum"]), int(r["rollup_cnt"]))
+            for r in rows
+        ]
 
     # ---------- day close ----------
     async def record_user_close(self, spent_date: str, telegram_id: int, closed_at_iso: str) -> None:
-        await self.db.conn.execute(
+        await self.db.execute_write(
             "INSERT OR IGNORE INTO day_closures (spent_date, telegram_id, closed_at) VALUES (?,?,?)",
             (spent_date, telegram_id, closed_at_iso),
         )
-        await self.db.conn.commit()
+        self._changed()
 
     async def count_closures_for_date(self, spent_date: str) -> int:
-        cur = await self.db.conn.execute(
+        row = await self.db.fetchone(
             "SELECT COUNT(*) AS c FROM day_closures WHERE spent_date=?",
             (spent_date,),
         )
-        row = await cur.fetchone()
         return int(row["c"])
 
     async def is_day_closed(self, spent_date: str) -> bool:
-        cur = await self.db.conn.execute(
+        row = await self.db.fetchone(
             "SELECT 1 FROM closed_days WHERE spent_date=?",
             (spent_date,),
         )
-        row = await cur.fetchone()
         return row is not None
 
     async def mark_day_closed(self, spent_date: str, closed_at_iso: str) -> None:
-        await self.db.conn.execute(
+        await self.db.execute_write(
             "INSERT OR IGNORE INTO closed_days (spent_date, closed_at) VALUES (?,?)",
             (spent_date, closed_at_iso),
         )
-        await self.db.conn.commit()
+        self._changed()
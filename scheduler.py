@@ -1,59 +1,70 @@
 from __future__ import annotations
 
+import logging
 from datetime import datetime, date, timedelta
 from zoneinfo import ZoneInfo
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from aiogram import Bot
 
+from backup import BackupManager
+from households import HouseholdManager
+from outbox import Outbox
 from services.reports import build_daily_report, build_weekly_report, build_monthly_report
 
+log = logging.getLogger(__name__)
+
 
 # ✅ PROD-варіант: завжди Europe/Warsaw
 WARSAW_TZ = ZoneInfo("Europe/Warsaw")
 
 
-async def _send_to_users(bot: Bot, users: list[int], text: str):
-    for uid in users:
-        try:
-            await bot.send_message(uid, text)
-        except Exception:
-            pass
+async def _send_to_users(outbox: Outbox, users: list[int], text: str):
+    # ліміти / retry / логування недоставлених — в Outbox
+    await outbox.broadcast(users, text)
 
 
-async def send_daily_report(bot: Bot, repo, users: list[int]):
+async def send_daily_report(outbox: Outbox, repo, users: list[int]):
     now = datetime.now(WARSAW_TZ)  # timezone-aware Warsaw
     day_iso = now.date().isoformat()
     text = await build_daily_report(repo, WARSAW_TZ, day_iso)
-    await _send_to_users(bot, users, text)
+    await _send_to_users(outbox, users, text)
 
 
-async def send_weekly_report(bot: Bot, repo, users: list[int]):
+async def send_weekly_report(outbox: Outbox, repo, users: list[int]):
     now = datetime.now(WARSAW_TZ)  # timezone-aware Warsaw
     text = await build_weekly_report(repo, WARSAW_TZ, now)
-    await _send_to_users(bot, users, text)
+    await _send_to_users(outbox, users, text)
 
 
-async def send_monthly_report_for_previous_month(bot: Bot, repo, users: list[int]):
+async def send_monthly_report_for_previous_month(outbox: Outbox, repo, users: list[int]):
     now = datetime.now(WARSAW_TZ)  # timezone-aware Warsaw
     first_day = date(now.year, now.month, 1)
     prev_last_day = first_day - timedelta(days=1)
     y = prev_last_day.year
     m = prev_last_day.month
     text = await build_monthly_report(repo, WARSAW_TZ, y, m)
-    await _send_to_users(bot, users, text)
+    await _send_to_users(outbox, users, text)
+
+
+async def run_for_households(households: HouseholdManager, job, outbox: Outbox):
+    # кожен household — свій звіт зі своєї БД своїм користувачам
+    for household in list(households.households.values()):
+        try:
+            async with households.lease(household) as repo:
+                await job(outbox, repo, list(household.users))
+        except Exception:
+            log.exception("Job %s failed for household %s", job.__name__, household.name)
 
 
 def setup_scheduler(
-    bot: Bot,
-    repo,
+    outbox: Outbox,
+    households: HouseholdManager,
     tz_name: str | None = None,     # сумісність зі старим викликом (ігноруємо)
-    users: list[int] | None = None,
     storage=None,                   # сумісність зі старим викликом
+    backups: BackupManager | None = None,
+    backup_hour: int = -1,
 ) -> AsyncIOScheduler:
-    users = users or []
-
     # ✅ Scheduler теж у Warsaw (не UTC)
     sched = AsyncIOScheduler(timezone=WARSAW_TZ)
 
@@ -61,29 +72,39 @@ def setup_scheduler(
 
     # Daily 22:00 Warsaw
     sched.add_job(
-        send_daily_report,
+        run_for_households,
         trigger=CronTrigger(hour=22, minute=0, timezone=WARSAW_TZ),
-        args=[bot, repo, users],
+        args=[households, send_daily_report, outbox],
         id="daily_report",
         replace_existing=True,
     )
 
     # Weekly Sun 20:00 Warsaw
     sched.add_job(
-        send_weekly_report,
+        run_for_households,
         trigger=CronTrigger(day_of_week="sun", hour=20, minute=0, timezone=WARSAW_TZ),
-        args=[bot, repo, users],
+        args=[households, send_weekly_report, outbox],
         id="weekly_report",
         replace_existing=True,
     )
 
     # Monthly 1st day 09:00 Warsaw
     sched.add_job(
-        send_monthly_report_for_previous_month,
+        run_for_households,
         trigger=CronTrigger(day=1, hour=9, minute=0, timezone=WARSAW_TZ),
-        args=[bot, repo, users],
+        args=[households, send_monthly_report_for_previous_month, outbox],
         id="monthly_report",
         replace_existing=True,
     )
 
+    # Daily backup (за замовчуванням 04:00 Warsaw — між звітами, коли записів майже немає)
+    if backups is not None and backup_hour >= 0:
+        sched.add_job(
+            backups.run,
+            trigger=CronTrigger(hour=backup_hour, minute=0, timezone=WARSAW_TZ),
+            id="backup",
+            replace_existing=True,
+            max_instances=1,
+        )
+
     return sched  # старт робиться в bot.py (scheduler.start())
\ No newline at end of file
@@ -0,0 +1,367 @@
+"""
+Колонкова аналітика по всій історії expenses — без нового SQL на кожне питання.
+
+Витрати household'у тримаються в пам'яті трьома компактними колонками:
+amount (int64, центи), day (int32, expenses.spent_day = date.toordinal) і category (int16).
+Оновлення — інкрементальне по id (WHERE id > last_id): через Repo витрати тільки додаються.
+Після commit'ів інших процесів (Repo.external_writes — там бувають ручні UPDATE/DELETE)
+і не рідше, ніж раз на RECHECK_S, куб день × категорія звіряється з expense_rollup
+по кожній клітинці; розбіжність -> перечитати все.
+
+Агрегації (діапазон × фільтр категорій × group-by / ковзне вікно) — векторні
+через NumPy, якщо він встановлений (pip install numpy), інакше — на dict у Python.
+Колонки — array.array, NumPy бачить їх без копіювання.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from array import array
+from datetime import date
+from typing import Iterable
+from weakref import WeakKeyDictionary
+
+try:
+    import numpy as np
+except ImportError:  # необов'язкова залежність
+    np = None
+
+from repo import Repo
+from services.formatting import money
+
+GROUP_KEYS = ("category", "weekday", "month", "quarter", "year", "day")
+# записи з інших процесів Repo бачить лише через sync_external_writes (на lease) —
+# тож для певності куб звіряється з rollup не рідше, ніж раз на стільки
+RECHECK_S = 30.0
+FETCH_CHUNK = 10_000
+
+
+def _weekday(ordinal: int) -> int:
+    return (ordinal - 1) % 7  # date(1, 1, 1) — понеділок, ordinal 1
+
+
+class ExpenseColumns:
+    """Колонки витрат одного household'у + агрегації над ними."""
+
+    def __init__(self):
+        self.amount = array("q")
+        self.day = array("i")
+        self.category = array("h")
+        self.last_id = 0
+        self.total_cents = 0
+        # згорнутий куб день × категорія (див. _fold): ndarray, або dict без NumPy
+        self._cube = None
+        self._cube_lo = 0
+        self._cube_rows = 0
+        self._lock = asyncio.Lock()
+        self._version: int | None = None
+        self._external_writes = 0
+        self._checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    # ---------- loading ----------
+    async def refresh(self, repo: Repo) -> None:
+        """
+        Дочитати нові рядки. Після записів інших процесів (і раз на RECHECK_S) — звірка
+        з expense_rollup по клітинках день × категорія; не сходиться — перечитати все.
+        """
+        async with self._lock:
+            recheck = (
+                self._external_writes != repo.external_writes or time.monotonic() - self._checked_at >= RECHECK_S
+            )
+            if self._version == repo.data_version and not recheck:
+                return
+            version, external_writes = repo.data_version, repo.external_writes
+            async with repo.db.snapshot():
+                await self._load_since(repo, self.last_id)
+                if recheck:
+                    if not await self._matches_rollup(repo):
+                        self._reset()
+                        await self._load_since(repo, 0)
+                    self._external_writes = external_writes
+                    self._checked_at = time.monotonic()
+                else:
+                    # свої записи — лише додавання; дешева перевірка підсумків на всяк випадок
+                    row = await repo.db.fetchone(
+                        "SELECT COALESCE(SUM(cnt),0) AS n, COALESCE(SUM(sum_cents),0) AS s FROM expense_rollup"
+                    )
+                    if (int(row["n"]), int(row["s"])) != (len(self), self.total_cents):
+                        self._reset()
+                        await self._load_since(repo, 0)
+            self._version = version
+
+    async def _matches_rollup(self, repo: Repo) -> bool:
+        """
+        Куб == expense_rollup по кожній (день, категорія) і за кількістю рядків.
+        Ловить і ручний UPDATE category_id / spent_date, і UPDATE+DELETE з тими ж підсумками.
+        Читає весь rollup — O(днів × категорій), тому не на кожен запис.
+        """
+        rows = await repo.db.fetchall("SELECT spent_day, category_id, sum_cents, cnt FROM expense_rollup")
+        if sum(int(r["cnt"]) for r in rows) != len(self):
+            return False
+        expected = {(int(r["spent_day"]), int(r["category_id"])): int(r["sum_cents"]) for r in rows if r["sum_cents"]}
+        return self._cells() == expected
+
+    def _cells(self) -> dict[tuple[int, int], int]:
+        """Ненульові клітинки куба: (day ordinal, category id) -> центи."""
+        self._fold()
+        if np is None:
+            return {k: s for k, s in self._cube.items() if s}
+        days, cats = np.nonzero(self._cube)
+        return {
+            (self._cube_lo + int(d), int(c)): int(round(self._cube[d, c])) for d, c in zip(days.tolist(), cats.tolist())
+        }
+
+    def _reset(self) -> None:
+        self.amount = array("q")
+        self.day = array("i")
+        self.category = array("h")
+        self.last_id = 0
+        self.total_cents = 0
+        self._cube = None
+        self._cube_rows = 0
+
+    async def _load_since(self, repo: Repo, last_id: int) -> None:
+        async with repo.db.read() as conn:
+            cur = await conn.execute(
+                "SELECT id, amount_cents, category_id, spent_day FROM expenses WHERE id > ? ORDER BY id",
+                (last_id,),
+            )
+            while rows := await cur.fetchmany(FETCH_CHUNK):
+                for expense_id, amount, category_id, spent_day in rows:
+                    self.amount.append(amount)
+                    self.day.append(spent_day)
+                    self.category.append(category_id)
+                    self.total_cents += amount
+                self.last_id = rows[-1][0]
+
+    # ---------- aggregations ----------
+    # Агрегації йдуть не по рядках, а по кубу день × категорія, який згортається
+    # з колонок (bincount) і далі дописується тільки новими рядками. Запит =
+    # O(днів діапазону × категорій), незалежно від кількості витрат.
+    def _fold(self) -> None:
+        n = len(self)
+        if self._cube is not None and self._cube_rows == n:
+            return
+        if np is None:
+            cube = self._cube if self._cube is not None else {}
+            for a, d, c in zip(self.amount[self._cube_rows:], self.day[self._cube_rows:], self.category[self._cube_rows:]):
+                cube[d, c] = cube.get((d, c), 0) + a
+            self._cube, self._cube_rows = cube, n
+            return
+
+        amount = np.frombuffer(self.amount, dtype=np.int64)[self._cube_rows:]
+        day = np.frombuffer(self.day, dtype=np.int32)[self._cube_rows:]
+        category = np.frombuffer(self.category, dtype=np.int16)[self._cube_rows:]
+        lo, (n_days, n_cats) = self._cube_lo, (self._cube.shape if self._cube is not None else (0, 0))
+        fits = (
+            self._cube is not None
+            and (not day.size or (int(day.min()) >= lo and int(day.max()) < lo + n_days and int(category.max()) < n_cats))
+        )
+        if fits:
+            # float64 точний до 2^53 центів — з запасом
+            np.add.at(self._cube, (day - lo, category), amount)
+        else:
+            amount = np.frombuffer(self.amount, dtype=np.int64)
+            day = np.frombuffer(self.day, dtype=np.int32)
+            category = np.frombuffer(self.category, dtype=np.int16)
+            if not n:
+                self._cube, self._cube_lo = np.zeros((0, 0)), 0
+            else:
+                lo = int(day.min())
+                n_days, n_cats = int(day.max()) - lo + 1, int(category.max()) + 1
+                idx = (day.astype(np.int64) - lo) * n_cats + category
+                self._cube = np.bincount(idx, weights=amount, minlength=n_days * n_cats).reshape(n_days, n_cats)
+                self._cube_lo = lo
+        self._cube_rows = n
+
+    def _key_table(self, key: str, lo: int, hi: int) -> list[int]:
+        """day ordinal -> ключ групи для днів lo..hi (місяць = y*12+m-1, квартал = y*4+q-1)."""
+        table = []
+        for ordinal in range(lo, hi + 1):
+            if key == "day":
+                table.append(ordinal)
+                continue
+            if key == "weekday":
+                table.append(_weekday(ordinal))
+                continue
+            d = date.fromordinal(ordinal)
+            if key == "month":
+                table.append(d.year * 12 + d.month - 1)
+            elif key == "quarter":
+                table.append(d.year * 4 + (d.month - 1) // 3)
+            else:
+                table.append(d.year)
+        return table
+
+    def group_by(
+        self, key: str, start: date, end: date, categories: Iterable[int] | None = None
+    ) -> dict[int, int]:
+        """
+        Сума витрат за [start, end] (включно) по ключу: category id, weekday (0 = пн),
+        month (y*12+m-1), quarter (y*4+q-1), year, day (ordinal).
+        """
+        if key not in GROUP_KEYS:
+            raise ValueError(f"unknown group key: {key}")
+        self._fold()
+        cats = None if categories is None else set(categories)
+        lo, hi = start.toordinal(), end.toordinal()
+        if np is None:
+            return self._group_by_py(key, lo, hi, cats)
+
+        cube = self._cube
+        lo, hi = max(lo, self._cube_lo), min(hi, self._cube_lo + cube.shape[0] - 1)
+        if lo > hi:
+            return {}
+        sub = cube[lo - self._cube_lo:hi - self._cube_lo + 1]
+        if cats is not None:
+            mask = np.zeros(cube.shape[1], dtype=bool)
+            mask[[c for c in cats if 0 <= c < cube.shape[1]]] = True
+            sub = sub * mask
+
+        if key == "category":
+            sums = sub.sum(axis=0)
+            return {int(c): int(round(sums[c])) for c in np.flatnonzero(sums)}
+        per_day = sub.sum(axis=1)
+        keys = np.asarray(self._key_table(key, lo, hi), dtype=np.int64)
+        base = int(keys[0]) if key != "weekday" else 0
+        sums = np.bincount(keys - base, weights=per_day)
+        return {base + int(k): int(round(sums[k])) for k in np.flatnonzero(sums)}
+
+    def _group_by_py(self, key: str, lo: int, hi: int, cats: set[int] | None) -> dict[int, int]:
+        table = self._key_table(key, lo, hi) if key != "category" else None
+        out: dict[int, int] = {}
+        for (d, c), s in self._cube.items():
+            if lo <= d <= hi and (cats is None or c in cats):
+                k = c if table is None else table[d - lo]
+                out[k] = out.get(k, 0) + s
+        return out
+
+    def total(self, start: date, end: date, categories: Iterable[int] | None = None) -> int:
+        return sum(self.group_by("year", start, end, categories).values())
+
+    def daily(self, start: date, end: date, categories: Iterable[int] | None = None) -> list[int]:
+        """Сума за кожен день [start, end], включно з нульовими днями."""
+        lo = start.toordinal()
+        out = [0] * (end.toordinal() - lo + 1)
+        for ordinal, s in self.group_by("day", start, end, categories).items():
+            out[ordinal - lo] = s
+        return out
+
+    def rolling(self, window_days: int, start: date, end: date, categories: Iterable[int] | None = None) -> list[int]:
+        """Ковзна сума за window_days днів, що закінчуються кожним днем [start, end]."""
+        lead = date.fromordinal(start.toordinal() - window_days + 1)
+        per_day = self.daily(lead, end, categories)
+        out, acc = [], 0
+        for i, s in enumerate(per_day):
+            acc += s
+            if i >= window_days:
+                acc -= per_day[i - window_days]
+            if i >= window_days - 1:
+                out.append(acc)
+        return out
+
+
+_COLUMNS: WeakKeyDictionary[Repo, ExpenseColumns] = WeakKeyDictionary()
+
+
+async def expense_columns(repo: Repo) -> ExpenseColumns:
+    """Колонки household'у (живуть, поки живе його Repo), оновлені до поточного стану БД."""
+    columns = _COLUMNS.get(repo)
+    if columns is None:
+        columns = _COLUMNS[repo] = ExpenseColumns()
+    await columns.refresh(repo)
+    return columns
+
+
+# ---------- /stats texts ----------
+MONTHS_SHORT = ("січ", "лют", "бер", "кві", "тра", "чер", "лип", "сер", "вер", "жов", "лис", "гру")
+WEEKDAYS_SHORT = ("пн", "вт", "ср", "чт", "пт", "сб", "нд")
+
+
+def _bar(value: int, top: int, width: int = 10) -> str:
+    return "▇" * max(0, round(width * value / top)) if top > 0 else ""
+
+
+def _shift_months(d: date, months: int) -> date:
+    idx = d.year * 12 + d.month - 1 + months
+    return date(idx // 12, idx % 12 + 1, 1)
+
+
+async def _category_labels(repo: Repo) -> dict[int, str]:
+    return {int(c["id"]): f"{c['emoji']} {c['name']}" for c in await repo.list_categories()}
+
+
+async def stats_months(repo: Repo, today: date, n: int = 12) -> str:
+    cols = await expense_columns(repo)
+    start = _shift_months(today, -(n - 1))
+    sums = cols.group_by("month", start, today)
+    top = max(sums.values(), default=0)
+    lines = [f"📈 Витрати по місяцях ({n})"]
+    for i in range(n):
+        m = _shift_months(start, i)
+        s = sums.get(m.year * 12 + m.month - 1, 0)
+        lines.append(f"{MONTHS_SHORT[m.month - 1]} {m.year % 100:02d} {_bar(s, top)} {money(s)}")
+    return "\n".join(lines)
+
+
+async def stats_quarters(repo: Repo, today: date, n: int = 8) -> str:
+    cols = await expense_columns(repo)
+    q_now = today.year * 4 + (today.month - 1) // 3
+    first = q_now - n + 1
+    sums = cols.group_by("quarter", date(first // 4, (first % 4) * 3 + 1, 1), today)
+    top = max(sums.values(), default=0)
+    lines = [f"📈 Витрати по кварталах ({n})"]
+    prev = None
+    for q in range(first, q_now + 1):
+        s = sums.get(q, 0)
+        trend = "" if not prev else f" ({(s - prev) * 100 // prev:+d}%)"
+        lines.append(f"Q{q % 4 + 1} {q // 4} {_bar(s, top)} {money(s)}{trend}")
+        prev = s
+    return "\n".join(lines)
+
+
+async def stats_year(repo: Repo, year: int, today: date) -> str:
+    cols = await expense_columns(repo)
+    end = min(date(year, 12, 31), today)
+    sums = cols.group_by("category", date(year, 1, 1), end)
+    labels = await _category_labels(repo)
+    total = sum(sums.values())
+    lines = [f"📊 {year}: {money(total)}"]
+    for cid, s in sorted(sums.items(), key=lambda kv: kv[1], reverse=True):
+        share = s * 100 // total if total else 0
+        lines.append(f"{labels.get(cid, f'#{cid}')} — {money(s)} ({share}%)")
+    if not sums:
+        lines.append("—")
+    return "\n".join(lines)
+
+
+async def stats_weekdays(repo: Repo, today: date, days: int = 364) -> str:
+    cols = await expense_columns(repo)
+    start = date.fromordinal(today.toordinal() - days + 1)
+    sums = cols.group_by("weekday", start, today)
+    weeks = days / 7
+    top = max(sums.values(), default=0)
+    lines = [f"📅 Середні витрати за день тижня ({days} днів)"]
+    for wd, name in enumerate(WEEKDAYS_SHORT):
+        s = sums.get(wd, 0)
+        lines.append(f"{name} {_bar(s, top)} {money(int(s / weeks))}")
+    return "\n".join(lines)
+
+
+async def stats_rolling(repo: Repo, today: date, window: int = 30) -> str:
+    cols = await expense_columns(repo)
+    year_ago = date.fromordinal(today.toordinal() - 364)
+    series = cols.rolling(window, year_ago, today)
+    now, then = series[-1], series[0]
+    peak = max(range(len(series)), key=series.__getitem__)
+    peak_day = date.fromordinal(year_ago.toordinal() + peak)
+    change = f" ({(now - then) * 100 // then:+d}%)" if then else ""
+    return (
+        f"📉 Ковзна сума за {window} днів\n"
+        f"Зараз: {money(now)}\n"
+        f"Рік тому: {money(then)}{change}\n"
+        f"Максимум за рік: {money(series[peak])} ({peak_day.strftime('%d.%m.%Y')})"
+    )
@@ -3,8 +3,10 @@ from __future__ import annotations
 import calendar
 from dataclasses import dataclass
 from datetime import datetime, date
+from itertools import accumulate
 from zoneinfo import ZoneInfo
 
+from models import MonthSnapshot, SafeSpendSeries
 from repo import Repo
 
 
@@ -26,61 +28,70 @@ def month_bounds(now: datetime, tz: ZoneInfo) -> MonthContext:
     return MonthContext(year=y, month=m, start_date=start, end_date=end)
 
 
-async def safe_spend_for_day(repo: Repo, tz: ZoneInfo, day_iso: str) -> int:
+async def safe_spend_series(
+    repo: Repo, year: int, month: int, snap: MonthSnapshot | None = None
+) -> SafeSpendSeries:
     """
-    Safe-spend (оновлена логіка):
-    - Fixed ліміти завжди "резервуємо" (навіть якщо їх ще не оплатили)
-    - Витрати беремо "всі", але знімаємо fixed витрати (бо fixed вже врахували через резерв)
+    Safe-spend план на ВСІ дні місяця за один прохід (логіка — як у safe_spend_for_day):
 
-    planned_fixed = sum(fixed limits)
-    spent_nonfixed_so_far = spent_total_so_far - spent_fixed_so_far
+        safe_spend(d) = max(0, (monthly_budget - planned_fixed - spent_nonfixed_before(d)) / (days_in_month - d + 1))
 
-    safe_spend(day) =
-        max(0, (monthly_budget - planned_fixed - spent_nonfixed_so_far) / remaining_days_including_day)
-
-    Важливо для daily:
-    - so_far беремо ДО day_iso (spent_date < day_iso), щоб план не "зʼїдав" витрати цього дня.
+    spent_nonfixed_before(d) — префіксні суми денних variable-витрат, тож кожен день = O(1).
+    Кешується в repo.derived до наступного запису (repo.data_version).
+    snap — знімок усього місяця, якщо він уже є у виклику (економить запит).
     """
-    y = int(day_iso[0:4])
-    m = int(day_iso[5:7])
-    d = int(day_iso[8:10])
+    key = ("safe_spend_series", year, month)
+    cached = repo.derived.get(key, repo.data_version)
+    if cached is not None:
+        return cached
 
-    monthly_budget = await repo.get_monthly_budget(y, m)
-    if monthly_budget <= 0:
-        return 0
+    version = repo.data_version
+    days_in_month = calendar.monthrange(year, month)[1]
 
-    start_iso = date(y, m, 1).isoformat()
+    if snap is None or (snap.year, snap.month) != (year, month):
+        snap = await repo.month_snapshot(year, month)
 
-    # Суми ДО day_iso (exclusive) по категоріях
-    sums_before = dict(await repo.sum_month_by_category(start_iso, day_iso))
+    if snap.budget_cents <= 0:
+        plan = (0,) * (days_in_month + 1)
+    else:
+        start = date(year, month, 1)
+        last = date(year, month, days_in_month)
+        daily = dict(await repo.daily_totals_by_kind_in_range(start.isoformat(), last.isoformat(), "variable"))
+        per_day = [daily.get(date(year, month, d).isoformat(), 0) for d in range(1, days_in_month + 1)]
 
-    cats = await repo.list_categories()
-    limits = await repo.get_month_limits_map(y, m)
+        # before[d-1] = variable витрати за дні < d
+        before = [0, *accumulate(per_day)]
+        available = snap.budget_cents - snap.planned_fixed_cents
 
-    planned_fixed_cents = 0
-    spent_total_so_far = 0
-    spent_fixed_so_far = 0
+        plan = tuple(
+            max(0, int(round((available - before[d - 1]) / max(1, days_in_month - d + 1))))
+            for d in range(1, days_in_month + 2)
+        )
 
-    for c in cats:
-        cid = int(c["id"])
-        spent_cat = int(sums_before.get(cid, 0))
-        spent_total_so_far += spent_cat
+    series = SafeSpendSeries(year=year, month=month, plan=plan)
+    # за час обчислення міг прийти запис — тоді результат не кешуємо
+    if version == repo.data_version:
+        repo.derived.put(key, version, series)
+    return series
 
-        kind = c["kind"]
-        lim = limits.get(cid, c["limit_cents"])
 
-        if kind == "fixed":
-            spent_fixed_so_far += spent_cat
-            if lim is not None:
-                planned_fixed_cents += max(0, int(lim))
+async def safe_spend_for_day(repo: Repo, tz: ZoneInfo, day_iso: str) -> int:
+    """
+    Safe-spend (оновлена логіка):
+    - Fixed ліміти завжди "резервуємо" (навіть якщо їх ще не оплатили)
+    - Витрати беремо "всі", але знімаємо fixed витрати (бо fixed вже врахували через резерв)
 
+    planned_fixed = sum(fixed limits)
     spent_nonfixed_so_far = spent_total_so_far - spent_fixed_so_far
 
-    days_in_month = calendar.monthrange(y, m)[1]
-    remaining_days = max(1, days_in_month - d + 1)  # включно з day_iso
+    safe_spend(day) =
+        max(0, (monthly_budget - planned_fixed - spent_nonfixed_so_far) / remaining_days_including_day)
 
-    safe_spend_cents = int(round((monthly_budget - planned_fixed_cents - spent_nonfixed_so_far) / remaining_days))
-    if safe_spend_cents < 0:
-        safe_spend_cents = 0
+    Важливо для daily:
+    - so_far беремо ДО day_iso (spent_date < day_iso), щоб план не "зʼїдав" витрати цього дня.
 
-    return safe_spend_cents
+    Рахується через safe_spend_series (вся серія місяця, кеш до наступного запису).
+    """
+    d = date.fromisoformat(day_iso)
+    series = await safe_spend_series(repo, d.year, d.month)
+    return series.for_day(d.day)
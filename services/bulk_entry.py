@@ -0,0 +1,87 @@
+"""
+Багато витрат одним повідомленням (/bulk): рядок = витрата, дата необов'язкова.
+Категорії впізнаються тим самим індексом, що й швидка витрата (services.quick_entry).
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import date
+
+from repo import Repo
+from services.formatting import parse_amount_to_cents, parse_date_ddmmyyyy
+from services.quick_entry import CategoryIndex, category_index
+
+MAX_BULK_LINES = 300
+_DDMMYYYY_RE = re.compile(r"\d{2}\.\d{2}\.\d{4}")
+_COMMAND_RE = re.compile(r"/bulk(?:@\w+)?", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class BulkLine:
+    line_no: int
+    text: str
+    amount_cents: int = 0
+    spent_date: str = ""
+    category_id: int | None = None
+    comment: str | None = None
+    error: str | None = None
+
+
+def _bulk_date(token: str) -> str | None:
+    iso = parse_date_ddmmyyyy(token)
+    try:
+        # 31.02 parse_date_ddmmyyyy пропускає — календар перевіряємо тут
+        return date.fromisoformat(iso).isoformat() if iso else None
+    except ValueError:
+        return None
+
+
+def _parse_bulk_line(line_no: int, line: str, index: CategoryIndex, default_date: str) -> BulkLine:
+    # "DD.MM.YYYY; сума; категорія; коментар" або те саме через пробіли; дата необов'язкова
+    # parts: [дата?] сума, категорія [+ коментар], коментар...
+    separated = ";" in line
+    parts = [f.strip() for f in line.split(";")] if separated else line.split(maxsplit=1)
+
+    spent_date = default_date
+    if parts and _DDMMYYYY_RE.fullmatch(parts[0]):
+        spent_date = _bulk_date(parts[0])
+        if spent_date is None:
+            return BulkLine(line_no, line, error=f"невірна дата «{parts[0]}»")
+        parts = parts[1:] if separated else (parts[1].split(maxsplit=1) if len(parts) > 1 else [])
+
+    if not parts or not parts[0]:
+        return BulkLine(line_no, line, error="немає суми")
+    cents = parse_amount_to_cents(parts[0])
+    if cents is None or cents <= 0:
+        return BulkLine(line_no, line, error=f"невірна сума «{parts[0]}»")
+
+    category_words = parts[1].split() if len(parts) > 1 else []
+    category_id, used = index.match(category_words)
+    if category_id is None:
+        what = " ".join(category_words)
+        return BulkLine(line_no, line, error=f"невідома категорія «{what}»" if what else "немає категорії")
+    tail = (" ".join(category_words[used:]), "; ".join(p for p in parts[2:] if p))
+    comment = " ".join(t for t in tail if t) or None
+    return BulkLine(line_no, line, cents, spent_date, category_id, comment)
+
+
+async def parse_bulk(text: str, repo: Repo, today: date) -> list[BulkLine]:
+    """
+    Багато рядків -> BulkLine на кожен непорожній рядок (з error, якщо рядок не розібрано).
+    Рядок без дати бере дату попереднього (перший — сьогодні).
+    "/bulk" першим рядком (команда і витрати одним повідомленням) пропускається;
+    нумерація рядків — як у повідомленні.
+    """
+    index = await category_index(repo)
+    out: list[BulkLine] = []
+    current = today.isoformat()
+    for line_no, line in enumerate((text or "").splitlines(), start=1):
+        line = line.strip()
+        if not line or (line_no == 1 and _COMMAND_RE.fullmatch(line)):
+            continue
+        parsed = _parse_bulk_line(line_no, line, index, current)
+        if parsed.error is None:
+            current = parsed.spent_date
+        out.append(parsed)
+    return out
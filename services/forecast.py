@@ -0,0 +1,211 @@
+"""
+Прогноз витрат на кінець місяця — по категоріях і загалом.
+
+- variable: денний run-rate = витрачено / днів, що минули (включно з сьогодні),
+  прогноз = витрачено + run-rate × днів, що лишились;
+- fixed: запланований разовий платіж — прогноз = max(витрачено, ліміт);
+- "перевищення з дня X" — перший день, коли накопичене (з урахуванням ще не
+  сплачених fixed) перетне ліміт / бюджет.
+
+Суми місяця по категоріях (MonthSpend) читаються один раз і далі оновлюються
+через Repo.expense_listeners — нова витрата не перечитує місяць; будь-яка інша зміна
+(ліміти, видалення, інший процес) — перечитує. Ліміти й бюджет — з ReadCache Repo,
+тож прогноз зазвичай не коштує жодного запиту до БД.
+"""
+from __future__ import annotations
+
+import calendar
+from dataclasses import dataclass
+from datetime import date
+from weakref import WeakKeyDictionary
+
+from models import MonthSnapshot
+from repo import Repo
+from services.formatting import money
+
+MIN_ELAPSED_DAYS = 3  # раніше run-rate — шум: прогноз не показуємо
+MAX_CATEGORY_WARNINGS = 3
+
+
+@dataclass(frozen=True)
+class CategoryForecast:
+    id: int
+    emoji: str
+    name: str
+    kind: str
+    limit_cents: int | None
+    spent_cents: int
+    projected_cents: int
+    overspend_day: int | None  # день місяця, з якого прогнозується перевищення ліміту
+
+
+@dataclass(frozen=True)
+class MonthForecast:
+    year: int
+    month: int
+    today: int  # день місяця, на який зроблено прогноз
+    days_in_month: int
+    budget_cents: int
+    spent_cents: int
+    projected_cents: int
+    overspend_day: int | None  # день місяця, з якого прогнозується перевищення бюджету
+    categories: tuple[CategoryForecast, ...]
+
+
+def _crossing_day(today: int, days_in_month: int, committed: int, rate: float, cap: int) -> int | None:
+    """Перший день (today..days_in_month), коли committed + rate × днів після today > cap."""
+    if committed > cap:
+        return today
+    if rate <= 0:
+        return None
+    day = today + int((cap - committed) // rate) + 1
+    return day if day <= days_in_month else None
+
+
+def build_forecast(
+    year: int,
+    month: int,
+    today: int,
+    budget_cents: int,
+    spent_total: int,
+    spent: dict[int, int],
+    categories: list[tuple[int, str, str, str, int | None]],
+) -> MonthForecast:
+    """
+    Чиста функція: spent_total — усі витрати місяця (включно з неактивними категоріями),
+    spent — по category_id, categories — (id, emoji, name, kind, ефективний ліміт)
+    активних категорій.
+    """
+    days_in_month = calendar.monthrange(year, month)[1]
+    remaining_days = days_in_month - today
+
+    out = []
+    committed = spent_total
+    total_rate = 0.0
+    for cid, emoji, name, kind, limit in categories:
+        s = spent.get(cid, 0)
+        if kind == "fixed":
+            projected = max(s, limit or 0)
+            committed += projected - s  # ще не сплачений платіж уже "зайнятий"
+            overspend = today if limit is not None and 0 < limit < s else None
+        else:
+            rate = s / today
+            total_rate += rate
+            projected = s + int(round(rate * remaining_days))
+            overspend = _crossing_day(today, days_in_month, s, rate, limit) if limit else None
+        out.append(CategoryForecast(cid, emoji, name, kind, limit, s, projected, overspend))
+
+    projected_total = committed + int(round(total_rate * remaining_days))
+    overspend_day = (
+        _crossing_day(today, days_in_month, committed, total_rate, budget_cents) if budget_cents > 0 else None
+    )
+    return MonthForecast(
+        year=year,
+        month=month,
+        today=today,
+        days_in_month=days_in_month,
+        budget_cents=budget_cents,
+        spent_cents=spent_total,
+        projected_cents=projected_total,
+        overspend_day=overspend_day,
+        categories=tuple(out),
+    )
+
+
+class MonthSpend:
+    """
+    Витрати по категоріях за місяці household'у. Кожні суми зберігаються з
+    repo.data_version, на якій вони точні; listener дописує нову витрату тільки
+    до сум, точних рівно до цього запису (версія = нова - 1). Будь-яка інша зміна
+    версії (не-витрата, зовнішній процес) лишає суми застарілими — get() перечитує.
+    """
+
+    def __init__(self, repo: Repo):
+        self.repo = repo
+        self._months: dict[tuple[int, int], tuple[int, dict[int, int]]] = {}
+        repo.expense_listeners.append(self.on_expenses)
+
+    def on_expenses(self, rows: list[tuple[int, int, str]]) -> None:
+        # викликається одразу після Repo._changed() цього ж запису
+        version = self.repo.data_version
+        for key, (sums_version, sums) in list(self._months.items()):
+            if sums_version != version - 1:
+                continue  # пропустили іншу зміну — суми вже не точні, get() перечитає
+            for amount, category_id, spent_date in rows:
+                if (int(spent_date[0:4]), int(spent_date[5:7])) == key:
+                    sums[category_id] = sums.get(category_id, 0) + amount
+            self._months[key] = (version, sums)
+
+    async def get(self, repo: Repo, year: int, month: int) -> dict[int, int]:
+        key = (year, month)
+        cached = self._months.get(key)
+        if cached is not None and cached[0] == repo.data_version:
+            return cached[1]
+
+        version, busy = repo.data_version, repo.db.pending_writes
+        start = date(year, month, 1).toordinal()
+        rows = await repo.db.fetchall(
+            """
+            SELECT category_id, SUM(sum_cents) AS s FROM expense_rollup
+            WHERE spent_day>=? AND spent_day<? GROUP BY category_id
+            """,
+            (start, start + calendar.monthrange(year, month)[1]),
+        )
+        sums = {int(r["category_id"]): int(r["s"]) for r in rows}
+        # Запис у польоті міг закомітитись до нашого читання, а listener спрацює після —
+        # і додав би ту саму суму вдруге. Тож кешуємо тільки читання без записів навколо.
+        if busy == 0 and repo.db.pending_writes == 0 and version == repo.data_version:
+            self._months[key] = (version, sums)
+            for old in sorted(self._months)[:-2]:  # поточний + попередній місяць
+                del self._months[old]
+        return sums
+
+
+_SPEND: WeakKeyDictionary[Repo, MonthSpend] = WeakKeyDictionary()
+
+
+async def month_forecast(repo: Repo, year: int, month: int, today: int, snap: MonthSnapshot | None = None) -> MonthForecast:
+    """
+    Прогноз на день today місяця. snap (якщо вже є у виклику, як у "Стан бюджету") —
+    джерело сум, лімітів і бюджету без жодного запиту; інакше MonthSpend + ReadCache.
+    Витрати після today (майбутні дати) враховуються як уже зроблені.
+    """
+    if snap is not None and (snap.year, snap.month) == (year, month):
+        categories = [(c.id, c.emoji, c.name, c.kind, c.limit_cents) for c in snap.categories]
+        return build_forecast(
+            year, month, today, snap.budget_cents, snap.total_cents, snap.spent_by_category, categories
+        )
+
+    tracker = _SPEND.get(repo)
+    if tracker is None:
+        tracker = _SPEND[repo] = MonthSpend(repo)
+    spent = await tracker.get(repo, year, month)
+    limits = await repo.get_month_limits_map(year, month)
+    categories = [
+        (int(c["id"]), c["emoji"], c["name"], c["kind"], limits[int(c["id"])] if int(c["id"]) in limits else c["limit_cents"])
+        for c in await repo.list_categories()
+    ]
+    budget = await repo.get_monthly_budget(year, month)
+    return build_forecast(year, month, today, budget, sum(spent.values()), spent, categories)
+
+
+def forecast_lines(fc: MonthForecast) -> list[str]:
+    """Рядки прогнозу для "Стан бюджету" / daily report; [] на початку місяця."""
+    if fc.today < MIN_ELAPSED_DAYS:
+        return []
+    lines = [f"📈 Прогноз на кінець місяця: {money(fc.projected_cents)}"]
+    if fc.budget_cents > 0:
+        if fc.overspend_day is None:
+            lines.append(f"🟢 У межах бюджету ({money(fc.budget_cents)})")
+        elif fc.overspend_day <= fc.today:
+            lines.append(f"🔴 Бюджет уже перевищено, прогноз: {money(fc.projected_cents - fc.budget_cents)} понад")
+        else:
+            lines.append(f"🔴 Прогноз: перевищення бюджету з {fc.overspend_day:02d}.{fc.month:02d}")
+
+    risky = sorted(
+        (c for c in fc.categories if c.kind != "fixed" and c.overspend_day is not None and c.overspend_day > fc.today),
+        key=lambda c: c.overspend_day,
+    )
+    for c in risky[:MAX_CATEGORY_WARNINGS]:
+        lines.append(f"⚠️ {c.emoji} {c.name}: ліміт закінчиться ~{c.overspend_day:02d}.{fc.month:02d}")
+    return lines
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from repo import Repo
+from services.formatting import parse_amount_to_cents
+
+# Аліаси для дефолтних категорій (Repo.ensure_default_categories): назва -> слова.
+# Для категорій, яких у household'і немає, просто ігноруються.
+DEFAULT_ALIASES: dict[str, tuple[str, ...]] = {
+    "Продукти (дім)": ("їжа", "магазин", "biedronka", "lidl", "żabka", "zakupy"),
+    "Кафе / доставка": ("кава", "ресторан", "обід", "kawiarnia", "restauracja", "glovo", "wolt", "pyszne"),
+    "Транспорт": ("таксі", "бензин", "квиток", "uber", "bolt", "paliwo", "bilet"),
+    "Медицина": ("аптека", "лікар", "apteka", "lekarz"),
+    "Підписки / софт": ("netflix", "spotify", "youtube"),
+    "Шопінг": ("одяг", "взуття"),
+    "Розваги": ("кіно", "kino"),
+}
+
+# дата на початку (або одразу після суми): слово чи DD.MM / DD.MM.YYYY
+DATE_WORDS = {"сьогодні": 0, "вчора": 1, "позавчора": 2}
+_DATE_RE = re.compile(r"(\d{1,2})\.(\d{1,2})(?:\.(\d{4}))?")
+_WORD_RE = re.compile(r"\w+")
+MIN_PREFIX = 2
+
+
+def normalize(token: str) -> str:
+    # emoji з variation selector і без нього — один ключ
+    return token.casefold().replace("\ufe0f", "").strip()
+
+
+@dataclass(frozen=True)
+class CategoryIndex:
+    """
+    Префіксний індекс категорій: відсортовані ключі (слова назв, emoji, аліаси) -> id.
+    Пошук слова — bisect + прохід по ключах з тим самим префіксом.
+    """
+    keys: tuple[str, ...]
+    ids: tuple[frozenset[int], ...]
+    emojis: dict[str, int]
+
+    @classmethod
+    def build(cls, categories, aliases: dict[str, tuple[str, ...]] = DEFAULT_ALIASES) -> CategoryIndex:
+        by_key: dict[str, set[int]] = {}
+        emojis: dict[str, int] = {}
+        for c in categories:
+            cid = int(c["id"])
+            words = _WORD_RE.findall(normalize(c["name"])) + [normalize(a) for a in aliases.get(c["name"], ())]
+            for w in words:
+                by_key.setdefault(w, set()).add(cid)
+            if c["emoji"]:
+                emojis.setdefault(normalize(c["emoji"]), cid)
+        keys = tuple(sorted(by_key))
+        return cls(
+            keys=keys,
+            ids=tuple(frozenset(by_key[k]) for k in keys),
+            emojis=emojis,
+        )
+
+    def lookup(self, token: str) -> frozenset[int]:
+        """id категорій, у яких є слово з префіксом token (точний збіг слова — пріоритетний)."""
+        t = normalize(token)
+        if t in self.emojis:
+            return frozenset((self.emojis[t],))
+        if len(t) < MIN_PREFIX:
+            return frozenset()
+        i = bisect_left(self.keys, t)
+        if i < len(self.keys) and self.keys[i] == t and len(self.ids[i]) == 1:
+            return self.ids[i]
+        found: set[int] = set()
+        while i < len(self.keys) and self.keys[i].startswith(t):
+            found |= self.ids[i]
+            i += 1
+        return frozenset(found)
+
+    def match(self, tokens: list[str]) -> tuple[int | None, int]:
+        """
+        Категорія з перших слів: звужуємо кандидатів слово за словом ("дім техніка"),
+        доки не лишиться одна. -> (category_id | None, скільки слів з'їдено).
+        """
+        candidates: frozenset[int] | None = None
+        for n, token in enumerate(tokens, start=1):
+            found = self.lookup(token)
+            narrowed = found if candidates is None else candidates & found
+            if not narrowed:
+                break
+            candidates = narrowed
+            if len(candidates) == 1:
+                return next(iter(candidates)), n
+        return None, 0
+
+
+async def category_index(repo: Repo) -> CategoryIndex:
+    """Індекс з repo.derived; перебудовується тільки коли змінився набір категорій."""
+    key = ("category_index",)
+    version = repo.categories_version
+    index = repo.derived.get(key, version)
+    if index is None:
+        index = CategoryIndex.build(await repo.list_categories())
+        if version == repo.categories_version:
+            repo.derived.put(key, version, index)
+    return index
+
+
+@dataclass(frozen=True)
+class QuickExpense:
+    amount_cents: int
+    spent_date: str  # YYYY-MM-DD
+    category_id: int | None  # None -> не впізнали, треба спитати
+    comment: str | None
+    unmatched: str | None = None  # слова, які не стали категорією (коли category_id is None)
+
+
+def _parse_date(token: str, today: date) -> str | None:
+    t = normalize(token)
+    if t in DATE_WORDS:
+        return (today - timedelta(days=DATE_WORDS[t])).isoformat()
+    m = _DATE_RE.fullmatch(t)
+    if not m:
+        return None
+    year = int(m[3]) if m[3] else today.year
+    try:
+        return date(year, int(m[2]), int(m[1])).isoformat()
+    except ValueError:
+        return None
+
+
+def split_amount_and_date(text: str, today: date) -> tuple[int, str, list[str]] | None:
+    """
+    "[дата] сума [дата] решта..." -> (cents, YYYY-MM-DD, решта слів).
+    None — це не швидка витрата (дешево: без БД, для фільтра на кожне повідомлення).
+    """
+    tokens = (text or "").split()
+    if not tokens:
+        return None
+    # "12.05 30 кафе" — дата і сума; "12.05 кафе" — сума 12,05 без дати
+    spent_date = _parse_date(tokens[0], today)
+    if spent_date is not None and len(tokens) > 1 and parse_amount_to_cents(tokens[1]):
+        tokens = tokens[1:]
+    else:
+        spent_date = None
+    cents = parse_amount_to_cents(tokens[0])
+    if cents is None or cents <= 0:
+        return None
+    tokens = tokens[1:]
+    if spent_date is None and tokens:
+        spent_date = _parse_date(tokens[0], today)
+        if spent_date is not None:
+            tokens = tokens[1:]
+    return cents, spent_date or today.isoformat(), tokens
+
+
+async def parse_quick_expense(text: str, repo: Repo, today: date) -> QuickExpense | None:
+    """
+    Одне повідомлення -> витрата: "45,50 кафе kawiarnia", "вчора 120 транспорт",
+    "12.05 30 🛒". Після категорії — коментар. Індекс категорій береться тільки
+    коли вже є сума.
+    """
+    parsed = split_amount_and_date(text, today)
+    if parsed is None:
+        return None
+    cents, spent_date, tokens = parsed
+    category_id, used = (await category_index(repo)).match(tokens)
+    if category_id is None:
+        return QuickExpense(cents, spent_date, None, None, " ".join(tokens) or None)
+    return QuickExpense(cents, spent_date, category_id, " ".join(tokens[used:]) or None)
@@ -1,20 +1,54 @@
 from __future__ import annotations
 
 from datetime import datetime, date, timedelta
+from functools import wraps
 from zoneinfo import ZoneInfo
 import calendar
 
 from repo import Repo
 from services.formatting import money
-from services.budgeting import safe_spend_for_day
+from services.budgeting import safe_spend_series
+from services.forecast import forecast_lines, month_forecast
+
+
+def _cached_report(kind: str, period):
+    """
+    Кеш готового тексту звіту за ключем (kind, period(*args)) і repo.data_version:
+    якщо з останньої побудови не було записів — відповідь без жодного запиту до SQLite.
+    Інакше всі запити білдера — в одній read-транзакції (цифри звіту з одного стану БД).
+    """
+    def decorator(build):
+        @wraps(build)
+        async def wrapper(repo: Repo, tz: ZoneInfo, *args):
+            key = ("report", kind, period(*args))
+            version = repo.data_version
+            text = repo.derived.get(key, version)
+            if text is not None:
+                return text
+
+            async with repo.db.snapshot():
+                text = await build(repo, tz, *args)
+            if version == repo.data_version:
+                repo.derived.put(key, version, text)
+            return text
+        return wrapper
+    return decorator
+
+
+def week_start(now: datetime) -> date:
+    today = date(now.year, now.month, now.day)
+    return today - timedelta(days=today.isoweekday() - 1)  # Monday
+
 
+@_cached_report("daily", lambda day_iso: day_iso)
 async def build_daily_report(repo: Repo, tz: ZoneInfo, day_iso: str) -> str:
     y = int(day_iso[0:4]); m = int(day_iso[5:7]); d = int(day_iso[8:10])
 
     total_day = await repo.sum_by_date(day_iso)
     var_day = await repo.sum_by_date_and_kind(day_iso, "variable")
 
-    plan_today = await safe_spend_for_day(repo, tz, day_iso)
+    series = await safe_spend_series(repo, y, m)
+    plan_today = series.for_day(d)
     delta = var_day - plan_today
     res = f"🔴 {money(delta)}" if delta > 0 else f"🟢 {money(abs(delta))}"
 
@@ -22,11 +56,15 @@ async def build_daily_report(repo: Repo, tz: ZoneInfo, day_iso: str) -> str:
     if tomorrow.month != m:
         ss_tomorrow = 0
     else:
-        ss_tomorrow = await safe_spend_for_day(repo, tz, tomorrow.isoformat())
+        ss_tomorrow = series.for_day(tomorrow.day)
 
     top2 = await repo.top_categories_in_range(day_iso, day_iso, limit=2)
     top_lines = "\n".join([f"{e} {n} — {money(s)}" for (e, n, s) in top2]) if top2 else "—"
 
+    # суми місяця — з інкрементального MonthSpend, ліміти/бюджет — з ReadCache
+    projection = forecast_lines(await month_forecast(repo, y, m, d))
+    forecast_text = "\n".join(projection) + "\n\n" if projection else ""
+
     ddmm = f"{d:02d}.{m:02d}"
     return (
         f"📊 Daily Report ({ddmm})\n\n"
@@ -37,36 +75,28 @@ async def build_daily_report(repo: Repo, tz: ZoneInfo, day_iso: str) -> str:
         f"Факт: {money(var_day)}\n"
         f"Результат: {res}\n"
         f"Safe-spend на завтра: {money(ss_tomorrow)}\n\n"
+        f"{forecast_text}"
         "Топ категорії:\n"
         f"{top_lines}"
     )
 
+@_cached_report("weekly", lambda now: week_start(now).isoformat())
 async def build_weekly_report(repo: Repo, tz: ZoneInfo, now: datetime) -> str:
-    today = date(now.year, now.month, now.day)
-    start = today - timedelta(days=today.isoweekday() - 1)  # Monday
+    start = week_start(now)
     end = start + timedelta(days=6)  # Sunday
 
     start_iso = start.isoformat()
     end_iso = end.isoformat()
 
-    cur_total = await repo.db.conn.execute(
-        "SELECT COALESCE(SUM(amount_cents),0) AS s FROM expenses WHERE spent_date>=? AND spent_date<=?",
-        (start_iso, end_iso),
-    )
-    total = int((await cur_total.fetchone())["s"])
-
-    cur_var = await repo.db.conn.execute(
-        """
-        SELECT COALESCE(SUM(e.amount_cents),0) AS s
-        FROM expenses e
-        JOIN categories c ON c.id=e.category_id
-        WHERE e.spent_date>=? AND e.spent_date<=? AND c.kind='variable' AND c.is_active=1
-        """,
-        (start_iso, end_iso),
-    )
-    var_total = int((await cur_var.fetchone())["s"])
+    total = await repo.sum_in_range(start_iso, end_iso)
+    var_total = await repo.sum_in_range_by_kind(start_iso, end_iso, "variable")
 
-    plan_week = (await safe_spend_for_day(repo, tz, start_iso)) * 7
+    # точний план по днях (тиждень може зачепити два місяці)
+    plan_week = 0
+    for i in range(7):
+        day = start + timedelta(days=i)
+        series = await safe_spend_series(repo, day.year, day.month)
+        plan_week += series.for_day(day.day)
     delta = var_total - plan_week
     res = f"🔴 {money(delta)}" if delta > 0 else f"🟢 {money(abs(delta))}"
 
@@ -94,6 +124,7 @@ async def build_weekly_report(repo: Repo, tz: ZoneInfo, now: datetime) -> str:
         f"Найдорожчий день: {pricey}"
     )
 
+@_cached_report("monthly", lambda year, month: (year, month))
 async def build_monthly_report(repo: Repo, tz: ZoneInfo, year: int, month: int) -> str:
     month_names = {
         1:"Січень",2:"Лютий",3:"Березень",4:"Квітень",5:"Травень",6:"Червень",
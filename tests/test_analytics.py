@@ -0,0 +1,67 @@
+import asyncio
+import sqlite3
+from datetime import date
+
+import pytest
+
+from db import Database
+from repo import Repo
+from services import analytics
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(analytics, "np", None)
+    elif analytics.np is None:
+        pytest.skip("numpy is not installed")
+
+
+async def _category_sums(repo: Repo) -> dict[int, int]:
+    cols = await analytics.expense_columns(repo)
+    return cols.group_by("category", date(2024, 1, 1), date(2024, 12, 31))
+
+
+def _external(db_path: str, sql: str, params=()) -> None:
+    # як ручний sqlite3 / інший процес
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(sql, params)
+    conn.close()
+
+
+def test_external_category_update_changes_cube(tmp_path, backend):
+    async def main():
+        db_path = str(tmp_path / "db.sqlite3")
+        db = Database(db_path)
+        await db.connect()
+        repo = Repo(db)
+        try:
+            food = await repo.add_category("Їжа", "🍞", "variable", None)
+            cafe = await repo.add_category("Кафе", "☕", "variable", None)
+            moved = await repo.add_expense(1000, food, "2024-03-01", "2024-03-01T10:00:00", None)
+            await repo.add_expense(500, cafe, "2024-03-01", "2024-03-01T11:00:00", None)
+            await repo.sync_external_writes()  # базова точка, як на першому lease
+
+            assert await _category_sums(repo) == {food: 1000, cafe: 500}
+
+            # кількість і сума не змінюються — лише категорія
+            _external(db_path, "UPDATE expenses SET category_id=? WHERE id=?", (cafe, moved))
+            assert await repo.sync_external_writes()
+            assert await _category_sums(repo) == {cafe: 1500}
+
+            # UPDATE+DELETE з тими самими підсумками
+            _external(db_path, "UPDATE expenses SET amount_cents=1000, spent_date='2024-05-02' WHERE id<>?", (moved,))
+            _external(db_path, "DELETE FROM expenses WHERE id=?", (moved,))
+            _external(db_path, "INSERT INTO expenses (amount_cents, category_id, spent_date, created_at) "
+                               "VALUES (500, ?, '2024-03-01', '')", (food,))
+            assert await repo.sync_external_writes()
+            cols = await analytics.expense_columns(repo)
+            assert cols.group_by("month", date(2024, 1, 1), date(2024, 12, 31)) == {
+                2024 * 12 + 2: 500,
+                2024 * 12 + 4: 1000,
+            }
+        finally:
+            await db.close()
+
+    asyncio.run(main())
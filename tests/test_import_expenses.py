@@ -0,0 +1,68 @@
+import csv
+import sqlite3
+
+from db import SCHEMA_SQL
+from import_expenses import run_import
+
+ROWS = [
+    ("2024-01-05", "12.50", "Кава", "капучино"),
+    ("2024-01-05", "12.50", "Кава", "капучино"),  # та сама кава двічі за день — дві витрати
+    ("2024-01-05", "40", "Продукти", ""),
+    ("2024-01-06", "12.50", "Кава", "капучино"),
+    ("2024-02-01", "99,99", "Продукти", "ринок"),
+]
+
+
+def _write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["spent_date", "amount_zl", "category", "comment"])
+        w.writerows(rows)
+
+
+def _old_importer_db(path, rows):
+    """БД як після старого import_expenses.py: схема без міграцій, import_key немає."""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_SQL)
+    ids = {}
+    for name in ("Кава", "Продукти"):
+        cur = conn.execute("INSERT INTO categories (name, kind) VALUES (?, 'variable')", (name,))
+        ids[name] = cur.lastrowid
+    for spent_date, amount, category, comment in rows:
+        conn.execute(
+            "INSERT INTO expenses (amount_cents, category_id, spent_date, created_at, comment) VALUES (?,?,?,?,?)",
+            (round(float(amount.replace(",", ".")) * 100), ids[category], spent_date, "2024-03-01T00:00:00", comment or None),
+        )
+    conn.commit()
+    conn.close()
+
+
+def _count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM expenses").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_import_onto_old_importer_db_adds_nothing(tmp_path):
+    db_path, csv_path = str(tmp_path / "db.sqlite3"), str(tmp_path / "e.csv")
+    _old_importer_db(db_path, ROWS)
+    _write_csv(csv_path, ROWS)
+
+    stats = run_import(csv_path, db_path, chunk_size=2, busy_timeout_ms=1000)
+
+    assert (stats.imported, stats.duplicates) == (0, len(ROWS))
+    assert _count(db_path) == len(ROWS)
+
+
+def test_import_onto_old_importer_db_adds_only_new_rows(tmp_path):
+    db_path, csv_path = str(tmp_path / "db.sqlite3"), str(tmp_path / "e.csv")
+    _old_importer_db(db_path, ROWS)
+    extra = [("2024-01-05", "12.50", "Кава", "капучино"), ("2024-02-02", "5", "Кава", "")]
+    _write_csv(csv_path, extra + ROWS)  # порядок у файлі не важливий
+
+    stats = run_import(csv_path, db_path, chunk_size=2, busy_timeout_ms=1000)
+
+    assert (stats.imported, stats.duplicates) == (2, len(ROWS))
+    assert _count(db_path) == len(ROWS) + 2
@@ -0,0 +1,56 @@
+import asyncio
+
+from aiogram.types import User
+
+from db import Database
+from households import Household, HouseholdManager
+from middlewares import AccessAndDIMiddleware
+
+MEMBER, STRANGER = 111, 999
+
+
+def _run(tmp_path, from_user):
+    async def main():
+        async def open_db(path):
+            db = Database(path)
+            await db.connect()
+            return db
+
+        households = HouseholdManager([Household("home", str(tmp_path / "home.sqlite3"), (MEMBER,))], open_db)
+        middleware = AccessAndDIMiddleware(households, "Europe/Warsaw", outbox=None)
+        seen = []
+
+        async def handler(event, data):
+            seen.append(dict(data))
+            return "handled"
+
+        data = {"event_from_user": from_user} if from_user is not None else {}
+        try:
+            result = await middleware(handler, object(), data)
+        finally:
+            await households.close()
+        return result, seen
+
+    return asyncio.run(main())
+
+
+def _user(uid):
+    return User(id=uid, is_bot=False, first_name="u")
+
+
+def test_update_without_user_passes_without_repo(tmp_path):
+    result, seen = _run(tmp_path, None)
+    assert result == "handled"
+    assert "repo" not in seen[0] and "household" not in seen[0]
+    assert seen[0]["tz_name"] == "Europe/Warsaw"
+
+
+def test_stranger_is_dropped(tmp_path):
+    assert _run(tmp_path, _user(STRANGER)) == (None, [])
+
+
+def test_member_gets_household_repo(tmp_path):
+    result, seen = _run(tmp_path, _user(MEMBER))
+    assert result == "handled"
+    assert seen[0]["household"].name == "home" and seen[0]["users"] == [MEMBER]
+    assert seen[0]["repo"] is not None
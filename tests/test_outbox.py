@@ -0,0 +1,61 @@
+import asyncio
+
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from outbox import Outbox
+
+
+class FakeBot:
+    def __init__(self, fail=None):
+        self.fail = fail or (lambda chat_id, text: None)
+        self.sent: list[tuple[int, str]] = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        error = self.fail(chat_id, text)
+        if error is not None:
+            raise error
+        self.sent.append((chat_id, text))
+
+
+def _method(chat_id, text):
+    return SendMessage(chat_id=chat_id, text=text)
+
+
+def test_retry_after_is_capped():
+    async def main():
+        bot = FakeBot(lambda c, t: TelegramRetryAfter(_method(c, t), "flood", retry_after=0))
+        outbox = Outbox(bot, global_rate=1000, chat_rate=1000, chat_burst=1000, max_retries=3)
+        outbox.start()
+        try:
+            assert await asyncio.wait_for(outbox.send(1, "x"), 5) is False
+        finally:
+            await outbox.close()
+        assert (outbox.stats.retry_after, outbox.stats.retries, outbox.stats.dropped) == (4, 3, 1)
+
+    asyncio.run(main())
+
+
+def test_waiting_chat_does_not_block_others_and_keeps_order():
+    async def main():
+        failures = {"a1": 1}  # перша спроба a1 — мережева помилка, потім backoff 0.5 с
+
+        def fail(chat_id, text):
+            if failures.get(text):
+                failures[text] -= 1
+                return TelegramNetworkError(_method(chat_id, text), "down")
+            return None
+
+        bot = FakeBot(fail)
+        outbox = Outbox(bot, global_rate=1000, chat_rate=1000, chat_burst=1000, workers=1)
+        outbox.start()
+        try:
+            a = [await outbox.submit(1, t) for t in ("a1", "a2")]
+            b = await outbox.submit(2, "b1")
+            assert await asyncio.wait_for(b, 0.3) is True  # єдиний воркер не спить на backoff чату 1
+            assert await asyncio.wait_for(asyncio.gather(*a), 5) == [True, True]
+        finally:
+            await outbox.close()
+        assert [t for c, t in bot.sent if c == 1] == ["a1", "a2"]
+
+    asyncio.run(main())
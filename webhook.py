@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import secrets
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+# Telegram: 1-256 символів A-Z a-z 0-9 _ -
+_SECRET_RE = re.compile(r"[A-Za-z0-9_-]{1,256}")
+
+
+def webhook_secret(secret_token: str | None) -> str:
+    """
+    WEBHOOK_SECRET або випадковий на цей запуск: без секрету будь-хто, хто бачить порт,
+    міг би підсовувати апдейти. set_webhook реєструє його заново на кожному старті.
+    """
+    if secret_token is None:
+        log.warning("WEBHOOK_SECRET is not set: using a random secret for this run")
+        return secrets.token_urlsafe(32)
+    if not _SECRET_RE.fullmatch(secret_token):
+        raise ValueError("WEBHOOK_SECRET must be 1-256 characters of A-Z, a-z, 0-9, _ and -")
+    return secret_token
+
+
+def build_webhook_app(dp: Dispatcher, bot: Bot, path: str, secret_token: str | None) -> web.Application:
+    """
+    aiohttp-застосунок, що приймає апдейти від Telegram на `path`.
+
+    - Запити без правильного X-Telegram-Bot-Api-Secret-Token -> 401.
+    - handle_in_background: 200 віддається одразу, хендлери працюють у фоні,
+      тож повільний апдейт не тримає з'єднання Telegram.
+    - setup_application вішає startup/shutdown Dispatcher'а на застосунок
+      (shutdown закриває FSM storage і сесію бота).
+    """
+    app = web.Application()
+    SimpleRequestHandler(dp, bot, handle_in_background=True, secret_token=secret_token).register(app, path=path)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(
+    dp: Dispatcher,
+    bot: Bot,
+    *,
+    url: str,
+    path: str,
+    host: str,
+    port: int,
+    secret_token: str | None,
+    allowed_updates: list[str],
+) -> None:
+    """Реєструє webhook у Telegram і обслуговує його до скасування (Ctrl+C / SIGTERM)."""
+    if not url.startswith("https://"):
+        raise ValueError(f"RUN_MODE=webhook needs WEBHOOK_URL=https://..., got {url!r}")
+    secret_token = webhook_secret(secret_token)
+    app = build_webhook_app(dp, bot, path, secret_token)
+
+    async def on_startup(bot: Bot) -> None:
+        await bot.set_webhook(
+            url.rstrip("/") + path,
+            secret_token=secret_token,
+            allowed_updates=allowed_updates,
+        )
+        log.info("Webhook set: %s%s (allowed_updates=%s)", url.rstrip("/"), path, allowed_updates)
+
+    dp.startup.register(on_startup)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=host, port=port)
+    await site.start()
+    log.info("Webhook server listening on %s:%s", host, port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # webhook у Telegram не видаляємо: апдейти чекатимуть наступного запуску
+        await runner.cleanup()